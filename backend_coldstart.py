@@ -0,0 +1,178 @@
+#!/usr/bin/env python3
+"""
+Cold-start and first-hit latency profiling for the Gibbon Nutrition API
+Hits every GET route once on a freshly started server, then measures warm latency and the cold/warm ratio
+"""
+
+import argparse
+import json
+import os
+import random
+import shlex
+import signal
+import socket
+import subprocess
+import sys
+import time
+from typing import Dict, Any, List
+from urllib.parse import urlparse
+
+from backend_test import APITester, discover_api_routes, fill_route, percentile
+
+LOCAL_URL = "http://localhost:3000"
+# Next.js compiles a route on its first request; give it far longer than the usual read timeout
+COLD_TIMEOUT = (5, 180)
+
+
+# ===== FRESH INSTANCE =====
+
+def start_server(command: str, cwd: str, base_url: str, ready_timeout: float = 180.0) -> Dict[str, Any]:
+    """Launch the dev/prod server and wait until its port accepts connections, without requesting any route"""
+    parsed = urlparse(base_url)
+    port = parsed.port or (443 if parsed.scheme == "https" else 80)
+    started = time.perf_counter()
+    process = subprocess.Popen(shlex.split(command), cwd=cwd, stdout=subprocess.DEVNULL,
+                               stderr=subprocess.DEVNULL, start_new_session=True)
+    deadline = started + ready_timeout
+    while time.perf_counter() < deadline:
+        if process.poll() is not None:
+            raise RuntimeError(f"'{command}' exited with status {process.returncode} before listening")
+        try:
+            socket.create_connection((parsed.hostname, port), timeout=1).close()
+            return {'process': process, 'listen_s': time.perf_counter() - started}
+        except OSError:
+            time.sleep(0.1)
+    stop_server(process)
+    raise RuntimeError(f"'{command}' did not listen on port {port} within {ready_timeout:g}s")
+
+
+def stop_server(process: subprocess.Popen):
+    try:
+        os.killpg(process.pid, signal.SIGTERM)
+        process.wait(timeout=10)
+    except (ProcessLookupError, subprocess.TimeoutExpired):
+        process.kill()
+
+
+# ===== MEASUREMENT =====
+
+def hit(tester: APITester, path: str) -> Dict[str, Any]:
+    """One GET: time to response headers and to the full body (event streams are closed after headers)"""
+    started = time.perf_counter()
+    try:
+        response = tester.session.get(f"{tester.base_url}{path}", stream=True)
+    except Exception as e:
+        return {'status': None, 'error': type(e).__name__, 'ttfb_ms': None, 'total_ms': None, 'bytes': None}
+    ttfb_ms = (time.perf_counter() - started) * 1000
+    size = None
+    if "text/event-stream" not in response.headers.get('Content-Type', ''):
+        size = len(response.content)
+    response.close()
+    return {'status': response.status_code, 'ttfb_ms': ttfb_ms, 'total_ms': (time.perf_counter() - started) * 1000,
+            'bytes': size}
+
+
+def profile_cold_start(tester: APITester, routes: List[Dict[str, Any]], warm_samples: int = 5) -> List[Dict[str, Any]]:
+    """First hit of every route in the given order, then warm_samples more hits per route"""
+    params = {'handle': tester.test_product_handles[0]}
+    results = []
+    for route in routes:
+        url = fill_route(route['path'], params)
+        first = hit(tester, url)
+        print(f"   🧊 {route['path']:<52} {first['status'] or first.get('error')!s:>5} "
+              f"{first['total_ms'] or 0:>10.0f}ms")
+        results.append({'route': route['path'], 'url': url, 'file': route['file'], 'cold': first})
+
+    for result in results:
+        warm = [hit(tester, result['url']) for _ in range(warm_samples)]
+        totals = [w['total_ms'] for w in warm if w['total_ms'] is not None]
+        result['warm_p50_ms'] = percentile(totals, 50) if totals else None
+        cold_ms = result['cold']['total_ms']
+        result['ratio'] = cold_ms / result['warm_p50_ms'] if cold_ms and result['warm_p50_ms'] else None
+    return results
+
+
+def print_cold_report(results: List[Dict[str, Any]], ratio_threshold: float, min_penalty_ms: float) -> List[str]:
+    """Print routes by cold/warm ratio; return those worth pre-warming"""
+    print(f"\n🔥 First-hit vs warm latency ({len(results)} routes)")
+    print(f"   {'Route':<52} {'status':>6} {'cold ms':>9} {'warm p50':>9} {'ratio':>7}")
+    prewarm = []
+    for r in sorted(results, key=lambda r: -(r['ratio'] or 0)):
+        cold = r['cold']
+        ratio = f"{r['ratio']:.1f}x" if r['ratio'] else "-"
+        warm = f"{r['warm_p50_ms']:.1f}" if r['warm_p50_ms'] is not None else "-"
+        print(f"   {r['route']:<52} {cold['status'] or cold.get('error')!s:>6} {cold['total_ms'] or 0:>9.1f} "
+              f"{warm:>9} {ratio:>7}")
+        if r['ratio'] and r['ratio'] >= ratio_threshold and cold['total_ms'] - r['warm_p50_ms'] >= min_penalty_ms:
+            prewarm.append(r['route'])
+    return prewarm
+
+
+def main():
+    """Profile first-hit latency per route, optionally on a server started just for this run"""
+    parser = argparse.ArgumentParser(description="Cold-start and first-hit latency per API route")
+    parser.add_argument("--base-url", default=LOCAL_URL, help="Server to profile (default: %(default)s)")
+    parser.add_argument("--start-cmd", help="Start a fresh instance first, e.g. 'yarn start' (stopped afterwards)")
+    parser.add_argument("--cwd", default=".", help="Working directory for --start-cmd")
+    parser.add_argument("--admin", action="store_true", help="Log in first so admin routes reach their handlers")
+    parser.add_argument("--include", default="", help="Only routes starting with this prefix")
+    parser.add_argument("--order", choices=["sorted", "shuffle"], default="sorted",
+                        help="First-hit order; shuffling with --seed shows order effects (default: %(default)s)")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--warm-samples", type=int, default=5)
+    parser.add_argument("--ratio-threshold", type=float, default=3.0,
+                        help="Pre-warm routes whose cold/warm ratio reaches this (default: %(default)s)")
+    parser.add_argument("--min-penalty", type=float, default=200.0,
+                        help="...and whose first hit costs at least this many extra ms (default: %(default)s)")
+    parser.add_argument("--json", metavar="FILE", help="Write per-route results as JSON")
+    args = parser.parse_args()
+
+    routes = [r for r in discover_api_routes() if "GET" in r['methods'] and r['path'].startswith(args.include)]
+    if args.order == "shuffle":
+        random.Random(args.seed).shuffle(routes)
+
+    server = None
+    if args.start_cmd:
+        print(f"🚀 Starting fresh instance: {args.start_cmd}")
+        try:
+            server = start_server(args.start_cmd, args.cwd, args.base_url)
+        except RuntimeError as e:
+            print(f"❌ {e}")
+            sys.exit(1)
+        print(f"   listening after {server['listen_s']:.1f}s")
+
+    try:
+        tester = APITester(args.base_url)
+        # Retries would turn a slow compile into a second, warm attempt
+        tester.session.max_retries = 0
+        tester.session.timeouts = {}
+        tester.session.default_timeout = COLD_TIMEOUT
+
+        print(f"🧊 First hit of {len(routes)} GET routes on {args.base_url}")
+        print("=" * 60)
+        if args.admin:
+            started = time.perf_counter()
+            tester.test_admin_login()
+            print(f"   🧊 {'POST /api/admin/auth/login':<52} {'':>5} {(time.perf_counter() - started) * 1000:>10.0f}ms")
+        results = profile_cold_start(tester, routes, args.warm_samples)
+    finally:
+        if server:
+            stop_server(server['process'])
+
+    prewarm = print_cold_report(results, args.ratio_threshold, args.min_penalty)
+    print(f"\n📋 Pre-warm after deploy ({len(prewarm)} routes): {', '.join(prewarm) or 'none'}")
+    if results and not prewarm and not args.start_cmd:
+        print("⚠️  No route was markedly slower on first hit - the server was probably already warm; "
+              "restart it or pass --start-cmd")
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump({'base_url': args.base_url, 'listen_s': server and server['listen_s'],
+                       'routes': results, 'prewarm': prewarm}, f, indent=2)
+        print(f"💾 Results written to {args.json}")
+
+    failed = [r['route'] for r in results if r['cold']['status'] is None]
+    sys.exit(1 if failed else 0)
+
+
+if __name__ == "__main__":
+    main()
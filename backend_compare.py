@@ -0,0 +1,178 @@
+#!/usr/bin/env python3
+"""
+A/B latency comparison between two Gibbon Nutrition deployments
+Interleaves identical requests against both targets and reports per-endpoint deltas with confidence intervals
+"""
+
+import argparse
+import math
+import random
+import sys
+import time
+from typing import Dict, Any, Optional, List, Callable, Tuple
+
+from backend_test import BASE_URL, PROMO_CHECK, APITester, endpoint_key, percentile
+
+DEFAULT_CANDIDATE_URL = "http://localhost:8001"
+
+
+# ===== WORKLOAD =====
+
+def comparison_requests(tester: APITester, include_admin: bool = False) -> List[Tuple[str, Callable]]:
+    """(endpoint key, send(tester, session)) pairs; paths are relative so one list drives both targets"""
+    workload = []
+    for path in tester._read_endpoints():
+        if path.startswith("/api/admin") and not include_admin:
+            continue
+        workload.append((endpoint_key("GET", path),
+                         lambda t, s, path=path: s.get(f"{t.base_url}{path}")))
+    workload.append((endpoint_key("POST", "/api/promoCode/check"),
+                     lambda t, s: s.post(f"{t.base_url}/api/promoCode/check", json=PROMO_CHECK)))
+    return workload
+
+
+def _timed(send: Callable, tester: APITester) -> Tuple[float, Optional[int]]:
+    started = time.perf_counter()
+    try:
+        status = send(tester, tester.session).status_code
+    except Exception:
+        status = None
+    return (time.perf_counter() - started) * 1000, status
+
+
+def run_interleaved(a: APITester, b: APITester, workload: List[Tuple[str, Callable]], rounds: int,
+                    warmup: int = 3, seed: int = 0) -> Dict[str, Dict[str, Any]]:
+    """Hit each endpoint on A and B back to back, in random order per pair, so drift affects both equally"""
+    rng = random.Random(seed)
+    for _ in range(warmup):
+        for _, send in workload:
+            _timed(send, a)
+            _timed(send, b)
+
+    results = {key: {'a': [], 'b': [], 'pairs': [], 'errors_a': 0, 'errors_b': 0} for key, _ in workload}
+    for _ in range(rounds):
+        order = list(workload)
+        rng.shuffle(order)
+        for key, send in order:
+            first_is_a = rng.random() < 0.5
+            first, second = (a, b) if first_is_a else (b, a)
+            first_ms, first_status = _timed(send, first)
+            second_ms, second_status = _timed(send, second)
+            (ms_a, status_a), (ms_b, status_b) = (((first_ms, first_status), (second_ms, second_status))
+                                                  if first_is_a else
+                                                  ((second_ms, second_status), (first_ms, first_status)))
+            r = results[key]
+            r['errors_a'] += status_a is None or status_a >= 500
+            r['errors_b'] += status_b is None or status_b >= 500
+            if status_a is None or status_b is None:
+                continue
+            r['a'].append(ms_a)
+            r['b'].append(ms_b)
+            r['pairs'].append(ms_b - ms_a)
+    return results
+
+
+# ===== STATISTICS =====
+
+def bootstrap_ci(values: List[float], stat: Callable[[List[float]], float], confidence: float = 0.95,
+                 resamples: int = 2000, seed: int = 0) -> Tuple[float, float]:
+    """Percentile bootstrap interval for stat(values)"""
+    if len(values) < 2:
+        return (float('nan'), float('nan'))
+    rng = random.Random(seed)
+    n = len(values)
+    estimates = sorted(stat([values[rng.randrange(n)] for _ in range(n)]) for _ in range(resamples))
+    tail = (1 - confidence) / 2 * 100
+    return percentile(estimates, tail), percentile(estimates, 100 - tail)
+
+
+def mean_ci(values: List[float], z: float = 1.96) -> Tuple[float, float, float]:
+    """Mean and normal-approximation interval"""
+    n = len(values)
+    if n < 2:
+        return (values[0] if values else float('nan'), float('nan'), float('nan'))
+    mean = sum(values) / n
+    sd = math.sqrt(sum((v - mean) ** 2 for v in values) / (n - 1))
+    half = z * sd / math.sqrt(n)
+    return mean, mean - half, mean + half
+
+
+def compare_endpoint(samples: Dict[str, Any], confidence: float = 0.95) -> Dict[str, Any]:
+    """Paired deltas (B - A): median with bootstrap CI, mean with normal CI"""
+    pairs = samples['pairs']
+    median = lambda values: percentile(values, 50)
+    low, high = bootstrap_ci(pairs, median, confidence)
+    mean, mean_low, mean_high = mean_ci(pairs)
+    p50_a = percentile(samples['a'], 50)
+    return {
+        'n': len(pairs),
+        'p50_a': p50_a,
+        'p50_b': percentile(samples['b'], 50),
+        'p95_a': percentile(samples['a'], 95),
+        'p95_b': percentile(samples['b'], 95),
+        'delta_p50': median(pairs) if pairs else float('nan'),
+        'ci': (low, high),
+        'delta_mean': mean,
+        'mean_ci': (mean_low, mean_high),
+        'delta_pct': (median(pairs) / p50_a * 100) if pairs and p50_a else float('nan'),
+        'significant': pairs and (low > 0 or high < 0),
+        'errors_a': samples['errors_a'],
+        'errors_b': samples['errors_b'],
+    }
+
+
+def print_comparison(url_a: str, url_b: str, comparisons: Dict[str, Dict[str, Any]], confidence: float):
+    print(f"\n⚖️  A = {url_a}   B = {url_b}   (delta = B - A, {confidence * 100:g}% CI)")
+    print(f"   {'Endpoint':<44} {'n':>5} {'A p50':>8} {'B p50':>8} {'Δ p50':>8} {'CI':>19} {'Δ%':>7} "
+          f"{'A p95':>8} {'B p95':>8} {'5xx A/B':>8}")
+    for key, c in comparisons.items():
+        marker = "  *" if c['significant'] else ""
+        ci = f"[{c['ci'][0]:+.2f}, {c['ci'][1]:+.2f}]"
+        print(f"   {key:<44} {c['n']:>5} {c['p50_a']:>8.2f} {c['p50_b']:>8.2f} {c['delta_p50']:>+8.2f} {ci:>19} "
+              f"{c['delta_pct']:>+6.1f}% {c['p95_a']:>8.2f} {c['p95_b']:>8.2f} "
+              f"{c['errors_a']:>3}/{c['errors_b']:<4}{marker}")
+    print("   * interval excludes zero")
+
+
+def main():
+    """Compare two deployments endpoint by endpoint"""
+    parser = argparse.ArgumentParser(description="Interleaved A/B latency comparison of two deployments")
+    parser.add_argument("--a", default=BASE_URL, help="Baseline deployment (default: %(default)s)")
+    parser.add_argument("--b", default=DEFAULT_CANDIDATE_URL, help="Candidate deployment (default: %(default)s)")
+    parser.add_argument("--rounds", type=int, default=100, help="Interleaved pairs per endpoint (default: %(default)s)")
+    parser.add_argument("--warmup", type=int, default=3, help="Discarded rounds per target (default: %(default)s)")
+    parser.add_argument("--confidence", type=float, default=0.95)
+    parser.add_argument("--admin", action="store_true", help="Log into both targets and include admin routes")
+    parser.add_argument("--max-regression", type=float, metavar="MS",
+                        help="Fail when an endpoint's delta CI lies entirely above this many ms")
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    a, b = APITester(args.a), APITester(args.b)
+    for tester in (a, b):
+        # Retries would hide exactly the slow or failing responses being compared
+        tester.session.max_retries = 0
+        if args.admin and not tester.test_admin_login():
+            sys.exit(1)
+
+    workload = comparison_requests(a, args.admin)
+    print(f"⚖️  A/B comparison: {len(workload)} endpoints x {args.rounds} interleaved pairs")
+    print("=" * 60)
+    results = run_interleaved(a, b, workload, args.rounds, args.warmup, args.seed)
+    comparisons = {key: compare_endpoint(samples, args.confidence) for key, samples in results.items()}
+    print_comparison(args.a, args.b, comparisons, args.confidence)
+
+    success = True
+    if args.max_regression is not None:
+        print()
+        for key, c in comparisons.items():
+            regressed = c['n'] >= 2 and c['ci'][0] > args.max_regression
+            a.log_test(f"A/B {key}", not regressed,
+                       f"Δ p50 {c['delta_p50']:+.2f}ms, CI [{c['ci'][0]:+.2f}, {c['ci'][1]:+.2f}] "
+                       f"vs allowed +{args.max_regression:g}ms")
+            success = success and not regressed
+    sys.exit(0 if success else 1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,219 @@
+#!/usr/bin/env python3
+"""
+Live terminal dashboard for Gibbon Nutrition load runs
+Worker threads write to their own metric shards; the dashboard thread merges them a few times a second
+"""
+
+import sys
+import threading
+import time
+import weakref
+from contextlib import contextmanager
+from typing import Dict, Any, Optional, List, Tuple
+
+import requests
+
+from backend_test import percentile
+
+
+class MetricShard:
+    """Single-writer metrics for one worker thread; readers only copy"""
+
+    def __init__(self, capacity: int):
+        self.inflight = 0
+        self.completed = 0
+        self.statuses: Dict[str, int] = {}
+        # Ring buffer of (end_time, endpoint, latency_ms, status); list slicing is atomic under the GIL
+        self.ring: List[Optional[Tuple[float, str, float, str]]] = [None] * capacity
+        self.position = 0
+
+    def record(self, end: float, key: str, latency_ms: float, status: str):
+        self.ring[self.position % len(self.ring)] = (end, key, latency_ms, status)
+        self.position += 1
+        self.completed += 1
+        self.statuses[status] = self.statuses.get(status, 0) + 1
+
+
+class LiveMetrics:
+    """Low-contention counters for in-flight requests, completions, latencies, statuses and pool usage"""
+
+    def __init__(self, shard_capacity: int = 4096):
+        self.shard_capacity = shard_capacity
+        self.started = time.perf_counter()
+        self._shards: List[MetricShard] = []
+        # Weak so sessions closed and dropped by their workers fall out of the pool stats
+        self._sessions: "weakref.WeakSet[requests.Session]" = weakref.WeakSet()
+        self._local = threading.local()
+        self._register_lock = threading.Lock()
+
+    def _shard(self) -> MetricShard:
+        shard = getattr(self._local, 'shard', None)
+        if shard is None:
+            shard = self._local.shard = MetricShard(self.shard_capacity)
+            with self._register_lock:
+                self._shards.append(shard)
+        return shard
+
+    def register_session(self, session: requests.Session):
+        with self._register_lock:
+            self._sessions.add(session)
+
+    def request_started(self):
+        self._shard().inflight += 1
+
+    def request_finished(self, key: str, latency_ms: float, status: str):
+        shard = self._shard()
+        shard.inflight -= 1
+        shard.record(time.perf_counter(), key, latency_ms, status)
+
+    def snapshot(self, window: float = 10.0) -> Dict[str, Any]:
+        """Merge all shards into rolling per-endpoint rates and percentiles"""
+        now = time.perf_counter()
+        shards = list(self._shards)
+        recent: Dict[str, List[Tuple[float, float, str]]] = {}
+        statuses: Dict[str, int] = {}
+        last_second = 0
+        for shard in shards:
+            for entry in shard.ring[:]:
+                if entry is None or now - entry[0] > window:
+                    continue
+                end, key, latency_ms, status = entry
+                recent.setdefault(key, []).append((end, latency_ms, status))
+                last_second += now - end <= 1.0
+            for status, count in list(shard.statuses.items()):
+                statuses[status] = statuses.get(status, 0) + count
+
+        span = min(window, max(now - self.started, 1e-6))
+        endpoints = {}
+        for key, entries in recent.items():
+            latencies = [latency for _, latency, _ in entries]
+            errors = sum(1 for _, _, status in entries if not status.startswith(("2", "3", "4")))
+            endpoints[key] = {'rps': len(entries) / span, 'p50': percentile(latencies, 50),
+                              'p99': percentile(latencies, 99), 'errors': errors}
+
+        return {
+            'elapsed': now - self.started,
+            'rps': last_second,
+            'inflight': sum(shard.inflight for shard in shards),
+            'completed': sum(shard.completed for shard in shards),
+            'statuses': statuses,
+            'endpoints': endpoints,
+            'pool': self._pool_usage(),
+        }
+
+    def _pool_usage(self) -> Dict[str, int]:
+        in_use = idle = 0
+        with self._register_lock:
+            sessions = list(self._sessions)
+        for session in sessions:
+            for adapter in list(session.adapters.values()):
+                pools = getattr(getattr(adapter, 'poolmanager', None), 'pools', None)
+                if pools is None:
+                    continue
+                # urllib3's LRU container refuses iteration but keys() takes its lock
+                for key in pools.keys():
+                    queue = getattr(pools.get(key), 'pool', None)
+                    if queue is None:
+                        continue
+                    # Free slots hold either None or an idle connection; the rest are checked out
+                    in_use += queue.maxsize - queue.qsize()
+                    idle += sum(1 for conn in list(queue.queue) if conn is not None)
+        return {'in_use': in_use, 'idle': idle, 'sessions': len(sessions)}
+
+
+class _StickyOutput:
+    """stdout wrapper that keeps the dashboard pinned below whatever the run prints"""
+
+    def __init__(self, stream):
+        self.stream = stream
+        self.lock = threading.Lock()
+        self.footer_lines = 0
+        self.at_line_start = True
+
+    def _clear_footer(self):
+        if self.footer_lines:
+            self.stream.write(f"\x1b[{self.footer_lines}F\x1b[J")
+            self.footer_lines = 0
+
+    def write(self, text: str) -> int:
+        with self.lock:
+            self._clear_footer()
+            if text:
+                self.at_line_start = text.endswith("\n")
+            return self.stream.write(text)
+
+    def draw(self, footer: str):
+        with self.lock:
+            # Never split a line the run is still printing
+            if not self.at_line_start:
+                return
+            self._clear_footer()
+            self.stream.write(footer + "\n")
+            self.stream.flush()
+            self.footer_lines = footer.count("\n") + 1
+
+    def flush(self):
+        self.stream.flush()
+
+    def __getattr__(self, name):
+        return getattr(self.stream, name)
+
+
+class Dashboard:
+    """Redraws a live summary of LiveMetrics on the terminal (or prints a line per second when not a TTY)"""
+
+    def __init__(self, metrics: LiveMetrics, refresh_hz: float = 4.0, title: str = "Gibbon load test"):
+        self.metrics = metrics
+        self.interval = 1.0 / refresh_hz
+        self.title = title
+        self.tty = sys.stdout.isatty()
+        self._stop = threading.Event()
+
+    def render(self, snap: Dict[str, Any]) -> str:
+        pool = snap['pool']
+        lines = [
+            f"📊 {self.title} - {snap['elapsed']:.1f}s   RPS {snap['rps']:.0f}   in-flight {snap['inflight']}   "
+            f"completed {snap['completed']}   pool {pool['in_use']} busy / {pool['idle']} idle conns",
+            f"   {'Endpoint (last 10s)':<48} {'rps':>8} {'p50 ms':>8} {'p99 ms':>8} {'errors':>7}",
+        ]
+        for key, e in sorted(snap['endpoints'].items(), key=lambda item: -item[1]['rps']):
+            lines.append(f"   {key:<48} {e['rps']:>8.1f} {e['p50']:>8.1f} {e['p99']:>8.1f} {e['errors']:>7}")
+        statuses = "  ".join(f"{status} x{count}" for status, count in sorted(snap['statuses'].items()))
+        lines.append(f"   Status codes: {statuses or '-'}")
+        return "\n".join(lines)
+
+    def _loop(self, output: Optional[_StickyOutput]):
+        last_line = 0.0
+        while not self._stop.wait(self.interval):
+            snap = self.metrics.snapshot()
+            if output:
+                output.draw(self.render(snap))
+            elif snap['elapsed'] - last_line >= 1.0:
+                last_line = snap['elapsed']
+                print(f"[{snap['elapsed']:6.1f}s] rps={snap['rps']:.0f} inflight={snap['inflight']} "
+                      f"completed={snap['completed']} pool={snap['pool']['in_use']}/{snap['pool']['idle']}")
+
+    @contextmanager
+    def running(self):
+        output = _StickyOutput(sys.stdout) if self.tty else None
+        if output:
+            sys.stdout = output
+        thread = threading.Thread(target=self._loop, args=(output,), name="dashboard", daemon=True)
+        thread.start()
+        try:
+            yield self
+        finally:
+            self._stop.set()
+            thread.join()
+            if output:
+                sys.stdout = output.stream
+                output.footer_lines = 0
+                print("\n" + self.render(self.metrics.snapshot()))
+
+
+def attach_dashboard(tester, refresh_hz: float = 4.0, title: str = "Gibbon load test") -> Dashboard:
+    """Feed every session the tester hands out into a new LiveMetrics and return its Dashboard"""
+    metrics = LiveMetrics()
+    tester.session.metrics = metrics
+    metrics.register_session(tester.session)
+    return Dashboard(metrics, refresh_hz, title)
@@ -0,0 +1,438 @@
+#!/usr/bin/env python3
+"""
+Seeded synthetic data generator for the Gibbon Nutrition API
+Generates customers, products/variants, orders, discounts and reviews in batches and streams them to files or endpoints
+"""
+
+import argparse
+import json
+import os
+import random
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timezone
+from typing import Dict, Any, Optional, List, Callable, Iterator
+
+from backend_test import BASE_URL, APITester
+
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+BATCH_SIZE = 10_000
+# Fixed window so generated timestamps never depend on when the generator runs
+REVIEW_WINDOW = (datetime(2024, 1, 1, tzinfo=timezone.utc), datetime(2025, 12, 31, tzinfo=timezone.utc))
+
+FIRST_NAMES = ["Aarav", "Vivaan", "Aditya", "Arjun", "Sai", "Reyansh", "Ishaan", "Kabir", "Rohan", "Vikram",
+               "Ananya", "Diya", "Saanvi", "Aadhya", "Priya", "Kavya", "Meera", "Riya", "Neha", "Pooja",
+               "Alex", "Sarah", "Mike", "Emma", "David", "Olivia", "James", "Sophia", "Daniel", "Mia"]
+LAST_NAMES = ["Sharma", "Verma", "Gupta", "Patel", "Singh", "Kumar", "Reddy", "Iyer", "Nair", "Mehta",
+              "Joshi", "Kapoor", "Malhotra", "Chopra", "Bose", "Das", "Rao", "Menon", "Pillai", "Shah",
+              "Johnson", "Davis", "Wilson", "Brown", "Taylor", "Anderson", "Thomas", "Moore", "Martin", "Lee"]
+EMAIL_DOMAINS = ["example.com", "example.org", "example.net", "mail.example.com"]
+CITIES = [("Mumbai", "Maharashtra", "400"), ("Pune", "Maharashtra", "411"), ("Delhi", "Delhi", "110"),
+          ("Bengaluru", "Karnataka", "560"), ("Chennai", "Tamil Nadu", "600"), ("Hyderabad", "Telangana", "500"),
+          ("Kolkata", "West Bengal", "700"), ("Ahmedabad", "Gujarat", "380"), ("Jaipur", "Rajasthan", "302"),
+          ("Chandigarh", "Punjab", "160")]
+PRODUCT_ADJECTIVES = ["ultra", "pure", "advanced", "iso", "micronized", "elite", "raw", "plant", "hydro", "max"]
+PRODUCT_NOUNS = [("whey-protein", "Protein"), ("creatine", "Creatine"), ("bcaa", "Amino Acids"),
+                 ("pre-workout", "Pre-Workout"), ("mass-gainer", "Protein"), ("multivitamin", "Vitamins"),
+                 ("fish-oil", "Vitamins"), ("electrolytes", "Hydration"), ("shaker", "Accessories"),
+                 ("protein-bar", "Snacks"), ("glutamine", "Amino Acids"), ("casein", "Protein")]
+FLAVORS = ["Chocolate", "Vanilla", "Strawberry", "Cookies & Cream", "Mango", "Unflavoured", "Coffee", "Blue Raspberry"]
+PRICE_POINTS = [299, 499, 649, 799, 999, 1299, 1499, 1999, 2499, 2999, 3499, 4999]
+RATING_WEIGHTS = [0.04, 0.06, 0.12, 0.30, 0.48]
+REVIEW_TITLES = {
+    1: ["Very disappointed", "Would not buy again", "Not as described"],
+    2: ["Below expectations", "Could be better", "Mediocre"],
+    3: ["Decent product", "Okay for the price", "Average"],
+    4: ["Good product", "Happy with it", "Solid choice"],
+    5: ["Excellent!", "Best I've tried", "Highly recommend", "Great results"],
+}
+REVIEW_SENTENCES = ["Mixes well with water and milk.", "Taste is great.", "Noticed better recovery after workouts.",
+                    "Packaging was intact on delivery.", "Delivery was quick.", "A bit pricey but worth it.",
+                    "No bloating at all.", "Would prefer a bigger scoop.", "Been using it for two months.",
+                    "Lab tested and it shows.", "Flavour is too sweet for me.", "Great value for money."]
+
+_MIX = 0x9E3779B97F4A7C15
+_MASK = (1 << 64) - 1
+
+
+# ===== BATCHED RANDOMNESS =====
+
+class BatchRandom:
+    """Batched draws via NumPy when installed, otherwise the same calls over random.Random
+
+    Each (seed, kind, batch) gets its own stream, so any batch can be regenerated on its own.
+    Output is deterministic per seed and backend; NumPy and pure-Python draws differ.
+    """
+
+    def __init__(self, seed: int, kind: str, batch: int):
+        if np is not None:
+            self.rng = np.random.default_rng([seed, batch, *kind.encode()])
+        else:
+            self.rng = random.Random(f"{seed}:{kind}:{batch}")
+
+    def integers(self, low: int, high: int, size: int) -> List[int]:
+        """Uniform ints in [low, high)"""
+        if np is not None:
+            return self.rng.integers(low, high, size).tolist()
+        return [self.rng.randrange(low, high) for _ in range(size)]
+
+    def uniform(self, low: float, high: float, size: int) -> List[float]:
+        if np is not None:
+            return self.rng.uniform(low, high, size).tolist()
+        return [self.rng.uniform(low, high) for _ in range(size)]
+
+    def weighted(self, weights: List[float], size: int) -> List[int]:
+        """Indices into weights, drawn proportionally"""
+        if np is not None:
+            p = np.asarray(weights, dtype=float)
+            return self.rng.choice(len(weights), size, p=p / p.sum()).tolist()
+        return self.rng.choices(range(len(weights)), weights, k=size)
+
+
+def hashed(indices: List[int], modulo: int, salt: int) -> List[int]:
+    """Stable pseudo-random value in [0, modulo) per index, identical with and without NumPy"""
+    if np is not None:
+        mixed = (np.asarray(indices, dtype=np.uint64) + np.uint64(salt)) * np.uint64(_MIX)
+        return ((mixed >> np.uint64(40)) % np.uint64(modulo)).tolist()
+    return [((((i + salt) * _MIX) & _MASK) >> 40) % modulo for i in indices]
+
+
+# ===== ENTITIES =====
+# Customers and products are pure functions of their index so orders and reviews can reference them cheaply
+
+def customer_fields(indices: List[int]) -> List[Dict[str, str]]:
+    firsts = hashed(indices, len(FIRST_NAMES), 1)
+    lasts = hashed(indices, len(LAST_NAMES), 2)
+    domains = hashed(indices, len(EMAIL_DOMAINS), 3)
+    phones = hashed(indices, 4_000_000_000, 4)
+    return [{
+        'firstName': FIRST_NAMES[f],
+        'lastName': LAST_NAMES[l],
+        'email': f"{FIRST_NAMES[f]}.{LAST_NAMES[l]}.{i}@{EMAIL_DOMAINS[d]}".lower(),
+        'phone': str(6_000_000_000 + p),
+    } for i, f, l, d, p in zip(indices, firsts, lasts, domains, phones)]
+
+
+def product_fields(indices: List[int]) -> List[Dict[str, Any]]:
+    adjectives = hashed(indices, len(PRODUCT_ADJECTIVES), 11)
+    nouns = hashed(indices, len(PRODUCT_NOUNS), 12)
+    prices = hashed(indices, len(PRICE_POINTS), 13)
+    return [{
+        'handle': f"syn-{PRODUCT_ADJECTIVES[a]}-{PRODUCT_NOUNS[n][0]}-{i}",
+        'title': f"{PRODUCT_ADJECTIVES[a].title()} {PRODUCT_NOUNS[n][0].replace('-', ' ').title()} #{i}",
+        'category': PRODUCT_NOUNS[n][1],
+        'price': PRICE_POINTS[p],
+    } for i, a, n, p in zip(indices, adjectives, nouns, prices)]
+
+
+def gen_customers(rng: BatchRandom, start: int, size: int, universe: Dict[str, int]) -> List[Dict[str, Any]]:
+    """Bodies for POST /api/auth/register, plus a home city"""
+    cities = rng.integers(0, len(CITIES), size)
+    records = customer_fields(list(range(start, start + size)))
+    for record, city in zip(records, cities):
+        record['password'] = "Synthetic#2024"
+        record['city'], record['state'], _ = CITIES[city]
+    return records
+
+
+def gen_products(rng: BatchRandom, start: int, size: int, universe: Dict[str, int]) -> List[Dict[str, Any]]:
+    """Bodies for POST /api/bulkupload"""
+    variant_counts = rng.weighted([0.35, 0.30, 0.20, 0.15], size)
+    flavor_offsets = rng.integers(0, len(FLAVORS), size)
+    stock = rng.integers(0, 500, size * 4)
+    records = []
+    for j, (base, count, offset) in enumerate(zip(product_fields(list(range(start, start + size))),
+                                                  variant_counts, flavor_offsets)):
+        flavors = [FLAVORS[(offset + k) % len(FLAVORS)] for k in range(count + 1)]
+        records.append({
+            'handle': base['handle'],
+            'title': base['title'],
+            'vendor': "Gibbon Nutrition",
+            'productCategory': base['category'],
+            'tags': ["synthetic", base['category'].lower()],
+            'options': [{'name': "Flavor", 'values': flavors}],
+            'variants': [{
+                'option1Value': flavor,
+                'sku': f"{base['handle'].upper()}-{k}",
+                'price': base['price'] + 100 * k,
+                'compareAtPrice': round((base['price'] + 100 * k) * 1.2),
+                'inventoryQty': stock[j * 4 + k],
+            } for k, flavor in enumerate(flavors)],
+            'published': True,
+        })
+    return records
+
+
+def gen_orders(rng: BatchRandom, start: int, size: int, universe: Dict[str, Any]) -> List[Dict[str, Any]]:
+    """Bodies for POST /api/orders/create, referencing the generated customers and products
+
+    Items use universe['catalog'] (order lines of products that exist on the target, see product_catalog) when
+    given; without it they carry the synthetic handle, which only suits file output.
+    """
+    customers = customer_fields(rng.integers(0, universe['customers'], size))
+    item_counts = rng.weighted([0.55, 0.25, 0.12, 0.08], size)
+    picks = rng.integers(0, universe['products'], size * 4)
+    catalog = universe.get('catalog')
+    if catalog:
+        lines = [catalog[i % len(catalog)] for i in picks]
+    else:
+        lines = [{'productId': p['handle'], 'variantId': None, 'name': p['title'], 'price': p['price']}
+                 for p in product_fields(picks)]
+    quantities = rng.weighted([0.7, 0.2, 0.07, 0.03], size * 4)
+    cities = rng.integers(0, len(CITIES), size)
+    payments = rng.weighted([0.45, 0.55], size)
+    records = []
+    for j, (customer, count, city) in enumerate(zip(customers, item_counts, cities)):
+        name, state, zip_prefix = CITIES[city]
+        records.append({
+            'items': [{**lines[j * 4 + k], 'quantity': quantities[j * 4 + k] + 1} for k in range(count + 1)],
+            'shippingAddress': {
+                'firstName': customer['firstName'],
+                'lastName': customer['lastName'],
+                'address1': f"{(start + j) % 900 + 1} Synthetic Road",
+                'city': name,
+                'state': state,
+                'zipCode': f"{zip_prefix}{(start + j) % 1000:03d}",
+                'phone': customer['phone'],
+            },
+            'customerInfo': {
+                'email': customer['email'],
+                'firstName': customer['firstName'],
+                'lastName': customer['lastName'],
+            },
+            'paymentMethod': ["cod", "razorpay"][payments[j]],
+        })
+    return records
+
+
+def gen_discounts(rng: BatchRandom, start: int, size: int, universe: Dict[str, int]) -> List[Dict[str, Any]]:
+    """Bodies for POST /api/discounts"""
+    kinds = rng.weighted([0.7, 0.3], size)
+    percents = rng.integers(5, 51, size)
+    flats = rng.integers(1, 21, size)
+    minimums = rng.weighted([0.3, 0.3, 0.2, 0.2], size)
+    limits = rng.integers(10, 1000, size)
+    return [{
+        'code': f"SYN{'PCT' if kind == 0 else 'OFF'}{start + j:07d}",
+        'discountType': "percentage" if kind == 0 else "fixed",
+        'discountValue': percent if kind == 0 else flat * 50,
+        'minOrderAmount': [0, 500, 1000, 2500][minimum],
+        'usageLimit': limit,
+        'isActive': True,
+        'appliesTo': "all",
+    } for j, (kind, percent, flat, minimum, limit) in enumerate(zip(kinds, percents, flats, minimums, limits))]
+
+
+def gen_reviews(rng: BatchRandom, start: int, size: int, universe: Dict[str, int]) -> List[Dict[str, Any]]:
+    """Rows for POST /api/admin/reviews/import"""
+    products = product_fields(rng.integers(0, universe['products'], size))
+    customers = customer_fields(rng.integers(0, universe['customers'], size))
+    ratings = rng.weighted(RATING_WEIGHTS, size)
+    titles = rng.integers(0, 1 << 30, size)
+    sentences = rng.integers(0, len(REVIEW_SENTENCES), size * 3)
+    low, high = (moment.timestamp() for moment in REVIEW_WINDOW)
+    created = rng.uniform(low, high, size)
+    verified = rng.weighted([0.4, 0.6], size)
+    return [{
+        'product_handle': product['handle'],
+        'customer_name': f"{customer['firstName']} {customer['lastName']}",
+        'email': customer['email'],
+        'rating': str(rating + 1),
+        'title': REVIEW_TITLES[rating + 1][title % len(REVIEW_TITLES[rating + 1])],
+        'content': " ".join(REVIEW_SENTENCES[s] for s in sentences[j * 3:j * 3 + 3]),
+        'verified': "true" if verified[j] else "false",
+        'created_at': datetime.fromtimestamp(created[j], timezone.utc).strftime("%Y-%m-%d"),
+    } for j, (product, customer, rating, title) in enumerate(zip(products, customers, ratings, titles))]
+
+
+GENERATORS: Dict[str, Callable[[BatchRandom, int, int, Dict[str, Any]], List[Dict[str, Any]]]] = {
+    "customers": gen_customers,
+    "products": gen_products,
+    "orders": gen_orders,
+    "discounts": gen_discounts,
+    "reviews": gen_reviews,
+}
+
+
+def generate(kind: str, count: int, seed: int = 0, universe: Optional[Dict[str, Any]] = None,
+             batch_size: int = BATCH_SIZE) -> Iterator[List[Dict[str, Any]]]:
+    """Yield batches of `count` records of one kind; universe sizes bound the customers/products referenced"""
+    universe = {'customers': 1000, 'products': 100, **(universe or {})}
+    for batch, start in enumerate(range(0, count, batch_size)):
+        yield GENERATORS[kind](BatchRandom(seed, kind, batch), start, min(batch_size, count - start), universe)
+
+
+def product_catalog(tester: APITester, limit: int) -> List[Dict[str, Any]]:
+    """Order lines (real _id, first variant, price) for synthetic products on the target, else any listed products"""
+    lines = []
+    for params in ({'search': " #", 'limit': limit, 'sortBy': "oldest"}, {'limit': limit, 'sortBy': "oldest"}):
+        response = tester.session.get(f"{tester.base_url}/api/products", params=params)
+        products = response.json().get('products', []) if response.status_code == 200 else []
+        for product in products:
+            if product.get('_id') and (params.get('search') is None or product.get('handle', "").startswith("syn-")):
+                variant = (product.get('variants') or [{}])[0]
+                lines.append({'productId': product['_id'], 'variantId': variant.get('_id'),
+                              'name': product.get('title') or product.get('handle'), 'price': variant.get('price') or 600})
+        if lines:
+            break
+    return lines
+
+
+# ===== SINKS =====
+
+def chunked(records: List[Dict[str, Any]], size: int) -> Iterator[List[Dict[str, Any]]]:
+    for i in range(0, len(records), size):
+        yield records[i:i + size]
+
+
+class EndpointSink:
+    """Streams generated batches to the seeding/import endpoints, bulk where the API allows it"""
+
+    def __init__(self, tester: APITester, chunk: int = 500, concurrency: int = 16):
+        self.tester = tester
+        self.chunk = chunk
+        self.pool = ThreadPoolExecutor(max_workers=concurrency)
+        self.sent: Dict[str, int] = {}
+        self.failed: Dict[str, int] = {}
+        # Records the target already had (same handle, or same product and email for reviews)
+        self.existing: Dict[str, int] = {}
+        self._local = threading.local()
+        self._lock = threading.Lock()
+
+    def _count(self, kind: str, sent: int = 0, failed: int = 0, existing: int = 0):
+        with self._lock:
+            for target, n in ((self.sent, sent), (self.failed, failed), (self.existing, existing)):
+                if n:
+                    target[kind] = target.get(kind, 0) + n
+
+    def _post(self, kind: str, path: str, body: Any, records: int):
+        session = getattr(self._local, 'session', None)
+        if session is None:
+            session = self._local.session = self.tester._make_session()
+        try:
+            response = session.post(f"{self.tester.base_url}{path}", json=body)
+            if kind == "products" and response.status_code == 409:
+                # bulkupload rejects the whole chunk when any handle exists; resend only the new ones
+                message = response.json().get('message', "")
+                taken = {h.strip() for h in message.partition(":")[2].split(",") if h.strip()}
+                fresh = [record for record in body if record['handle'] not in taken]
+                if not taken or len(fresh) == len(body):
+                    self._count(kind, failed=records)
+                    return
+                self._count(kind, existing=len(body) - len(fresh))
+                if fresh:
+                    self._post(kind, path, fresh, len(fresh))
+                return
+            if kind == "reviews" and response.status_code == 200:
+                # The import answers 200 even when every row is skipped; rows with an error message failed
+                data = response.json()
+                failed = len(data.get('errors') or [])
+                self._count(kind, sent=data.get('imported', 0), failed=failed,
+                            existing=max(0, data.get('skipped', 0) - failed))
+                return
+            ok = response.status_code in (200, 201)
+        except Exception:
+            ok = False
+        self._count(kind, sent=records if ok else 0, failed=0 if ok else records)
+
+    def write(self, kind: str, records: List[Dict[str, Any]]):
+        if kind == "products":
+            jobs = [("/api/bulkupload", chunk, len(chunk)) for chunk in chunked(records, self.chunk)]
+        elif kind == "reviews":
+            jobs = [("/api/admin/reviews/import", {'reviews': chunk, 'overwriteExisting': False}, len(chunk))
+                    for chunk in chunked(records, self.chunk)]
+        else:
+            path = {"customers": "/api/auth/register", "orders": "/api/orders/create", "discounts": "/api/discounts"}[kind]
+            jobs = [(path, record, 1) for record in records]
+        for future in [self.pool.submit(self._post, kind, path, body, n) for path, body, n in jobs]:
+            future.result()
+
+
+class FileSink:
+    """One JSON Lines file per entity kind"""
+
+    def __init__(self, directory: str):
+        os.makedirs(directory, exist_ok=True)
+        self.directory = directory
+        self.files: Dict[str, Any] = {}
+
+    def write(self, kind: str, records: List[Dict[str, Any]]):
+        if kind not in self.files:
+            self.files[kind] = open(os.path.join(self.directory, f"{kind}.jsonl"), "w")
+        self.files[kind].write("".join(json.dumps(record) + "\n" for record in records))
+
+    def close(self):
+        for f in self.files.values():
+            f.close()
+
+
+def main():
+    """Generate a dataset and write it to files, post it to a deployment, or just time the generation"""
+    parser = argparse.ArgumentParser(description="Seeded synthetic data generator")
+    for kind, default in (("customers", 1000), ("products", 100), ("orders", 0), ("discounts", 0), ("reviews", 0)):
+        parser.add_argument(f"--{kind}", type=int, default=default, help=f"Number of {kind} (default: %(default)s)")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--batch-size", type=int, default=BATCH_SIZE)
+    parser.add_argument("--out", metavar="DIR", help="Write <kind>.jsonl files into DIR")
+    parser.add_argument("--post", action="store_true", help="Stream records to the seeding/import endpoints")
+    parser.add_argument("--base-url", default=BASE_URL, help="Target for --post (default: %(default)s)")
+    parser.add_argument("--chunk", type=int, default=500, help="Records per bulk request (default: %(default)s)")
+    parser.add_argument("--concurrency", type=int, default=16, help="Parallel requests for --post (default: %(default)s)")
+    args = parser.parse_args()
+
+    counts = {kind: getattr(args, kind) for kind in GENERATORS}
+    universe: Dict[str, Any] = {'customers': max(1, args.customers), 'products': max(1, args.products)}
+    sinks = []
+    if args.out:
+        sinks.append(FileSink(args.out))
+    if args.post:
+        tester = APITester(args.base_url)
+        if (counts['reviews'] or counts['discounts']) and not tester.test_admin_login():
+            sys.exit(1)
+        sinks.append(EndpointSink(tester, args.chunk, args.concurrency))
+
+    print(f"🧪 Synthetic data (seed {args.seed}, {'NumPy' if np is not None else 'pure Python'} backend)")
+    print("=" * 60)
+    for kind, count in counts.items():
+        if not count:
+            continue
+        if kind == "orders" and args.post:
+            # Order items must reference products by ObjectId, so resolve the ones seeded above (or already there)
+            universe['catalog'] = product_catalog(tester, universe['products'])
+            if not universe['catalog']:
+                tester.log_test("Seed orders", False, "No products with an _id to reference")
+                sys.exit(1)
+            print(f"   orders reference {len(universe['catalog'])} products listed by the target")
+        generated, gen_s, started = 0, 0.0, time.perf_counter()
+        for batch in generate(kind, count, args.seed, universe, args.batch_size):
+            gen_s += time.perf_counter() - started
+            generated += len(batch)
+            for sink in sinks:
+                sink.write(kind, batch)
+            started = time.perf_counter()
+        print(f"   {kind:<10} {generated:>10} records, generated in {gen_s:.2f}s ({generated / max(gen_s, 1e-9):,.0f}/s)")
+
+    success = True
+    for sink in sinks:
+        if isinstance(sink, FileSink):
+            sink.close()
+            print(f"💾 Written to {args.out}")
+        else:
+            for kind in counts:
+                if sink.sent.get(kind) or sink.failed.get(kind) or sink.existing.get(kind):
+                    sink.tester.log_test(f"Seed {kind}", not sink.failed.get(kind),
+                                         f"{sink.sent.get(kind, 0)} accepted, {sink.failed.get(kind, 0)} rejected, "
+                                         f"{sink.existing.get(kind, 0)} already present")
+                    success = success and not sink.failed.get(kind)
+            sink.pool.shutdown()
+    sys.exit(0 if success else 1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,313 @@
+#!/usr/bin/env python3
+"""
+Fault-injecting reverse proxy for Gibbon Nutrition API experiments
+Adds latency, bandwidth caps, connection resets, partial responses and 5xx errors per route pattern
+"""
+
+import argparse
+import fnmatch
+import http.client
+import random
+import socket
+import struct
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Dict, Any, Optional, List
+from urllib.parse import urlparse
+
+# Connection-scoped headers a proxy must not forward
+HOP_BY_HOP = {"connection", "keep-alive", "proxy-authenticate", "proxy-authorization", "te", "trailer",
+              "transfer-encoding", "upgrade"}
+# Safe to resend when a reused keep-alive connection turns out to be stale
+IDEMPOTENT_METHODS = frozenset({"GET", "HEAD", "OPTIONS", "PUT", "DELETE"})
+
+
+# ===== FAULT RULES =====
+
+class FaultRule:
+    """Faults applied to requests whose path matches a glob (and optionally a method)"""
+
+    def __init__(self, pattern: str, method: Optional[str] = None, latency_ms: float = 0.0, jitter_ms: float = 0.0,
+                 bandwidth: Optional[int] = None, reset: float = 0.0, partial: float = 0.0,
+                 error: float = 0.0, status: int = 503):
+        self.pattern = pattern
+        self.method = method.upper() if method else None
+        self.latency_ms = latency_ms
+        self.jitter_ms = jitter_ms
+        self.bandwidth = bandwidth  # bytes per second for the response body
+        self.reset = reset
+        self.partial = partial
+        self.error = error
+        self.status = status
+
+    def matches(self, method: str, path: str) -> bool:
+        return (self.method is None or self.method == method) and fnmatch.fnmatchcase(path, self.pattern)
+
+    def __repr__(self):
+        return f"FaultRule({self.method or '*'} {self.pattern})"
+
+
+def _parse_rate(value: str) -> int:
+    """'50k' / '2m' / '1024' -> bytes per second"""
+    multiplier = {"k": 1024, "m": 1024 * 1024}.get(value[-1].lower(), 1)
+    return int(float(value.rstrip("kKmM")) * multiplier)
+
+
+def parse_fault_rule(spec: str) -> FaultRule:
+    """'[METHOD ]PATTERN:key=value,...' e.g. 'GET /api/admin/orders*:latency=200,jitter=50,error=0.1,status=503'
+
+    Keys: latency, jitter (ms); bandwidth (bytes/s, k/m suffixes); reset, partial, error (probabilities); status.
+    """
+    target, _, options = spec.partition(":")
+    method, _, pattern = target.strip().rpartition(" ")
+    kwargs: Dict[str, Any] = {}
+    for option in filter(None, options.split(",")):
+        key, _, value = option.partition("=")
+        key = key.strip()
+        if key in ("latency", "jitter"):
+            kwargs[f"{key}_ms"] = float(value)
+        elif key == "bandwidth":
+            kwargs["bandwidth"] = _parse_rate(value)
+        elif key in ("reset", "partial", "error"):
+            kwargs[key] = float(value)
+        elif key == "status":
+            kwargs["status"] = int(value)
+        else:
+            raise ValueError(f"Unknown fault option '{key}' in {spec!r}")
+    return FaultRule(pattern or "*", method or None, **kwargs)
+
+
+# ===== PROXY =====
+
+class FaultProxy:
+    """In-process reverse proxy in front of `upstream`; start() returns the URL clients should use instead"""
+
+    def __init__(self, upstream: str, rules: Optional[List[FaultRule]] = None, port: int = 0,
+                 seed: int = 0, timeout: float = 60.0):
+        self.upstream = urlparse(upstream)
+        self.rules = list(rules or [])
+        self.timeout = timeout
+        self.records: List[Dict[str, Any]] = []
+        self._rng = random.Random(seed)
+        self._lock = threading.Lock()
+        self._local = threading.local()
+        self._server = ThreadingHTTPServer(("127.0.0.1", port), self._handler_class())
+        self._server.daemon_threads = True
+        self._thread: Optional[threading.Thread] = None
+
+    @property
+    def url(self) -> str:
+        return f"http://127.0.0.1:{self._server.server_address[1]}"
+
+    def start(self) -> str:
+        self._thread = threading.Thread(target=self._server.serve_forever, name="fault-proxy", daemon=True)
+        self._thread.start()
+        return self.url
+
+    def stop(self):
+        self._server.shutdown()
+        self._server.server_close()
+
+    def __enter__(self) -> "FaultProxy":
+        self.start()
+        return self
+
+    def __exit__(self, *exc):
+        self.stop()
+
+    def rule_for(self, method: str, path: str) -> Optional[FaultRule]:
+        return next((rule for rule in self.rules if rule.matches(method, path)), None)
+
+    def roll(self, probability: float) -> bool:
+        with self._lock:
+            return probability > 0 and self._rng.random() < probability
+
+    def _connection(self) -> http.client.HTTPConnection:
+        """Keep-alive connection to the upstream, one per handler thread"""
+        conn = getattr(self._local, 'conn', None)
+        if conn is None:
+            cls = http.client.HTTPSConnection if self.upstream.scheme == "https" else http.client.HTTPConnection
+            conn = self._local.conn = cls(self.upstream.hostname, self.upstream.port, timeout=self.timeout)
+        return conn
+
+    def forward(self, method: str, path: str, headers: Dict[str, str], body: Optional[bytes]):
+        """Send the request upstream; idempotent methods are retried once on a stale keep-alive connection"""
+        attempts = 2 if method.upper() in IDEMPOTENT_METHODS else 1
+        for attempt in range(attempts):
+            conn = self._connection()
+            try:
+                conn.request(method, path, body=body, headers=headers)
+                response = conn.getresponse()
+                return response, response.read()
+            except Exception as e:
+                # Any failure (timeouts included) leaves the connection mid-request; never reuse it
+                conn.close()
+                self._local.conn = None
+                stale = isinstance(e, (http.client.RemoteDisconnected, ConnectionResetError, BrokenPipeError))
+                if not stale or attempt + 1 >= attempts:
+                    raise
+
+    def record(self, **fields):
+        with self._lock:
+            self.records.append(fields)
+
+    def summary(self) -> Dict[str, Dict[str, Any]]:
+        """Per 'METHOD path' counts of each fault and mean upstream vs total ms"""
+        routes: Dict[str, Dict[str, Any]] = {}
+        with self._lock:
+            records = list(self.records)
+        for r in records:
+            s = routes.setdefault(f"{r['method']} {r['path']}", {'count': 0, 'faults': {}, 'upstream_ms': [], 'total_ms': []})
+            s['count'] += 1
+            if r['fault']:
+                s['faults'][r['fault']] = s['faults'].get(r['fault'], 0) + 1
+            if r['upstream_ms'] is not None:
+                s['upstream_ms'].append(r['upstream_ms'])
+            s['total_ms'].append(r['total_ms'])
+        return routes
+
+    def print_report(self):
+        routes = self.summary()
+        if not routes:
+            return
+        print(f"\n🧨 Fault proxy {self.url} -> {self.upstream.geturl()} (mean ms)")
+        print(f"   {'Route':<56} {'n':>5} {'upstream':>9} {'total':>9}  faults")
+        for key, s in sorted(routes.items()):
+            upstream = f"{sum(s['upstream_ms']) / len(s['upstream_ms']):.1f}" if s['upstream_ms'] else "-"
+            total = sum(s['total_ms']) / len(s['total_ms'])
+            faults = ", ".join(f"{k} x{v}" for k, v in sorted(s['faults'].items())) or "-"
+            print(f"   {key[:56]:<56} {s['count']:>5} {upstream:>9} {total:>9.1f}  {faults}")
+
+    def _handler_class(self):
+        proxy = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"
+
+            def log_message(self, format, *args):
+                pass
+
+            def _reset(self):
+                # SO_LINGER with a zero timeout makes close() send RST instead of FIN
+                self.connection.setsockopt(socket.SOL_SOCKET, socket.SO_LINGER, struct.pack("ii", 1, 0))
+                self.close_connection = True
+                self.connection.close()
+
+            def _write_body(self, body: bytes, rule: Optional[FaultRule]):
+                if rule and rule.bandwidth:
+                    chunk = max(1, rule.bandwidth // 20)
+                    for i in range(0, len(body), chunk):
+                        self.wfile.write(body[i:i + chunk])
+                        self.wfile.flush()
+                        time.sleep(len(body[i:i + chunk]) / rule.bandwidth)
+                else:
+                    self.wfile.write(body)
+
+            def _proxy(self):
+                started = time.perf_counter()
+                path = urlparse(self.path).path
+                rule = proxy.rule_for(self.command, path)
+                length = int(self.headers.get('Content-Length') or 0)
+                body = self.rfile.read(length) if length else None
+                fault, upstream_ms, status = None, None, None
+
+                if rule and (rule.latency_ms or rule.jitter_ms):
+                    with proxy._lock:
+                        delay = rule.latency_ms + proxy._rng.uniform(0, rule.jitter_ms)
+                    time.sleep(delay / 1000)
+
+                try:
+                    if rule and proxy.roll(rule.reset):
+                        fault = "reset"
+                        self._reset()
+                        return
+                    if rule and proxy.roll(rule.error):
+                        fault, status = f"http_{rule.status}", rule.status
+                        payload = b'{"success": false, "error": "Injected fault"}'
+                        self.send_response(status)
+                        self.send_header("Content-Type", "application/json")
+                        self.send_header("Content-Length", str(len(payload)))
+                        self.end_headers()
+                        self.wfile.write(payload)
+                        return
+
+                    headers = {k: v for k, v in self.headers.items() if k.lower() not in HOP_BY_HOP}
+                    headers['Host'] = proxy.upstream.netloc
+                    upstream_started = time.perf_counter()
+                    try:
+                        response, payload = proxy.forward(self.command, self.path, headers, body)
+                    except (OSError, http.client.HTTPException) as e:
+                        fault, status = "upstream_error", 502
+                        message = f'{{"success": false, "error": "Upstream unavailable: {type(e).__name__}"}}'.encode()
+                        self.send_response(502)
+                        self.send_header("Content-Length", str(len(message)))
+                        self.end_headers()
+                        self.wfile.write(message)
+                        return
+                    upstream_ms = (time.perf_counter() - upstream_started) * 1000
+                    status = response.status
+
+                    self.send_response(response.status, response.reason)
+                    for name, value in response.getheaders():
+                        lowered = name.lower()
+                        if lowered in HOP_BY_HOP or lowered == "content-length":
+                            continue
+                        if lowered == "set-cookie" and proxy.upstream.scheme == "https":
+                            # The proxy speaks plain HTTP; Secure cookies would never be sent back through it
+                            value = "; ".join(p for p in value.split("; ") if p.lower() != "secure")
+                        if lowered == "server-timing":
+                            continue
+                        self.send_header(name, value)
+                    overhead_ms = (time.perf_counter() - started) * 1000 - upstream_ms
+                    timing = [response.getheader("Server-Timing"), f"proxy;dur={overhead_ms:.2f}"]
+                    self.send_header("Server-Timing", ", ".join(t for t in timing if t))
+                    self.send_header("Content-Length", str(len(payload)))
+                    self.end_headers()
+
+                    if rule and payload and proxy.roll(rule.partial):
+                        fault = "partial"
+                        self._write_body(payload[:len(payload) // 2], rule)
+                        self.wfile.flush()
+                        self._reset()
+                        return
+                    if rule and rule.bandwidth:
+                        fault = "throttled"
+                    self._write_body(payload, rule)
+                except (BrokenPipeError, ConnectionResetError):
+                    fault = fault or "client_disconnected"
+                finally:
+                    proxy.record(method=self.command, path=path, status=status, fault=fault, upstream_ms=upstream_ms,
+                                 total_ms=(time.perf_counter() - started) * 1000)
+
+            do_GET = do_POST = do_PUT = do_PATCH = do_DELETE = do_HEAD = do_OPTIONS = _proxy
+
+        return Handler
+
+
+def main():
+    """Run the fault proxy standalone until interrupted"""
+    parser = argparse.ArgumentParser(description="Fault-injecting reverse proxy")
+    parser.add_argument("--upstream", default="http://localhost:3000", help="Server to proxy (default: %(default)s)")
+    parser.add_argument("--port", type=int, default=8002, help="Listen port (default: %(default)s)")
+    parser.add_argument("--fault", action="append", default=[], metavar="RULE",
+                        help="e.g. 'GET /api/admin/orders*:latency=200,error=0.1' (repeatable, first match wins)")
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    proxy = FaultProxy(args.upstream, [parse_fault_rule(spec) for spec in args.fault], args.port, args.seed)
+    print(f"🧨 Fault proxy on {proxy.start()} -> {args.upstream}")
+    for rule in proxy.rules:
+        print(f"   {rule}: {vars(rule)}")
+    try:
+        while True:
+            time.sleep(3600)
+    except KeyboardInterrupt:
+        pass
+    finally:
+        proxy.stop()
+        proxy.print_report()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,217 @@
+#!/usr/bin/env python3
+"""
+Historical results store for Gibbon Nutrition API runs
+Keeps run metadata and per-endpoint latency aggregates in SQLite and answers trend queries across runs
+"""
+
+import argparse
+import os
+import sqlite3
+import sys
+from typing import Dict, Any, Optional, List
+
+# Anchored at the repo root (backend_test.REPO_ROOT) like the results cache, whatever the working directory
+DEFAULT_HISTORY_DB = os.path.join(os.path.dirname(os.path.abspath(__file__)), ".api_test_history.sqlite")
+
+# Trend metric name -> endpoint_stats column
+METRICS = {'count': 'count', 'errors': 'errors', 'min': 'min_ms', 'p50': 'p50_ms', 'p95': 'p95_ms',
+           'p99': 'p99_ms', 'max': 'max_ms', 'mean': 'mean_ms'}
+
+SCHEMA_VERSION = 1
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS runs (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    started_at TEXT NOT NULL,
+    finished_at TEXT,
+    git_commit TEXT,
+    target TEXT NOT NULL,
+    scenario TEXT NOT NULL,
+    passed INTEGER
+);
+CREATE TABLE IF NOT EXISTS endpoint_stats (
+    run_id INTEGER NOT NULL REFERENCES runs(id) ON DELETE CASCADE,
+    endpoint TEXT NOT NULL,
+    count INTEGER NOT NULL,
+    errors INTEGER NOT NULL,
+    min_ms REAL, p50_ms REAL, p95_ms REAL, p99_ms REAL, max_ms REAL, mean_ms REAL,
+    PRIMARY KEY (run_id, endpoint)
+);
+CREATE TABLE IF NOT EXISTS samples (
+    run_id INTEGER NOT NULL REFERENCES runs(id) ON DELETE CASCADE,
+    endpoint TEXT NOT NULL,
+    latency_ms REAL NOT NULL
+);
+-- Trend queries walk one endpoint's rows newest-first, then filter runs by scenario/target
+CREATE INDEX IF NOT EXISTS endpoint_stats_by_endpoint ON endpoint_stats (endpoint, run_id);
+CREATE INDEX IF NOT EXISTS runs_by_scenario ON runs (scenario, target, id);
+CREATE INDEX IF NOT EXISTS samples_by_run ON samples (run_id, endpoint);
+"""
+
+
+def normalize_endpoint(endpoint: str) -> str:
+    """'/api/products' -> 'GET /api/products'; keys already carrying a method are left alone"""
+    method, _, rest = endpoint.partition(" ")
+    return endpoint if rest and method.isupper() else f"GET {endpoint}"
+
+
+class ResultsStore:
+    """SQLite-backed run history: one row per run, one per endpoint per run, optionally every raw sample"""
+
+    def __init__(self, path: str = DEFAULT_HISTORY_DB):
+        self.path = path
+        self.db = sqlite3.connect(path)
+        self.db.row_factory = sqlite3.Row
+        self.db.execute("PRAGMA foreign_keys = ON")
+        self.db.execute("PRAGMA journal_mode = WAL")
+        if self.db.execute("PRAGMA user_version").fetchone()[0] < SCHEMA_VERSION:
+            with self.db:
+                self.db.executescript(SCHEMA)
+                self.db.execute(f"PRAGMA user_version = {SCHEMA_VERSION}")
+
+    def close(self):
+        self.db.close()
+
+    def __enter__(self) -> "ResultsStore":
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def record_run(self, target: str, scenario: str, endpoints: Dict[str, Dict[str, Any]],
+                   samples: Optional[Dict[str, List[float]]] = None, git_commit: Optional[str] = None,
+                   started_at: Optional[str] = None, finished_at: Optional[str] = None,
+                   passed: Optional[bool] = None) -> int:
+        """Insert one run; endpoints maps key -> summarize_latencies()-shaped dict plus 'errors'"""
+        with self.db:
+            run_id = self.db.execute(
+                "INSERT INTO runs (started_at, finished_at, git_commit, target, scenario, passed) "
+                "VALUES (COALESCE(?, strftime('%Y-%m-%dT%H:%M:%S', 'now', 'localtime')), "
+                "COALESCE(?, strftime('%Y-%m-%dT%H:%M:%S', 'now', 'localtime')), ?, ?, ?, ?)",
+                (started_at, finished_at, git_commit, target, scenario, None if passed is None else int(passed)),
+            ).lastrowid
+            self.db.executemany(
+                "INSERT INTO endpoint_stats VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                [(run_id, key, s['count'], s.get('errors', 0), *((s[m] if s['count'] else None)
+                                                                 for m in ("min", "p50", "p95", "p99", "max", "mean")))
+                 for key, s in endpoints.items()],
+            )
+            if samples:
+                self.db.executemany("INSERT INTO samples VALUES (?, ?, ?)",
+                                    [(run_id, key, ms) for key, values in samples.items() for ms in values])
+        return run_id
+
+    def runs(self, last: int = 20, scenario: Optional[str] = None, target: Optional[str] = None) -> List[sqlite3.Row]:
+        """Newest runs first, with how many endpoints each recorded"""
+        clauses, params = self._filters(scenario, target)
+        where = f"WHERE {' AND '.join(clauses)}" if clauses else ""
+        return self.db.execute(
+            f"SELECT r.*, (SELECT COUNT(*) FROM endpoint_stats s WHERE s.run_id = r.id) AS endpoints "
+            f"FROM runs r {where} ORDER BY r.id DESC LIMIT ?", (*params, last)).fetchall()
+
+    def endpoints(self, run_id: Optional[int] = None) -> List[sqlite3.Row]:
+        """Endpoint stats of one run (default: the latest)"""
+        if run_id is None:
+            run_id = self.db.execute("SELECT COALESCE(MAX(id), -1) FROM runs").fetchone()[0]
+        return self.db.execute("SELECT * FROM endpoint_stats WHERE run_id = ? ORDER BY endpoint", (run_id,)).fetchall()
+
+    def trend(self, endpoint: str, metric: str = "p95", last: int = 30, scenario: Optional[str] = None,
+              target: Optional[str] = None) -> List[sqlite3.Row]:
+        """metric for one endpoint over the last `last` matching runs, oldest first"""
+        clauses, params = self._filters(scenario, target)
+        rows = self.db.execute(
+            f"SELECT r.id AS run_id, r.started_at, r.git_commit, r.target, r.scenario, s.count, s.errors, "
+            f"s.{METRICS[metric]} AS value FROM endpoint_stats s JOIN runs r ON r.id = s.run_id "
+            f"WHERE {' AND '.join(['s.endpoint = ?'] + clauses)} ORDER BY s.run_id DESC LIMIT ?",
+            (normalize_endpoint(endpoint), *params, last)).fetchall()
+        return rows[::-1]
+
+    def samples(self, run_id: int, endpoint: str) -> List[float]:
+        return [row[0] for row in self.db.execute("SELECT latency_ms FROM samples WHERE run_id = ? AND endpoint = ?",
+                                                  (run_id, normalize_endpoint(endpoint)))]
+
+    @staticmethod
+    def _filters(scenario: Optional[str], target: Optional[str]):
+        clauses, params = [], []
+        if scenario:
+            clauses.append("r.scenario = ?")
+            params.append(scenario)
+        if target:
+            clauses.append("r.target = ?")
+            params.append(target)
+        return clauses, params
+
+
+# ===== REPORTS =====
+
+def print_runs(rows: List[sqlite3.Row]):
+    print(f"   {'run':>5}  {'started':<19}  {'commit':<9} {'scenario':<20} {'endpoints':>9} {'result':>7}  target")
+    for r in rows:
+        result = {None: "-", 1: "pass", 0: "FAIL"}[r['passed']]
+        print(f"   {r['id']:>5}  {r['started_at']:<19}  {r['git_commit'] or '-':<9} {r['scenario'][:20]:<20} "
+              f"{r['endpoints']:>9} {result:>7}  {r['target']}")
+
+
+def print_endpoints(rows: List[sqlite3.Row]):
+    print(f"   {'Endpoint':<48} {'n':>6} {'err':>5} {'p50 ms':>8} {'p95 ms':>8} {'p99 ms':>8} {'max ms':>8}")
+    fmt = lambda v: f"{v:.1f}" if v is not None else "-"
+    for r in rows:
+        print(f"   {r['endpoint'][:48]:<48} {r['count']:>6} {r['errors']:>5} {fmt(r['p50_ms']):>8} "
+              f"{fmt(r['p95_ms']):>8} {fmt(r['p99_ms']):>8} {fmt(r['max_ms']):>8}")
+
+
+def print_trend(endpoint: str, metric: str, rows: List[sqlite3.Row], width: int = 40):
+    """One line per run with a bar scaled to the largest value, then latest vs median of the earlier runs"""
+    values = [r['value'] for r in rows if r['value'] is not None]
+    print(f"📈 {metric} of {normalize_endpoint(endpoint)} over {len(rows)} runs")
+    if not values:
+        print("   no data")
+        return
+    peak = max(values) or 1
+    for r in rows:
+        value = r['value']
+        bar = "█" * max(1, round(value / peak * width)) if value else ""
+        shown = f"{value:.1f}" if value is not None else "-"
+        print(f"   {r['run_id']:>5}  {r['started_at']:<19}  {r['git_commit'] or '-':<9} {shown:>9}  {bar}")
+    if len(values) > 1:
+        earlier = sorted(values[:-1])
+        median = earlier[len(earlier) // 2]
+        change = (values[-1] - median) / median * 100 if median else 0.0
+        print(f"   latest {values[-1]:.1f} vs median {median:.1f} of the previous {len(earlier)} runs ({change:+.1f}%)")
+
+
+def main():
+    """Query stored runs: list them, show one run's endpoints, or trend a metric for one endpoint"""
+    parser = argparse.ArgumentParser(description="Trend queries over recorded API test and load runs")
+    parser.add_argument("--db", default=DEFAULT_HISTORY_DB, help="History database (default: %(default)s)")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    runs = commands.add_parser("runs", help="List recent runs")
+    trend = commands.add_parser("trend", help="One metric of one endpoint across runs")
+    trend.add_argument("endpoint", help="Endpoint key, e.g. 'GET /api/products' (a bare path means GET)")
+    trend.add_argument("--metric", choices=sorted(METRICS), default="p95")
+    for sub in (runs, trend):
+        sub.add_argument("--last", type=int, default=30, help="Most recent N matching runs (default: %(default)s)")
+        sub.add_argument("--scenario", help="Only runs recorded under this scenario name, e.g. nightly")
+        sub.add_argument("--target", help="Only runs against this base URL")
+    endpoints = commands.add_parser("endpoints", help="Per-endpoint aggregates of one run")
+    endpoints.add_argument("--run", type=int, help="Run id (default: latest)")
+    args = parser.parse_args()
+
+    with ResultsStore(args.db) as store:
+        if args.command == "runs":
+            rows = store.runs(args.last, args.scenario, args.target)
+            print(f"🗄️  {len(rows)} most recent runs in {args.db}")
+            print_runs(rows)
+        elif args.command == "endpoints":
+            rows = store.endpoints(args.run)
+            print(f"🗄️  Run {args.run or 'latest'}: {len(rows)} endpoints")
+            print_endpoints(rows)
+        else:
+            rows = store.trend(args.endpoint, args.metric, args.last, args.scenario, args.target)
+            print_trend(args.endpoint, args.metric, rows)
+            if not rows:
+                sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,283 @@
+#!/usr/bin/env python3
+"""
+Storefront customer-journey simulator for the Gibbon Nutrition API
+Virtual shoppers browse, read reviews, check promo codes and check out with think times between steps
+"""
+
+import argparse
+import math
+import random
+import sys
+import threading
+import time
+from typing import Dict, Any, Optional, List, Callable
+
+import requests
+
+from backend_test import BASE_URL, APITester, CreatedOrders, order_payload, percentile, summarize_latencies
+from backend_load import load_session
+
+
+# ===== THINK TIMES =====
+
+def parse_think_time(spec: str) -> Callable[[random.Random], float]:
+    """'const:2', 'uniform:1-5', 'exp:3' (mean) or 'lognormal:2,0.6' (median, sigma) -> sampler in seconds"""
+    kind, _, args = spec.partition(":")
+    if kind == "const":
+        value = float(args)
+        return lambda rng: value
+    if kind == "uniform":
+        low, high = (float(x) for x in args.split("-"))
+        return lambda rng: rng.uniform(low, high)
+    if kind == "exp":
+        mean = float(args)
+        return lambda rng: rng.expovariate(1.0 / mean) if mean > 0 else 0.0
+    if kind == "lognormal":
+        median, sigma = (float(x) for x in args.split(","))
+        return lambda rng: rng.lognormvariate(math.log(median), sigma)
+    raise ValueError(f"Unknown think-time distribution: {spec}")
+
+
+# ===== JOURNEY STEPS =====
+
+class ShopperContext:
+    """Per-virtual-user state carried between the steps of a journey"""
+
+    def __init__(self, tester: APITester, session: requests.Session, rng: random.Random):
+        self.tester = tester
+        self.session = session
+        self.rng = rng
+        self.product: Optional[Dict[str, Any]] = None
+
+
+def step_browse(ctx: ShopperContext) -> requests.Response:
+    response = ctx.session.get(f"{ctx.tester.base_url}/api/products")
+    if response.status_code == 200:
+        products = [p for p in response.json().get('products', []) if p.get('handle')]
+        ctx.product = ctx.rng.choice(products) if products else None
+    return response
+
+
+def _handle(ctx: ShopperContext) -> str:
+    if ctx.product:
+        return ctx.product['handle']
+    return ctx.rng.choice(ctx.tester.test_product_handles)
+
+
+def step_product(ctx: ShopperContext) -> requests.Response:
+    return ctx.session.get(f"{ctx.tester.base_url}/api/products/{_handle(ctx)}")
+
+
+def step_reviews(ctx: ShopperContext) -> requests.Response:
+    return ctx.session.get(f"{ctx.tester.base_url}/api/product-reviews/{_handle(ctx)}")
+
+
+def _cart_line(ctx: ShopperContext) -> Dict[str, Any]:
+    product = ctx.product or {}
+    variant = (product.get('variants') or [{}])[0]
+    return {
+        'productId': product.get('_id', "test"),
+        'variantId': variant.get('_id'),
+        'price': variant.get('price') or 600,
+    }
+
+
+def step_promo(ctx: ShopperContext) -> requests.Response:
+    line = _cart_line(ctx)
+    return ctx.session.post(
+        f"{ctx.tester.base_url}/api/promoCode/check",
+        json={"code": "WELCOME10", "cartItems": [{"productId": line['productId'], "quantity": 1, "price": line['price']}]}
+    )
+
+
+def step_checkout(ctx: ShopperContext) -> requests.Response:
+    line = _cart_line(ctx)
+    return ctx.session.post(
+        f"{ctx.tester.base_url}/api/orders/create",
+        json=order_payload(line['productId'], line['variantId'], line['price'])
+    )
+
+
+STEPS: Dict[str, Callable[[ShopperContext], requests.Response]] = {
+    "browse": step_browse,
+    "product": step_product,
+    "reviews": step_reviews,
+    "promo": step_promo,
+    "checkout": step_checkout,
+}
+
+# Status codes each step treats as a normal business outcome
+ACCEPTED_STATUSES = {
+    "promo": {200, 400, 404, 410},
+}
+
+JOURNEYS: Dict[str, List[str]] = {
+    "bouncer": ["browse"],
+    "browser": ["browse", "product", "reviews"],
+    "researcher": ["browse", "product", "reviews", "browse", "product", "reviews"],
+    "buyer": ["browse", "product", "reviews", "promo", "checkout"],
+}
+
+DEFAULT_MIX = "bouncer=30,browser=40,researcher=20,buyer=10"
+
+
+def parse_mix(spec: str) -> Dict[str, float]:
+    mix = {}
+    for part in spec.split(","):
+        name, _, weight = part.partition("=")
+        if name.strip() not in JOURNEYS:
+            raise ValueError(f"Unknown journey '{name}' (known: {', '.join(JOURNEYS)})")
+        mix[name.strip()] = float(weight)
+    return mix
+
+
+# ===== SIMULATOR =====
+
+class StageResult:
+    """Step latencies, failures and completed journeys for one concurrency level"""
+
+    def __init__(self, users: int):
+        self.users = users
+        self.step_ms: Dict[str, List[float]] = {}
+        self.step_errors: Dict[str, int] = {}
+        self.journeys: Dict[str, int] = {}
+        self.failed_journeys = 0
+        self.wall_s = 0.0
+        self._lock = threading.Lock()
+
+    def record_step(self, step: str, latency_ms: float, ok: bool):
+        with self._lock:
+            self.step_ms.setdefault(step, []).append(latency_ms)
+            if not ok:
+                self.step_errors[step] = self.step_errors.get(step, 0) + 1
+
+    def record_journey(self, journey: str, ok: bool):
+        with self._lock:
+            if ok:
+                self.journeys[journey] = self.journeys.get(journey, 0) + 1
+            else:
+                self.failed_journeys += 1
+
+    def error_rate(self) -> float:
+        steps = sum(len(v) for v in self.step_ms.values())
+        return sum(self.step_errors.values()) / steps if steps else 0.0
+
+    def worst_p95(self) -> float:
+        return max((percentile(v, 95) for v in self.step_ms.values()), default=0.0)
+
+
+def run_stage(tester: APITester, users: int, duration: float, mix: Dict[str, float],
+              think: Callable[[random.Random], float], pacing: Callable[[random.Random], float],
+              seed: int = 0) -> StageResult:
+    """Run `users` virtual shoppers for `duration` seconds"""
+    result = StageResult(users)
+    names, weights = list(mix), list(mix.values())
+    deadline = time.perf_counter() + duration
+
+    def virtual_user(index: int):
+        rng = random.Random(seed * 100003 + index)
+        # One attempt per step and no shared breaker, like the load runner: retries and an open circuit would hide errors
+        ctx = ShopperContext(tester, load_session(tester), rng)
+        try:
+            # Stagger arrivals so users don't move in lockstep
+            time.sleep(rng.uniform(0, min(duration / 4, 5.0)))
+            while time.perf_counter() < deadline:
+                journey = rng.choices(names, weights)[0]
+                ctx.product = None
+                journey_ok = True
+                for i, step in enumerate(JOURNEYS[journey]):
+                    if i and time.perf_counter() >= deadline:
+                        # Cut off by the end of the stage; neither completed nor failed
+                        return
+                    started = time.perf_counter()
+                    try:
+                        status = STEPS[step](ctx).status_code
+                        ok = status in ACCEPTED_STATUSES.get(step, range(200, 300))
+                    except Exception:
+                        ok = False
+                    result.record_step(step, (time.perf_counter() - started) * 1000, ok)
+                    journey_ok = journey_ok and ok
+                    if not ok:
+                        break
+                    time.sleep(think(rng))
+                result.record_journey(journey, journey_ok)
+                time.sleep(pacing(rng))
+        finally:
+            ctx.session.close()
+
+    threads = [threading.Thread(target=virtual_user, args=(i,), daemon=True) for i in range(users)]
+    started = time.perf_counter()
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    result.wall_s = time.perf_counter() - started
+    return result
+
+
+def print_stage(result: StageResult):
+    completed = sum(result.journeys.values())
+    per_min = completed / result.wall_s * 60 if result.wall_s else 0.0
+    print(f"\n👥 {result.users} shoppers: {completed} journeys ({per_min:.1f}/min), "
+          f"{result.failed_journeys} failed, step error rate {result.error_rate() * 100:.2f}%")
+    print(f"   journeys: " + ", ".join(f"{k}={v}" for k, v in sorted(result.journeys.items())))
+    for step in STEPS:
+        samples = result.step_ms.get(step)
+        if samples:
+            s = summarize_latencies(samples)
+            print(f"   {step:<10} n={s['count']:<6} p50={s['p50']:.0f}ms p95={s['p95']:.0f}ms p99={s['p99']:.0f}ms "
+                  f"errors={result.step_errors.get(step, 0)}")
+
+
+def main():
+    """Simulate concurrent shoppers, optionally sweeping user counts to find capacity"""
+    parser = argparse.ArgumentParser(description="Storefront customer-journey simulator")
+    parser.add_argument("--base-url", default=BASE_URL, help="Target deployment (default: %(default)s)")
+    parser.add_argument("--users", default="10", help="Concurrent shoppers, or a sweep like 10,25,50,100")
+    parser.add_argument("--duration", type=float, default=60.0, help="Seconds per stage (default: %(default)s)")
+    parser.add_argument("--mix", default=DEFAULT_MIX, help="Journey weights (default: %(default)s)")
+    parser.add_argument("--think", default="lognormal:3,0.6", help="Think time between steps (default: %(default)s)")
+    parser.add_argument("--pacing", default="exp:10", help="Pause between journeys (default: %(default)s)")
+    parser.add_argument("--p95-limit", type=float, default=1000.0,
+                        help="A stage is sustainable while every step's p95 is under this many ms (default: %(default)s)")
+    parser.add_argument("--max-error-rate", type=float, default=0.01,
+                        help="A stage is sustainable while the step error rate stays under this (default: %(default)s)")
+    parser.add_argument("--seed", type=int, default=1)
+    parser.add_argument("--allow-orders", action="store_true",
+                        help="Required when the mix checks out: places real orders, cancelled after the run")
+    args = parser.parse_args()
+
+    mix = parse_mix(args.mix)
+    if any(mix[name] > 0 and "checkout" in JOURNEYS[name] for name in mix) and not args.allow_orders:
+        parser.error(f"the mix includes checkout, which places real orders on {args.base_url}; "
+                     f"pass --allow-orders to confirm or drop buyer from --mix")
+    tester = APITester(args.base_url)
+    created = CreatedOrders()
+    created.attach(tester.session)
+    think, pacing = parse_think_time(args.think), parse_think_time(args.pacing)
+    levels = [int(u) for u in args.users.split(",")]
+
+    print(f"🛒 Customer-journey simulation: {args.users} shoppers, {args.duration:g}s per stage")
+    print(f"📍 Base URL: {args.base_url}")
+    print(f"   mix {args.mix}; think {args.think}; pacing {args.pacing}")
+    print("=" * 60)
+
+    supported = 0
+    for users in levels:
+        result = run_stage(tester, users, args.duration, mix, think, pacing, args.seed)
+        print_stage(result)
+        sustainable = result.worst_p95() <= args.p95_limit and result.error_rate() <= args.max_error_rate
+        print(f"   {'✅ sustainable' if sustainable else '❌ over capacity'} "
+              f"(worst step p95 {result.worst_p95():.0f}ms, errors {result.error_rate() * 100:.2f}%)")
+        if not sustainable:
+            break
+        supported = users
+
+    print("\n" + "=" * 60)
+    print(f"📊 Supported concurrent shoppers: {supported if supported else f'fewer than {levels[0]}'}")
+    tester.cancel_created_orders(created, "Journey simulation cleanup")
+    sys.exit(0 if supported == levels[-1] else 1)
+
+
+if __name__ == "__main__":
+    main()
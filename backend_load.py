@@ -0,0 +1,425 @@
+#!/usr/bin/env python3
+"""
+Open-loop load generation for the Gibbon Nutrition storefront API
+Schedules requests at intended start times so stalls show up in the tail instead of being omitted
+"""
+
+import argparse
+import math
+import random
+import sys
+import threading
+import time
+from contextlib import nullcontext
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, Any, Optional, List, Callable
+
+import requests
+
+from backend_test import (BASE_URL, PROMO_CHECK, APITester, CircuitBreaker, CreatedOrders, ResilientSession, order_payload,
+                          percentile, record_history)
+from backend_history import DEFAULT_HISTORY_DB
+from backend_dashboard import attach_dashboard
+
+REPORT_PERCENTILES = (50, 90, 99, 99.9)
+
+
+# ===== LOAD TARGETS =====
+
+def promo_check(tester: APITester, session: requests.Session) -> requests.Response:
+    return session.post(f"{tester.base_url}/api/promoCode/check", json=PROMO_CHECK)
+
+
+_order_lines: Dict[str, Dict[str, Any]] = {}
+_order_lines_lock = threading.Lock()
+
+
+def order_line(tester: APITester) -> Dict[str, Any]:
+    """productId/variantId/price of the first test product, fetched once; /api/orders/create needs a real ObjectId"""
+    with _order_lines_lock:
+        if tester.base_url not in _order_lines:
+            handle = tester.test_product_handles[0]
+            response = tester.session.get(f"{tester.base_url}/api/products/{handle}")
+            product = (response.json().get('data') or {}) if response.status_code == 200 else {}
+            if not product.get('_id'):
+                raise RuntimeError(f"No product _id for {handle} (HTTP {response.status_code})")
+            variant = (product.get('variants') or [{}])[0]
+            _order_lines[tester.base_url] = {'product_id': product['_id'], 'variant_id': variant.get('_id'),
+                                             'price': variant.get('price') or 600}
+        return _order_lines[tester.base_url]
+
+
+def orders_create(tester: APITester, session: requests.Session) -> requests.Response:
+    return session.post(f"{tester.base_url}/api/orders/create", json=order_payload(**order_line(tester)))
+
+
+def products_list(tester: APITester, session: requests.Session) -> requests.Response:
+    return session.get(f"{tester.base_url}/api/products")
+
+
+def product_detail(tester: APITester, session: requests.Session) -> requests.Response:
+    return session.get(f"{tester.base_url}/api/products/{tester.test_product_handles[0]}")
+
+
+def product_reviews(tester: APITester, session: requests.Session) -> requests.Response:
+    return session.get(f"{tester.base_url}/api/product-reviews/{tester.test_product_handles[0]}")
+
+
+LOAD_TARGETS: Dict[str, Callable[[APITester, requests.Session], requests.Response]] = {
+    "promo-check": promo_check,
+    "orders-create": orders_create,
+    "products": products_list,
+    "product": product_detail,
+    "product-reviews": product_reviews,
+}
+
+
+# ===== OPEN-LOOP RUNNER =====
+
+def load_session(tester: APITester) -> ResilientSession:
+    """Worker session that sends every scheduled request exactly once: no retries and a breaker that never opens"""
+    session = tester.session.clone()
+    session.max_retries = 0
+    session.breaker = CircuitBreaker(failure_threshold=math.inf)
+    return session
+
+
+def arrival_schedule(rate: float, duration: float, arrival: str = "constant", seed: int = 0) -> List[float]:
+    """Intended start offsets (seconds from t0) for a target rate in requests/second"""
+    if arrival == "constant":
+        return [i / rate for i in range(int(rate * duration))]
+    if arrival == "poisson":
+        rng = random.Random(seed)
+        offsets, t = [], 0.0
+        while True:
+            t += rng.expovariate(rate)
+            if t >= duration:
+                return offsets
+            offsets.append(t)
+    raise ValueError(f"Unknown arrival process: {arrival}")
+
+
+class LoadResult:
+    """Per-request samples of one run: intended start, actual start, end, status, error and whether it timed out"""
+
+    def __init__(self):
+        self.samples: List[Dict[str, Any]] = []
+        self.wall_s = 0.0
+        self._lock = threading.Lock()
+
+    def add(self, sample: Dict[str, Any]):
+        with self._lock:
+            self.samples.append(sample)
+
+    def completed(self) -> List[Dict[str, Any]]:
+        return [s for s in self.samples if s['error'] is None]
+
+    def timeouts(self) -> int:
+        return sum(1 for s in self.samples if s.get('timed_out'))
+
+    def measured(self) -> List[Dict[str, Any]]:
+        """Completed requests plus timeouts, which count at the time the client gave up (a lower bound)"""
+        return [s for s in self.samples if s['error'] is None or s.get('timed_out')]
+
+    def raw_ms(self) -> List[float]:
+        """Service time: measured from when the request was actually sent"""
+        return [(s['end'] - s['actual']) * 1000 for s in self.measured()]
+
+    def corrected_ms(self) -> List[float]:
+        """Response time: measured from when the request should have been sent"""
+        return [(s['end'] - s['intended']) * 1000 for s in self.measured()]
+
+    def error_rate(self) -> float:
+        if not self.samples:
+            return 0.0
+        failed = sum(1 for s in self.samples if s['error'] is not None or (s['status'] or 0) >= 500)
+        return failed / len(self.samples)
+
+    def throughput(self) -> float:
+        return len(self.completed()) / self.wall_s if self.wall_s else 0.0
+
+    def max_lag_ms(self) -> float:
+        return max(((s['actual'] - s['intended']) * 1000 for s in self.samples), default=0.0)
+
+
+def run_open_loop(send: Callable[[requests.Session], requests.Response], session_factory: Callable[[], requests.Session],
+                  rate: float, duration: float, concurrency: int = 64, arrival: str = "constant",
+                  seed: int = 0, schedule: Optional[List[float]] = None) -> LoadResult:
+    """Issue requests at scheduled times regardless of how long earlier ones take"""
+    if schedule is None:
+        schedule = arrival_schedule(rate, duration, arrival, seed)
+    result = LoadResult()
+    next_index = iter(range(len(schedule)))
+    index_lock = threading.Lock()
+    t0 = time.perf_counter() + 0.1
+
+    def worker():
+        session = session_factory()
+        while True:
+            with index_lock:
+                i = next(next_index, None)
+            if i is None:
+                break
+            intended = t0 + schedule[i]
+            delay = intended - time.perf_counter()
+            if delay > 0:
+                time.sleep(delay)
+            actual = time.perf_counter()
+            status, error, timed_out = None, None, False
+            try:
+                response = send(session)
+                status = response.status_code
+            except requests.exceptions.Timeout as e:
+                error, timed_out = str(e), True
+            except Exception as e:
+                error = str(e)
+            result.add({'intended': intended, 'actual': actual, 'end': time.perf_counter(),
+                        'status': status, 'error': error, 'timed_out': timed_out})
+        session.close()
+
+    with ThreadPoolExecutor(max_workers=concurrency) as pool:
+        for _ in range(concurrency):
+            pool.submit(worker)
+    result.wall_s = time.perf_counter() - t0
+    return result
+
+
+def run_closed_loop(send: Callable[[requests.Session], requests.Response], session_factory: Callable[[], requests.Session],
+                    duration: float, concurrency: int = 1) -> LoadResult:
+    """run_all_tests-style back-to-back requests; intended start equals actual start"""
+    result = LoadResult()
+    deadline = time.perf_counter() + duration
+
+    def worker():
+        session = session_factory()
+        while time.perf_counter() < deadline:
+            actual = time.perf_counter()
+            status, error, timed_out = None, None, False
+            try:
+                status = send(session).status_code
+            except requests.exceptions.Timeout as e:
+                error, timed_out = str(e), True
+            except Exception as e:
+                error = str(e)
+            result.add({'intended': actual, 'actual': actual, 'end': time.perf_counter(),
+                        'status': status, 'error': error, 'timed_out': timed_out})
+        session.close()
+
+    started = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency) as pool:
+        for _ in range(concurrency):
+            pool.submit(worker)
+    result.wall_s = time.perf_counter() - started
+    return result
+
+
+def correct_coordinated_omission(samples_ms: List[float], expected_interval_ms: float) -> List[float]:
+    """HdrHistogram-style correction: backfill the requests a stalled closed loop never sent"""
+    if expected_interval_ms <= 0:
+        return list(samples_ms)
+    corrected = []
+    for value in samples_ms:
+        corrected.append(value)
+        missing = value - expected_interval_ms
+        while missing >= expected_interval_ms:
+            corrected.append(missing)
+            missing -= expected_interval_ms
+    return corrected
+
+
+def format_percentiles(samples: List[float]) -> str:
+    if not samples:
+        return "no samples"
+    parts = [f"p{p:g}={percentile(samples, p):.1f}" for p in REPORT_PERCENTILES]
+    return " ".join(parts) + f" max={max(samples):.1f} ms"
+
+
+def print_load_report(name: str, result: LoadResult, raw: List[float], corrected: List[float]):
+    print(f"\n📈 {name}: {len(result.samples)} requests in {result.wall_s:.1f}s "
+          f"({result.throughput():.1f} req/s, errors {result.error_rate() * 100:.2f}%)")
+    print(f"   raw:       {format_percentiles(raw)}")
+    print(f"   corrected: {format_percentiles(corrected)}")
+    if result.timeouts():
+        print(f"   ⏱️  {result.timeouts()} timed out; counted in the percentiles at the time the client gave up")
+    if raw and corrected and percentile(corrected, 99) > 2 * percentile(raw, 99):
+        print("   ⚠️  Corrected p99 is more than 2x raw p99 - the server stalled and requests queued behind it")
+
+
+# ===== SATURATION FINDER =====
+
+def rate_plan(start_rate: float, max_rate: float, step: float = 0.0, factor: float = 1.5) -> List[float]:
+    """Offered rates for each step: additive when step > 0, otherwise geometric by factor"""
+    if step <= 0 and (factor <= 1 or start_rate <= 0):
+        raise ValueError(f"Rates never grow from {start_rate:g}/s with step {step:g} and factor {factor:g}")
+    rates, rate = [], start_rate
+    while rate <= max_rate + 1e-9:
+        rates.append(rate)
+        rate = rate + step if step > 0 else rate * factor
+    return rates
+
+
+def find_saturation(send: Callable[[requests.Session], requests.Response], session_factory: Callable[[], requests.Session],
+                    rates: List[float], step_duration: float, concurrency: int = 256,
+                    min_gain_ratio: float = 0.5, latency_factor: float = 5.0, p99_limit: Optional[float] = None,
+                    max_error_rate: float = 0.01) -> Dict[str, Any]:
+    """Step through offered rates until throughput stops growing, p99 explodes or errors climb
+
+    session_factory should give breaker-less, retry-free sessions (see load_session): each step's workers start
+    fresh, so a breaker opened at one rate cannot fail the next step's requests instantly.
+    """
+    steps = []
+    best_throughput = 0.0
+    previous_rate = 0.0
+    baseline_p99 = None
+    sustainable = None
+    knee_reason = None
+
+    for rate in rates:
+        result = run_open_loop(send, session_factory, rate, step_duration, concurrency)
+        corrected = result.corrected_ms()
+        p99 = percentile(corrected, 99)
+        throughput = result.throughput()
+        error_rate = result.error_rate()
+        baseline_p99 = p99 if baseline_p99 is None else baseline_p99
+        steps.append({'offered': rate, 'throughput': throughput, 'p50': percentile(corrected, 50),
+                      'p99': p99, 'error_rate': error_rate})
+        print(f"   offered {rate:>8.1f}/s  achieved {throughput:>8.1f}/s  p50 {percentile(corrected, 50):>8.1f}ms  "
+              f"p99 {p99:>8.1f}ms  errors {error_rate * 100:>5.2f}%")
+
+        if error_rate > max_error_rate:
+            knee_reason = f"error rate {error_rate * 100:.2f}% > {max_error_rate * 100:.2f}%"
+        elif p99_limit is not None and p99 > p99_limit:
+            knee_reason = f"p99 {p99:.0f}ms > limit {p99_limit:.0f}ms"
+        elif baseline_p99 and p99 > latency_factor * baseline_p99:
+            knee_reason = f"p99 {p99:.0f}ms > {latency_factor:g}x baseline {baseline_p99:.0f}ms"
+        elif best_throughput and throughput - best_throughput < min_gain_ratio * (rate - previous_rate):
+            # Extra offered load is no longer turning into extra completions
+            knee_reason = f"throughput stalled at {throughput:.1f}/s (best {best_throughput:.1f}/s)"
+        elif throughput < rate * 0.9:
+            knee_reason = f"achieved {throughput:.1f}/s is under 90% of offered {rate:.1f}/s"
+        if knee_reason:
+            break
+        best_throughput = max(best_throughput, throughput)
+        previous_rate = rate
+        sustainable = steps[-1]
+
+    return {'steps': steps, 'sustainable': sustainable, 'knee_reason': knee_reason}
+
+
+def main():
+    """Open-loop load run, or a saturation search, against checkout/read targets"""
+    parser = argparse.ArgumentParser(description="Open-loop load with coordinated-omission correction")
+    parser.add_argument("--base-url", default=BASE_URL, help="Target deployment (default: %(default)s)")
+    parser.add_argument("--target", action="append", choices=sorted(LOAD_TARGETS),
+                        help="Target to load (repeatable, default: promo-check)")
+    parser.add_argument("--rate", type=float, default=20.0, help="Intended requests per second (default: %(default)s)")
+    parser.add_argument("--duration", type=float, default=30.0, help="Seconds to run (default: %(default)s)")
+    parser.add_argument("--concurrency", type=int, default=64, help="Maximum in-flight requests (default: %(default)s)")
+    parser.add_argument("--arrival", choices=["constant", "poisson"], default="constant")
+    parser.add_argument("--closed-loop", action="store_true",
+                        help="Send back-to-back instead (legacy behaviour) and correct with the --rate interval")
+    parser.add_argument("--p99-slo", type=float, help="Fail if corrected p99 (ms) exceeds this")
+    parser.add_argument("--saturate", action="store_true",
+                        help="Increase load from --start-rate until the knee and report the maximum sustainable rate")
+    parser.add_argument("--start-rate", type=float, default=5.0, help="First offered rate for --saturate (default: %(default)s)")
+    parser.add_argument("--max-rate", type=float, default=2000.0, help="Upper bound for --saturate (default: %(default)s)")
+    parser.add_argument("--step", type=float, default=0.0,
+                        help="Additive rate increase per step; 0 means multiply by --factor (default: %(default)s)")
+    parser.add_argument("--factor", type=float, default=1.5, help="Geometric rate increase per step (default: %(default)s)")
+    parser.add_argument("--step-duration", type=float, default=20.0, help="Seconds per step (default: %(default)s)")
+    parser.add_argument("--ramp", type=float, metavar="SECONDS",
+                        help="Continuous ramp from --start-rate to --max-rate over SECONDS, evaluated in 2s windows")
+    parser.add_argument("--dashboard", action="store_true", help="Show a live terminal dashboard while the load runs")
+    parser.add_argument("--refresh", type=float, default=4.0, help="Dashboard redraws per second (default: %(default)s)")
+    parser.add_argument("--history", nargs="?", const=DEFAULT_HISTORY_DB, metavar="DB",
+                        help="Append per-endpoint results to a SQLite history (default DB: %(const)s)")
+    parser.add_argument("--scenario", help="Run label stored with --history (default: load:<targets>)")
+    parser.add_argument("--history-samples", action="store_true", help="Also store every raw latency sample")
+    parser.add_argument("--allow-orders", action="store_true",
+                        help="Required for orders-create: places real orders, cancelled after the run")
+    args = parser.parse_args()
+    if args.saturate and not args.ramp and args.step <= 0 and (args.factor <= 1 or args.start_rate <= 0):
+        parser.error("--saturate needs --step > 0, or --factor > 1 with a positive --start-rate")
+
+    targets = args.target or ["promo-check"]
+    if "orders-create" in targets and not args.allow_orders:
+        parser.error(f"orders-create places real orders on {args.base_url}; pass --allow-orders to confirm")
+
+    started_at = time.strftime("%Y-%m-%dT%H:%M:%S")
+    tester = APITester(args.base_url)
+    created = CreatedOrders()
+    created.attach(tester.session)
+    dashboard = attach_dashboard(tester, args.refresh, "Load: " + ", ".join(targets)) if args.dashboard else None
+    with dashboard.running() if dashboard else nullcontext():
+        success = run_targets(args, tester, targets)
+    tester.session.stats.print_report()
+    if args.history:
+        scenario = args.scenario or "load:" + ",".join(targets)
+        run_id = record_history(args.history, tester.session.stats, args.base_url, scenario, started_at,
+                                success, args.history_samples)
+        print(f"🗄️  Recorded run {run_id} ({scenario}) in {args.history}")
+    tester.cancel_created_orders(created, "Load test cleanup")
+    sys.exit(0 if success else 1)
+
+
+def run_targets(args: argparse.Namespace, tester: APITester, targets: List[str]) -> bool:
+    """Run the saturation search or fixed-rate load for each target; True when every check passed"""
+    if "orders-create" in targets:
+        try:
+            order_line(tester)
+        except RuntimeError as e:
+            print(f"❌ orders-create needs a real product: {e}")
+            return False
+    session_factory = lambda: load_session(tester)
+
+    if args.saturate or args.ramp:
+        if args.ramp:
+            windows = max(1, int(args.ramp / 2.0))
+            rates = [args.start_rate + (args.max_rate - args.start_rate) * i / max(1, windows - 1) for i in range(windows)]
+            step_duration = args.ramp / windows
+        else:
+            rates = rate_plan(args.start_rate, args.max_rate, args.step, args.factor)
+            step_duration = args.step_duration
+
+        summary = {}
+        for name in targets:
+            target = LOAD_TARGETS[name]
+            print(f"\n🔍 Saturation search: {name} ({len(rates)} steps of {step_duration:g}s, up to {rates[-1]:.1f}/s)")
+            summary[name] = find_saturation(lambda session: target(tester, session), session_factory,
+                                            rates, step_duration, args.concurrency, p99_limit=args.p99_slo)
+
+        print("\n" + "=" * 60)
+        print("📊 Maximum sustainable rate per endpoint")
+        for name, found in summary.items():
+            best = found['sustainable']
+            rate = f"{best['throughput']:.1f} req/s (p99 {best['p99']:.0f}ms)" if best else "below the first step"
+            print(f"   {name:<18} {rate}  knee: {found['knee_reason'] or 'not reached by --max-rate'}")
+        return True
+
+    success = True
+    for name in targets:
+        target = LOAD_TARGETS[name]
+        send = lambda session: target(tester, session)
+
+        if args.closed_loop:
+            result = run_closed_loop(send, session_factory, args.duration, args.concurrency)
+            raw = result.raw_ms()
+            corrected = correct_coordinated_omission(raw, 1000.0 * args.concurrency / args.rate)
+        else:
+            result = run_open_loop(send, session_factory, args.rate, args.duration, args.concurrency, args.arrival)
+            raw, corrected = result.raw_ms(), result.corrected_ms()
+            if result.max_lag_ms() > 1000:
+                print(f"⚠️  Max schedule lag {result.max_lag_ms():.0f}ms - all {args.concurrency} workers were busy; "
+                      f"raise --concurrency if the server is not the bottleneck")
+
+        print_load_report(f"{name} @ {args.rate:g} req/s", result, raw, corrected)
+        success = success and result.error_rate() == 0.0
+        if args.p99_slo is not None:
+            p99 = percentile(corrected, 99)
+            print(f"{'✅ PASS' if p99 <= args.p99_slo else '❌ FAIL'} p99 SLO {args.p99_slo:g}ms: corrected p99 {p99:.1f}ms")
+            success = success and p99 <= args.p99_slo
+    return success
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,235 @@
+#!/usr/bin/env python3
+"""
+Order search selectivity benchmark for the Gibbon Nutrition admin API
+Times /api/admin/orders?search= across terms of very different selectivity and growing seeded order sets
+"""
+
+import argparse
+import json
+import math
+import random
+import re
+import sys
+import time
+from typing import Dict, Any, Optional, List
+
+from backend_test import BASE_URL, APITester, percentile
+from backend_datagen import FIRST_NAMES, LAST_NAMES, EndpointSink, customer_fields, generate, product_catalog
+
+DEFAULT_SIZES = "10000,100000,1000000"
+NO_MATCH_TERM = "zq-no-such-order-7f3k"
+
+
+# ===== DATASET =====
+
+def order_stats(tester: APITester) -> Dict[str, Any]:
+    """Total order count and per-status counts from an unfiltered listing"""
+    data = tester.session.get(f"{tester.base_url}/api/admin/orders?limit=1").json()
+    return {'total': data.get('pagination', {}).get('total', 0), 'statuses': data.get('statusCounts', {})}
+
+
+def seed_orders(tester: APITester, count: int, seed: int, customers: int, catalog: List[Dict[str, Any]],
+                chunk: int = 500, concurrency: int = 16) -> Dict[str, int]:
+    """POST count synthetic orders (backend_datagen) whose customers come from a universe of `customers`
+
+    Items reference `catalog` (backend_datagen.product_catalog): /api/orders/create needs real product ObjectIds.
+    """
+    sink = EndpointSink(tester, chunk, concurrency)
+    universe = {'customers': customers, 'products': len(catalog), 'catalog': catalog}
+    for batch in generate("orders", count, seed, universe):
+        sink.write("orders", batch)
+    sink.pool.shutdown()
+    return {'sent': sink.sent.get("orders", 0), 'failed': sink.failed.get("orders", 0)}
+
+
+# ===== SEARCH TERMS =====
+
+def search_terms(tester: APITester, stats: Dict[str, Any], customers: int, seed: int = 0) -> List[Dict[str, Any]]:
+    """Query params from one result (exact order ID, full email) through name/prefix matches to every order"""
+    rng = random.Random(seed)
+    terms = [{'kind': "baseline", 'label': "(no search)", 'params': {}}]
+
+    pages = max(1, stats['total'] // 100)
+    listing = tester.session.get(f"{tester.base_url}/api/admin/orders",
+                                 params={'page': rng.randint(1, min(pages, 100)), 'limit': 100}).json()
+    order_ids = [o['orderId'] for o in listing.get('orders', []) if o.get('orderId')]
+    if order_ids:
+        terms.append({'kind': "order-id", 'label': "exact order ID", 'params': {'search': rng.choice(order_ids)}})
+
+    customer = customer_fields([rng.randrange(customers)])[0]
+    first, last = customer['firstName'].lower(), customer['lastName'].lower()
+    # search goes into the server's $regex as-is: escape the dots so email terms match literally
+    terms += [
+        {'kind': "email", 'label': "full email", 'params': {'search': re.escape(customer['email'])}},
+        {'kind': "email-prefix", 'label': "email prefix first.last.",
+         'params': {'search': re.escape(f"{first}.{last}.")}},
+        {'kind': "email-prefix", 'label': "email prefix first.", 'params': {'search': re.escape(f"{first}.")}},
+        {'kind': "name", 'label': "common first name", 'params': {'search': FIRST_NAMES[0]}},
+        {'kind': "name", 'label': "common last name", 'params': {'search': LAST_NAMES[0]}},
+        {'kind': "broad", 'label': "order ID prefix ORD-", 'params': {'search': "ORD-"}},
+        {'kind': "no-match", 'label': "no match", 'params': {'search': NO_MATCH_TERM}},
+    ]
+
+    statuses = [status for status, _ in sorted(stats['statuses'].items(), key=lambda item: -item[1])]
+    # Most and least common status: the filter alone is index-backed whatever the search does
+    for status in dict.fromkeys(statuses[:1] + statuses[-1:]):
+        terms.append({'kind': "status", 'label': f"status={status}", 'params': {'status': status}})
+    if statuses:
+        terms.append({'kind': "status+name", 'label': f"status={statuses[-1]} + name",
+                      'params': {'status': statuses[-1], 'search': FIRST_NAMES[0]}})
+    return terms
+
+
+# ===== MEASUREMENT =====
+
+def measure_term(tester: APITester, params: Dict[str, Any], samples: int = 10) -> Dict[str, Any]:
+    """One warm-up then `samples` timed listings; results is the matching total reported by the API"""
+    url = f"{tester.base_url}/api/admin/orders"
+    query = {**params, 'limit': 20}
+    tester.session.get(url, params=query)
+    latencies, results, status = [], None, None
+    for _ in range(samples):
+        started = time.perf_counter()
+        try:
+            response = tester.session.get(url, params=query)
+        except Exception:
+            continue
+        latencies.append((time.perf_counter() - started) * 1000)
+        status = response.status_code
+        if status == 200:
+            results = response.json().get('pagination', {}).get('total')
+    return {'status': status, 'results': results, 'samples': len(latencies),
+            'p50_ms': percentile(latencies, 50) if latencies else None,
+            'p95_ms': percentile(latencies, 95) if latencies else None}
+
+
+def run_size(tester: APITester, stats: Dict[str, Any], customers: int, samples: int, seed: int) -> List[Dict[str, Any]]:
+    rows = []
+    for term in search_terms(tester, stats, customers, seed):
+        rows.append({**term, **measure_term(tester, term['params'], samples)})
+    return rows
+
+
+def print_size_report(dataset: int, rows: List[Dict[str, Any]]):
+    baseline = next((r['p50_ms'] for r in rows if r['kind'] == "baseline"), None)
+    print(f"\n🔎 {dataset:,} orders")
+    print(f"   {'Term':<34} {'kind':<13} {'results':>9} {'match %':>8} {'p50 ms':>8} {'p95 ms':>8} {'Δ base':>8}")
+    for r in sorted(rows, key=lambda r: (r['results'] is None, r['results'] or 0)):
+        share = f"{r['results'] / dataset * 100:.2f}" if r['results'] is not None and dataset else "-"
+        p50 = f"{r['p50_ms']:.1f}" if r['p50_ms'] is not None else "-"
+        p95 = f"{r['p95_ms']:.1f}" if r['p95_ms'] is not None else "-"
+        delta = f"{r['p50_ms'] - baseline:+.1f}" if r['p50_ms'] is not None and baseline is not None else "-"
+        results = r['results'] if r['results'] is not None else f"HTTP {r['status']}"
+        print(f"   {r['label'][:34]:<34} {r['kind']:<13} {results:>9} {share:>8} {p50:>8} {p95:>8} {delta:>8}")
+
+
+def selectivity_verdict(rows: List[Dict[str, Any]]) -> Optional[str]:
+    """An index lookup gets cheaper as results shrink; a scan costs the same whether one order matches or none"""
+    baseline = next((r['p50_ms'] for r in rows if r['kind'] == "baseline"), None)
+    narrow = [r['p50_ms'] for r in rows if r['kind'] in ("order-id", "email", "no-match") and r['p50_ms'] is not None]
+    broad = [r['p50_ms'] for r in rows if r['kind'] in ("name", "broad") and r['p50_ms'] is not None]
+    if baseline is None or not narrow or not broad:
+        return None
+    narrow_cost, broad_cost = max(percentile(narrow, 50) - baseline, 0.0), max(max(broad) - baseline, 0.0)
+    if broad_cost < max(1.0, 0.1 * baseline):
+        return "search adds little over the unfiltered listing at this size - grow the dataset to tell"
+    if narrow_cost >= 0.5 * broad_cost:
+        return (f"one-result and zero-result searches cost {narrow_cost:.1f}ms over baseline vs {broad_cost:.1f}ms "
+                f"for broad terms: cost does not follow result count, so search is scanning the collection")
+    return (f"narrow searches cost {narrow_cost:.1f}ms over baseline vs {broad_cost:.1f}ms for broad terms: "
+            f"cost follows result count, consistent with an index-backed search")
+
+
+def _fit(points: List[tuple]) -> Optional[float]:
+    """Least-squares slope of y over x"""
+    if len(points) < 2:
+        return None
+    mean_x = sum(x for x, _ in points) / len(points)
+    mean_y = sum(y for _, y in points) / len(points)
+    var_x = sum((x - mean_x) ** 2 for x, _ in points)
+    return sum((x - mean_x) * (y - mean_y) for x, y in points) / var_x if var_x else None
+
+
+def print_scaling(by_size: Dict[int, List[Dict[str, Any]]]):
+    """p50 per term across dataset sizes, ms added per 100k orders and the log-log exponent"""
+    sizes = sorted(by_size)
+    labels = [r['label'] for r in by_size[sizes[0]]]
+    print(f"\n📈 p50 ms by dataset size (a scan grows with every order, an index lookup stays flat)")
+    print(f"   {'Term':<34} " + " ".join(f"{size:>10,}" for size in sizes) + f" {'ms/100k':>9} {'exponent':>9}")
+    for label in labels:
+        p50s = [next((r['p50_ms'] for r in by_size[size] if r['label'] == label), None) for size in sizes]
+        cells = " ".join(f"{p:>10.1f}" if p is not None else f"{'-':>10}" for p in p50s)
+        slope = _fit([(size / 100_000, p) for size, p in zip(sizes, p50s) if p is not None])
+        exponent = _fit([(math.log(size), math.log(p)) for size, p in zip(sizes, p50s) if p and size])
+        print(f"   {label[:34]:<34} {cells} {f'{slope:+.1f}' if slope is not None else '-':>9} "
+              f"{f'{exponent:.2f}' if exponent is not None else '-':>9}")
+
+
+def main():
+    """Seed orders up to each dataset size and time searches of varying selectivity at every step"""
+    parser = argparse.ArgumentParser(description="Order search selectivity benchmark (/api/admin/orders?search=)")
+    parser.add_argument("--base-url", default=BASE_URL, help="Target deployment (default: %(default)s)")
+    parser.add_argument("--sizes", default=DEFAULT_SIZES,
+                        help="Comma-separated order counts to grow the dataset to (default: %(default)s)")
+    parser.add_argument("--no-seed", action="store_true", help="Measure the existing orders only")
+    parser.add_argument("--customers", type=int, default=1000,
+                        help="Customer universe of seeded orders; fewer means more orders per email (default: %(default)s)")
+    parser.add_argument("--samples", type=int, default=10, help="Timed requests per term (default: %(default)s)")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--chunk", type=int, default=500)
+    parser.add_argument("--concurrency", type=int, default=16, help="Parallel seeding requests (default: %(default)s)")
+    parser.add_argument("--json", metavar="FILE", help="Write per-size, per-term results as JSON")
+    args = parser.parse_args()
+
+    tester = APITester(args.base_url)
+    # Retries would hide the slow searches being measured
+    tester.session.max_retries = 0
+    print(f"🔎 Order search selectivity on {args.base_url}")
+    print("=" * 60)
+    if not tester.test_admin_login():
+        sys.exit(1)
+
+    sizes = sorted(int(size) for size in args.sizes.split(",") if size.strip())
+    catalog = [] if args.no_seed else product_catalog(tester, 100)
+    if not args.no_seed and not catalog:
+        print("❌ No products with an _id to put in seeded orders")
+        sys.exit(1)
+    by_size: Dict[int, List[Dict[str, Any]]] = {}
+    success = True
+    for step, size in enumerate([None] if args.no_seed else sizes):
+        stats = order_stats(tester)
+        if size and stats['total'] < size:
+            missing, before = size - stats['total'], stats['total']
+            print(f"\n🌱 Seeding {missing:,} orders to reach {size:,}")
+            started = time.perf_counter()
+            seeded = seed_orders(tester, missing, args.seed + step, args.customers, catalog, args.chunk, args.concurrency)
+            print(f"   {seeded['sent']:,} accepted, {seeded['failed']:,} rejected in {time.perf_counter() - started:.0f}s")
+            success = success and not seeded['failed']
+            stats = order_stats(tester)
+            if stats['total'] <= before:
+                # Measuring again would only repeat the previous size under a new label
+                print(f"   ❌ Dataset did not grow past {before:,} orders - stopping")
+                success = False
+                break
+        if stats['total'] in by_size:
+            print(f"\n⏭️  {size:,} orders requested but {stats['total']:,} already measured - skipping")
+            continue
+        rows = run_size(tester, stats, args.customers, args.samples, args.seed)
+        by_size[stats['total']] = rows
+        print_size_report(stats['total'], rows)
+        verdict = selectivity_verdict(rows)
+        if verdict:
+            print(f"   ➜ {verdict}")
+        success = success and all(r['status'] == 200 for r in rows)
+
+    if len(by_size) > 1:
+        print_scaling(by_size)
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump({'base_url': args.base_url, 'sizes': {str(size): rows for size, rows in by_size.items()}}, f, indent=2)
+        print(f"💾 Results written to {args.json}")
+    sys.exit(0 if success else 1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,187 @@
+#!/usr/bin/env python3
+"""
+Route coverage and smoke benchmarks for the Gibbon Nutrition API
+Walks src/app/api, shows which exported handlers the test suite exercises and benchmarks every GET route
+"""
+
+import argparse
+import json
+import sys
+from typing import Dict, Any, Optional, List
+
+from backend_test import (BASE_URL, DEFAULT_RESULTS_CACHE, HTTP_METHODS, PLACEHOLDER_ID, APITester, ResultsCache,
+                          discover_api_routes, endpoint_key, fill_route, match_route, percentile)
+from backend_coldstart import hit
+
+# Field to look for in a parent listing when filling a [param] segment
+PARAM_FIELDS = {'handle': ("handle", "slug"), 'id': ("_id", "id"), 'orderId': ("orderId", "_id"),
+                'productId': ("_id", "productId"), 'userId': ("userId", "_id")}
+
+
+# ===== COVERAGE =====
+
+def tested_methods(routes: List[Dict[str, Any]], cache: ResultsCache) -> Dict[str, set]:
+    """Route path -> methods some cached test_* run has exercised"""
+    covered: Dict[str, set] = {}
+    for entry in cache.entries.values():
+        for key in entry.get('endpoints', {}):
+            route = match_route(key, routes)
+            if route:
+                covered.setdefault(route['path'], set()).add(key.split(" ", 1)[0])
+    return covered
+
+
+# ===== SMOKE BENCHMARKS =====
+
+def _first_value(data: Any, fields: tuple) -> Optional[str]:
+    """First value of any of fields found walking a JSON document breadth-first"""
+    queue = [data]
+    while queue:
+        node = queue.pop(0)
+        if isinstance(node, dict):
+            for field in fields:
+                if isinstance(node.get(field), (str, int)) and node.get(field) != "":
+                    return str(node[field])
+            queue.extend(node.values())
+        elif isinstance(node, list):
+            queue.extend(node[:5])
+    return None
+
+
+def resolve_params(tester: APITester, route: Dict[str, Any], cache: Dict[str, Optional[str]]) -> Dict[str, str]:
+    """Fill [param] segments from the parent listing route (e.g. /api/videos for /api/videos/[id])"""
+    params = {'handle': tester.test_product_handles[0]}
+    segments = route['path'].split("/")
+    for i, segment in enumerate(segments):
+        if not segment.startswith("["):
+            continue
+        name = segment[1:-1]
+        parent = fill_route("/".join(segments[:i]), params)
+        lookup = f"{parent}:{name}"
+        if lookup not in cache:
+            cache[lookup] = None
+            try:
+                response = tester.session.get(f"{tester.base_url}{parent}")
+                if response.status_code == 200:
+                    cache[lookup] = _first_value(response.json(), PARAM_FIELDS.get(name, ("_id", "id")))
+            except Exception:
+                pass
+        if cache[lookup]:
+            params[name] = cache[lookup]
+    return params
+
+
+def smoke_benchmark(tester: APITester, routes: List[Dict[str, Any]], samples: int = 5) -> Dict[str, Dict[str, Any]]:
+    """`samples` GETs per read route after one warm-up hit: status, p50/p95 total ms and body size"""
+    lookups: Dict[str, Optional[str]] = {}
+    results = {}
+    for route in routes:
+        if "GET" not in route['methods']:
+            continue
+        url = fill_route(route['path'], resolve_params(tester, route, lookups))
+        hit(tester, url)
+        hits = [hit(tester, url) for _ in range(samples)]
+        totals = [h['total_ms'] for h in hits if h['total_ms'] is not None]
+        statuses = sorted({h['status'] for h in hits if h['status'] is not None})
+        results[route['path']] = {
+            'url': url,
+            'key': endpoint_key("GET", url),
+            'statuses': statuses,
+            'errors': sum(1 for h in hits if h['status'] is None or h['status'] >= 500),
+            'p50_ms': percentile(totals, 50) if totals else None,
+            'p95_ms': percentile(totals, 95) if totals else None,
+            'bytes': max((h['bytes'] for h in hits if h.get('bytes') is not None), default=None),
+            'placeholder': PLACEHOLDER_ID in url,
+        }
+    return results
+
+
+def print_matrix(routes: List[Dict[str, Any]], covered: Dict[str, set], smoke: Dict[str, Dict[str, Any]]):
+    methods = [m for m in HTTP_METHODS if any(m in r['methods'] for r in routes)]
+    print(f"\n🗺️  Route coverage and GET latency ({len(routes)} routes; ✓ tested, · exported but untested)")
+    print(f"   {'Route':<48} " + " ".join(f"{m[:5]:>5}" for m in methods) + f" {'status':>8} {'p50 ms':>8} {'p95 ms':>8}")
+    for route in routes:
+        cells = []
+        for method in methods:
+            if method not in route['methods']:
+                cells.append(f"{'':>5}")
+            else:
+                cells.append(f"{'✓' if method in covered.get(route['path'], set()) else '·':>5}")
+        s = smoke.get(route['path'])
+        if s:
+            status = "/".join(str(code) for code in s['statuses']) or "error"
+            p50 = f"{s['p50_ms']:.1f}" if s['p50_ms'] is not None else "-"
+            p95 = f"{s['p95_ms']:.1f}" if s['p95_ms'] is not None else "-"
+            tail = f" {status:>8} {p50:>8} {p95:>8}"
+        else:
+            tail = ""
+        print(f"   {route['path']:<48} " + " ".join(cells) + tail)
+
+
+def suggested_budgets(smoke: Dict[str, Dict[str, Any]], headroom: float = 2.0) -> Dict[str, Dict[str, Any]]:
+    """ENDPOINT_BUDGETS-shaped baselines (p95 and body size with headroom) for successful GET routes"""
+    budgets = {}
+    for s in smoke.values():
+        if s['p95_ms'] is None or s['placeholder'] or not s['statuses'] or max(s['statuses']) >= 400:
+            continue
+        budgets[s['key']] = {'p95_ms': round(max(s['p95_ms'] * headroom, 50)),
+                             **({'max_bytes': int(s['bytes'] * headroom)} if s['bytes'] else {})}
+    return budgets
+
+
+def main():
+    """Print the route coverage matrix and smoke-benchmark every GET route"""
+    parser = argparse.ArgumentParser(description="Route coverage matrix and GET smoke benchmarks")
+    parser.add_argument("--base-url", default=BASE_URL, help="Target deployment (default: %(default)s)")
+    parser.add_argument("--samples", type=int, default=5, help="Timed GETs per route (default: %(default)s)")
+    parser.add_argument("--include", default="", help="Only routes starting with this prefix")
+    parser.add_argument("--cache", default=DEFAULT_RESULTS_CACHE, help="Results cache recording what tests exercised")
+    parser.add_argument("--coverage-only", action="store_true", help="Print the matrix without sending requests")
+    parser.add_argument("--write-budgets", metavar="FILE",
+                        help="Write 2x-headroom baselines for passing GET routes, usable with backend_test.py --budgets")
+    parser.add_argument("--json", metavar="FILE", help="Write coverage and smoke results as JSON")
+    args = parser.parse_args()
+
+    routes = [r for r in discover_api_routes() if r['path'].startswith(args.include)]
+    covered = tested_methods(routes, ResultsCache(args.cache))
+    smoke: Dict[str, Dict[str, Any]] = {}
+    tester = APITester(args.base_url)
+    if not args.coverage_only:
+        print(f"💨 Smoke benchmarking {sum('GET' in r['methods'] for r in routes)} GET routes on {args.base_url}")
+        print("=" * 60)
+        tester.session.max_retries = 0
+        if any(r['path'].startswith("/api/admin") for r in routes):
+            tester.test_admin_login()
+        smoke = smoke_benchmark(tester, routes, args.samples)
+    print_matrix(routes, covered, smoke)
+
+    handlers = [(r['path'], m) for r in routes for m in r['methods']]
+    tested = [(path, m) for path, m in handlers if m in covered.get(path, set())]
+    reads = [r['path'] for r in routes if "GET" in r['methods']]
+    untested_reads = [path for path in reads if "GET" not in covered.get(path, set())]
+    print(f"\n📊 Handlers exercised by tests: {len(tested)}/{len(handlers)}"
+          f" ({len(tested) / len(handlers) * 100 if handlers else 0:.0f}%)")
+    print(f"   GET routes without a test: {len(untested_reads)}/{len(reads)}"
+          f"{' - all of them smoke-benchmarked above' if smoke else ''}")
+
+    success = True
+    for path, s in smoke.items():
+        passed = s['errors'] == 0
+        if not passed:
+            tester.log_test(f"Smoke GET {path}", False, f"{s['errors']}/{args.samples} requests failed or returned 5xx")
+        success = success and passed
+
+    if args.write_budgets:
+        with open(args.write_budgets, "w") as f:
+            json.dump(suggested_budgets(smoke), f, indent=2)
+        print(f"💾 Baseline budgets written to {args.write_budgets}")
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump({'routes': [{**r, 'tested': sorted(covered.get(r['path'], set())), 'smoke': smoke.get(r['path'])}
+                                  for r in routes]}, f, indent=2)
+        print(f"💾 Results written to {args.json}")
+    sys.exit(0 if success else 1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,388 @@
+#!/usr/bin/env python3
+"""
+Declarative load scenarios for the Gibbon Nutrition API
+Compiles a TOML or YAML scenario file (requests, payload templates, weights, stages, assertions) into an execution plan
+"""
+
+import argparse
+import bisect
+import itertools
+import json
+import math
+import random
+import sys
+import threading
+import time
+import uuid
+from string import Template
+from typing import Dict, Any, Optional, List, Tuple
+
+import requests
+
+from backend_test import BASE_URL, PAYLOAD_TEMPLATES, APITester, CreatedOrders, percentile, summarize_latencies
+from backend_load import load_session, run_open_loop, format_percentiles
+from backend_dashboard import attach_dashboard
+
+try:
+    import tomllib
+except ImportError:
+    try:
+        import tomli as tomllib
+    except ImportError:
+        tomllib = None
+
+try:
+    import yaml
+except ImportError:
+    yaml = None
+
+# Variables filled in per request; anything else must be resolvable when the scenario is compiled
+# product_id/variant_id/price come from the same product as handle, looked up before the run
+PRODUCT_VARS = frozenset({"product_id", "variant_id", "price"})
+DYNAMIC_VARS = frozenset({"seq", "uuid", "uuid8", "email", "handle", "timestamp"}) | PRODUCT_VARS
+# A JSON string that is exactly one of these placeholders is rendered as a number
+NUMERIC_VARS = frozenset({"seq", "timestamp", "price"})
+
+
+class ScenarioError(ValueError):
+    """Raised for scenario files that cannot be parsed or compiled"""
+
+
+def load_scenario(path: str) -> Dict[str, Any]:
+    """Parse a .toml, .yaml or .yml scenario file into a dict"""
+    if path.endswith(".toml"):
+        if tomllib is None:
+            raise ScenarioError("TOML scenarios need Python 3.11+ or the tomli package")
+        with open(path, "rb") as f:
+            return tomllib.load(f)
+    if path.endswith((".yaml", ".yml")):
+        if yaml is None:
+            raise ScenarioError("YAML scenarios need the PyYAML package (pip install pyyaml)")
+        with open(path) as f:
+            return yaml.safe_load(f) or {}
+    raise ScenarioError(f"Unsupported scenario file type: {path}")
+
+
+# ===== ARRIVAL SCHEDULE =====
+
+def stage_schedule(stages: List[Dict[str, Any]], arrival: str = "constant", seed: int = 0) -> List[float]:
+    """Arrival offsets for piecewise-linear rate stages ('rate' is the rate reached at the end of each stage)"""
+    segments = []  # (start_time, duration, from_rate, to_rate, cumulative_before)
+    t = cumulative = 0.0
+    previous = None
+    for stage in stages:
+        duration = float(stage['duration'])
+        to_rate = float(stage['rate'])
+        from_rate = float(stage.get('from', to_rate if previous is None else previous))
+        segments.append((t, duration, from_rate, to_rate, cumulative))
+        cumulative += (from_rate + to_rate) / 2 * duration
+        t += duration
+        previous = to_rate
+
+    rng = random.Random(seed)
+    offsets = []
+    u = 0.0 if arrival == "constant" else rng.expovariate(1.0)
+    index = 0
+    while u < cumulative:
+        while index + 1 < len(segments) and u >= segments[index + 1][4]:
+            index += 1
+        start, duration, r0, r1, before = segments[index]
+        n = u - before
+        a = (r1 - r0) / (2 * duration)
+        # Invert the cumulative arrival count r0*t + a*t^2 = n
+        dt = n / r0 if abs(a) < 1e-12 else (-r0 + math.sqrt(r0 * r0 + 4 * a * n)) / (2 * a)
+        offsets.append(start + dt)
+        u += 1.0 if arrival == "constant" else rng.expovariate(1.0)
+    return offsets
+
+
+# ===== COMPILATION =====
+
+class CompiledRequest:
+    """One scenario request with its URL and body pre-rendered as far as possible"""
+
+    def __init__(self, name: str, method: str, url: str, body: Optional[str], weight: float,
+                 expect: Dict[str, Any], headers: Dict[str, str]):
+        self.name = name
+        self.method = method.upper()
+        self.weight = weight
+        self.headers = headers
+        self.url_template = Template(url)
+        self.url_static = url if not self.url_template.get_identifiers() else None
+        self.body_template = Template(body) if body is not None else None
+        self.body_static = body.encode() if body is not None and not self.body_template.get_identifiers() else None
+        self.expect_status = frozenset(expect.get('status', range(200, 300)))
+        self.expect_json: Tuple[Tuple[str, Any], ...] = tuple((expect.get('json') or {}).items())
+        self.max_ms = expect.get('max_ms')
+
+    def render(self, variables: Dict[str, Any]) -> Tuple[str, Optional[bytes]]:
+        url = self.url_static or self.url_template.safe_substitute(variables)
+        if self.body_static is not None or self.body_template is None:
+            return url, self.body_static
+        return url, self.body_template.safe_substitute(variables).encode()
+
+    def check(self, response: requests.Response, latency_ms: float) -> Optional[str]:
+        """Return a failure description, or None when every expectation holds"""
+        if response.status_code not in self.expect_status:
+            return f"status {response.status_code}"
+        if self.expect_json:
+            try:
+                data = response.json()
+            except ValueError:
+                return "body is not JSON"
+            if not isinstance(data, dict):
+                return f"body is a JSON {type(data).__name__}, not an object"
+            for key, value in self.expect_json:
+                if data.get(key) != value:
+                    return f"{key}={data.get(key)!r}"
+        if self.max_ms is not None and latency_ms > self.max_ms:
+            return f"took {latency_ms:.0f}ms > {self.max_ms}ms"
+        return None
+
+
+class ScenarioPlan:
+    """Compiled scenario: weighted requests, arrival schedule, assertions and per-request stats"""
+
+    def __init__(self, name: str, requests_: List[CompiledRequest], schedule: List[float], base_url: str,
+                 handles: List[str], admin: bool, assertions: Dict[str, Any], seed: int):
+        self.name = name
+        self.requests = requests_
+        self.schedule = schedule
+        self.base_url = base_url
+        self.handles = handles
+        self.admin = admin
+        self.assertions = assertions
+        self.seed = seed
+        total = sum(r.weight for r in requests_)
+        self.cumulative = list(itertools.accumulate(r.weight / total for r in requests_))
+        self.products: List[Dict[str, Any]] = []
+        self.latencies: Dict[str, List[float]] = {r.name: [] for r in requests_}
+        self.failures: Dict[str, Dict[str, int]] = {r.name: {} for r in requests_}
+        self._seq = itertools.count()
+        self._local = threading.local()
+        self._lock = threading.Lock()
+
+    def _rng(self) -> random.Random:
+        if not hasattr(self._local, 'rng'):
+            self._local.rng = random.Random(f"{self.seed}-{threading.get_ident()}")
+        return self._local.rng
+
+    def order_requests(self) -> List[str]:
+        """Names of requests that place real orders"""
+        return [r.name for r in self.requests
+                if r.method == "POST" and r.url_template.template.split("?")[0] == "/api/orders/create"]
+
+    def uses_products(self) -> bool:
+        return any(PRODUCT_VARS & set(r.url_template.get_identifiers()
+                                      + (r.body_template.get_identifiers() if r.body_template else []))
+                   for r in self.requests)
+
+    def resolve_products(self, session: requests.Session) -> int:
+        """Look up _id, first variant and price of every handle for the product_id/variant_id/price variables"""
+        for handle in self.handles:
+            try:
+                response = session.get(f"{self.base_url}/api/products/{handle}")
+                product = (response.json().get('data') or {}) if response.status_code == 200 else {}
+            except (requests.RequestException, ValueError, AttributeError):
+                continue
+            if product.get('_id'):
+                variant = (product.get('variants') or [{}])[0]
+                self.products.append({'handle': handle, 'product_id': product['_id'],
+                                      'variant_id': variant.get('_id') or "", 'price': variant.get('price') or 600})
+        return len(self.products)
+
+    def send(self, session: requests.Session) -> requests.Response:
+        rng = self._rng()
+        request = self.requests[min(bisect.bisect_left(self.cumulative, rng.random()), len(self.requests) - 1)]
+        token = uuid.uuid4().hex
+        product = rng.choice(self.products) if self.products else {'handle': rng.choice(self.handles)}
+        variables = {
+            'seq': next(self._seq),
+            'uuid': token,
+            'uuid8': token[:8].upper(),
+            'email': f"load-{token[:12]}@example.com",
+            'timestamp': int(time.time() * 1000),
+            **product,
+        }
+        url, body = request.render(variables)
+        started = time.perf_counter()
+        try:
+            response = session.request(request.method, f"{self.base_url}{url}", data=body, headers=request.headers)
+        except Exception as e:
+            self._record(request.name, (time.perf_counter() - started) * 1000, type(e).__name__)
+            raise
+        latency_ms = (time.perf_counter() - started) * 1000
+        self._record(request.name, latency_ms, request.check(response, latency_ms))
+        return response
+
+    def _record(self, name: str, latency_ms: float, failure: Optional[str]):
+        with self._lock:
+            self.latencies[name].append(latency_ms)
+            if failure:
+                self.failures[name][failure] = self.failures[name].get(failure, 0) + 1
+
+    def error_rate(self, name: Optional[str] = None) -> float:
+        names = [name] if name else list(self.latencies)
+        sent = sum(len(self.latencies[n]) for n in names)
+        failed = sum(sum(self.failures[n].values()) for n in names)
+        return failed / sent if sent else 0.0
+
+
+def _render_body(spec: Dict[str, Any], static_vars: Dict[str, Any]) -> Optional[str]:
+    body = spec.get('body')
+    if body is None:
+        return None
+    if isinstance(body, str):
+        if body not in PAYLOAD_TEMPLATES:
+            raise ScenarioError(f"Unknown payload template '{body}' (known: {', '.join(sorted(PAYLOAD_TEMPLATES))})")
+        body = PAYLOAD_TEMPLATES[body]()
+    body = dict(body, **spec.get('overrides', {}))
+    text = json.dumps(body)
+    for name in NUMERIC_VARS:
+        text = text.replace(f'"${{{name}}}"', f"${{{name}}}")
+    return Template(text).safe_substitute(static_vars)
+
+
+def compile_scenario(raw: Dict[str, Any], base_url: str, handles: List[str], seed: int = 0) -> ScenarioPlan:
+    """Validate a parsed scenario and pre-render everything that does not change per request"""
+    if not raw.get('requests'):
+        raise ScenarioError("Scenario defines no [[requests]]")
+    global_vars = raw.get('vars', {})
+
+    compiled = []
+    for i, spec in enumerate(raw['requests']):
+        name = spec.get('name') or f"request-{i + 1}"
+        if 'path' not in spec:
+            raise ScenarioError(f"Request '{name}' has no path")
+        static_vars = dict(global_vars, **spec.get('vars', {}))
+        path = Template(spec['path']).safe_substitute(static_vars)
+        body = _render_body(spec, static_vars)
+        unresolved = set(Template(path).get_identifiers()) | set(Template(body or "").get_identifiers())
+        if unresolved - DYNAMIC_VARS:
+            raise ScenarioError(f"Request '{name}' uses undefined variables: {', '.join(sorted(unresolved - DYNAMIC_VARS))}")
+        headers = dict(spec.get('headers', {}))
+        if body is not None:
+            headers.setdefault('Content-Type', 'application/json')
+        weight = float(spec.get('weight', 1))
+        if weight <= 0:
+            raise ScenarioError(f"Request '{name}' needs a positive weight")
+        compiled.append(CompiledRequest(name, spec.get('method', 'GET'), path, body, weight,
+                                        spec.get('expect', {}), headers))
+
+    stages = raw.get('stages') or [{'duration': raw.get('duration', 60), 'rate': raw.get('rate', 10)}]
+    for stage in stages:
+        if float(stage.get('duration', 0)) <= 0 or float(stage.get('rate', -1)) < 0:
+            raise ScenarioError(f"Stage needs a positive duration and a non-negative rate: {stage}")
+    schedule = stage_schedule(stages, raw.get('arrival', 'constant'), seed)
+
+    return ScenarioPlan(raw.get('name', 'scenario'), compiled, schedule, raw.get('base_url', base_url),
+                        raw.get('handles', handles), bool(raw.get('admin', False)), raw.get('assertions', {}), seed)
+
+
+# ===== ASSERTIONS =====
+
+def _check_limits(label: str, samples: List[float], error_rate: float, limits: Dict[str, Any]) -> List[Tuple[str, bool, str]]:
+    checks = []
+    for key, value in limits.items():
+        if key.endswith("_ms") and key.startswith("p"):
+            pct = float(key[1:-3].replace("_", "."))
+            actual = percentile(samples, pct)
+            checks.append((f"{label} {key} <= {value}", actual <= value, f"{actual:.1f}ms"))
+        elif key == "max_ms":
+            actual = max(samples, default=0.0)
+            checks.append((f"{label} max_ms <= {value}", actual <= value, f"{actual:.1f}ms"))
+        elif key == "error_rate":
+            checks.append((f"{label} error_rate <= {value}", error_rate <= value, f"{error_rate * 100:.2f}%"))
+    return checks
+
+
+def evaluate_assertions(plan: ScenarioPlan, throughput: float) -> List[Tuple[str, bool, str]]:
+    limits = dict(plan.assertions)
+    per_request = limits.pop('requests', {})
+    all_samples = [v for samples in plan.latencies.values() for v in samples]
+    checks = _check_limits("overall", all_samples, plan.error_rate(), limits)
+    if 'min_throughput' in limits:
+        checks.append((f"overall throughput >= {limits['min_throughput']}", throughput >= limits['min_throughput'],
+                       f"{throughput:.1f} req/s"))
+    for name, request_limits in per_request.items():
+        if name not in plan.latencies:
+            checks.append((f"{name}", False, "no such request in scenario"))
+            continue
+        checks.extend(_check_limits(name, plan.latencies[name], plan.error_rate(name), request_limits))
+    return checks
+
+
+def print_plan(plan: ScenarioPlan):
+    duration = plan.schedule[-1] if plan.schedule else 0.0
+    print(f"📝 Scenario '{plan.name}': {len(plan.schedule)} requests over ~{duration:.0f}s against {plan.base_url}")
+    previous = 0.0
+    for request, cumulative in zip(plan.requests, plan.cumulative):
+        dynamic = sorted(request.url_template.get_identifiers()
+                         + (request.body_template.get_identifiers() if request.body_template else []))
+        print(f"   {request.name:<24} {request.method:<6} {request.url_template.template:<44} "
+              f"{(cumulative - previous) * 100:>5.1f}%  {'static' if not dynamic else 'per-request: ' + ', '.join(set(dynamic))}")
+        previous = cumulative
+
+
+def main():
+    """Compile and run a scenario file"""
+    parser = argparse.ArgumentParser(description="Run a declarative load scenario")
+    parser.add_argument("scenario", help="Scenario file (.toml, .yaml or .yml)")
+    parser.add_argument("--base-url", default=BASE_URL, help="Target deployment unless the scenario sets base_url")
+    parser.add_argument("--concurrency", type=int, default=128, help="Maximum in-flight requests (default: %(default)s)")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--dry-run", action="store_true", help="Compile and print the plan without sending requests")
+    parser.add_argument("--dashboard", action="store_true", help="Show a live terminal dashboard while the scenario runs")
+    parser.add_argument("--allow-orders", action="store_true",
+                        help="Required for scenarios that check out: places real orders, cancelled after the run")
+    args = parser.parse_args()
+
+    tester = APITester(args.base_url)
+    try:
+        plan = compile_scenario(load_scenario(args.scenario), args.base_url, tester.test_product_handles, args.seed)
+    except (ScenarioError, KeyError, TypeError, ValueError) as e:
+        print(f"❌ Invalid scenario {args.scenario}: {e}")
+        sys.exit(2)
+
+    print_plan(plan)
+    if args.dry_run:
+        sys.exit(0)
+    if plan.order_requests() and not args.allow_orders:
+        print(f"❌ {', '.join(plan.order_requests())} places real orders on {plan.base_url}; pass --allow-orders to confirm")
+        sys.exit(2)
+    tester.base_url = plan.base_url
+    created = CreatedOrders()
+    created.attach(tester.session)
+    if plan.admin and not tester.test_admin_login():
+        sys.exit(1)
+    if plan.uses_products() and not plan.resolve_products(tester.session):
+        print(f"❌ None of {', '.join(plan.handles)} could be looked up for product_id/variant_id/price")
+        sys.exit(1)
+
+    print("=" * 60)
+    if args.dashboard:
+        with attach_dashboard(tester, title=f"Scenario: {plan.name}").running():
+            result = run_open_loop(plan.send, lambda: load_session(tester), 0, 0, args.concurrency, schedule=plan.schedule)
+    else:
+        result = run_open_loop(plan.send, lambda: load_session(tester), 0, 0, args.concurrency, schedule=plan.schedule)
+    throughput = result.throughput()
+    corrected = result.corrected_ms()
+    print(f"\n📈 {len(result.samples)} requests in {result.wall_s:.1f}s ({throughput:.1f} req/s)")
+    print(f"   corrected: {format_percentiles(corrected)}")
+    for name, samples in plan.latencies.items():
+        s = summarize_latencies(samples)
+        failures = ", ".join(f"{k} x{v}" for k, v in sorted(plan.failures[name].items()))
+        print(f"   {name:<24} n={s['count']:<7} p50={s['p50']:.0f}ms p95={s['p95']:.0f}ms p99={s['p99']:.0f}ms"
+              f"{'  failures: ' + failures if failures else ''}")
+
+    checks = evaluate_assertions(plan, throughput)
+    if checks:
+        print("\n🎯 Assertions")
+    for label, passed, actual in checks:
+        tester.log_test(label, passed, actual)
+    tester.cancel_created_orders(created, f"Scenario {plan.name} cleanup")
+    sys.exit(0 if all(passed for _, passed, _ in checks) else 1)
+
+
+if __name__ == "__main__":
+    main()
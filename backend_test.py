@@ -5,1188 +5,2178 @@ Tests the new Admin Panel features including Discounts API, Products API, and Pr
 """
 
 import requests
+import argparse
+import copy
+import cProfile
+import gzip
+import heapq
 import json
+import math
+import os
+import random
+import re
+import shlex
+import subprocess
 import sys
-from typing import Dict, Any, Optional
+import threading
+import time
+import uuid
+import zlib
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager, nullcontext
+from urllib.parse import urlparse
+from typing import Dict, Any, Optional, List, Callable
+
+from backend_faultproxy import FaultProxy, FaultRule, parse_fault_rule
+from backend_history import DEFAULT_HISTORY_DB, ResultsStore
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
 
 # Base URL for testing - using production URL from .env
 BASE_URL = "https://shopvid-repair.preview.emergentagent.com"
 
-class APITester:
-    def __init__(self, base_url: str):
-        self.base_url = base_url
-        self.session = requests.Session()
-        self.session.headers.update({
-            'Content-Type': 'application/json',
-            'Accept': 'application/json'
-        })
-        self.test_results = []
-        self.created_discount_id = None
-        self.admin_authenticated = False
-        self.admin_user_info = None
-        self.created_review_id = None
-        self.test_product_handles = ["bcaa-4-1-1-glutamine", "t-shirt", "shaker"]
+# GET routes used by the read-path benchmarks; {handle} is filled from the test fixtures
+READ_ENDPOINTS = [
+    "/api/products",
+    "/api/products/{handle}",
+    "/api/product-reviews/{handle}",
+    "/api/discounts",
+    "/api/admin/reviews",
+    "/api/admin/orders",
+    "/api/collections",
+    "/api/navigation",
+    "/api/homepage",
+    "/api/blog",
+    "/api/videos",
+]
 
-    def log_test(self, test_name: str, success: bool, message: str, response_data: Optional[Dict] = None):
-        """Log test results"""
-        status = "✅ PASS" if success else "❌ FAIL"
-        print(f"{status} {test_name}: {message}")
-        
-        self.test_results.append({
-            'test': test_name,
-            'success': success,
-            'message': message,
-            'response_data': response_data
-        })
-        
-        if response_data and not success:
-            print(f"   Response: {json.dumps(response_data, indent=2)}")
+# Content-Encoding decoders available on this client
+DECODERS: Dict[str, Callable[[bytes], bytes]] = {
+    "gzip": gzip.decompress,
+    "deflate": zlib.decompress,
+}
+if brotli is not None:
+    DECODERS["br"] = brotli.decompress
 
-    def test_admin_setup_status(self) -> bool:
-        """Test GET /api/admin/auth/setup - Check setup status"""
+
+def order_payload(product_id: str = "test", variant_id: Optional[str] = None, price: float = 600,
+                  quantity: int = 1, email: Optional[str] = None) -> Dict[str, Any]:
+    """Minimal cash-on-delivery order accepted by POST /api/orders/create"""
+    return {
+        "items": [{
+            "productId": product_id,
+            "variantId": variant_id,
+            "name": "Load test item",
+            "quantity": quantity,
+            "price": price
+        }],
+        "shippingAddress": {
+            "firstName": "Load",
+            "lastName": "Test",
+            "address1": "221B Test Street",
+            "city": "Mumbai",
+            "state": "Maharashtra",
+            "zipCode": "400001",
+            "phone": "9999999999"
+        },
+        "customerInfo": {
+            "email": email or f"load-{uuid.uuid4().hex[:12]}@example.com",
+            "firstName": "Load",
+            "lastName": "Test"
+        },
+        "paymentMethod": "cod"
+    }
+
+
+class CreatedOrders:
+    """Response hook remembering the orderId of every order a run creates, so the run can cancel them afterwards"""
+
+    def __init__(self):
+        self.order_ids: List[str] = []
+        self._lock = threading.Lock()
+
+    def attach(self, session: requests.Session):
+        session.hooks['response'].append(self.record)
+
+    def record(self, response: requests.Response, *args, **kwargs) -> requests.Response:
+        request = response.request
+        if (request.method != "POST" or urlparse(request.url).path != "/api/orders/create"
+                or response.status_code not in (200, 201)):
+            return response
         try:
-            response = self.session.get(f"{self.base_url}/api/admin/auth/setup")
-            
-            if response.status_code == 200:
-                data = response.json()
-                if data.get('success'):
-                    needs_setup = data.get('needsSetup', True)
-                    if not needs_setup:
-                        self.log_test(
-                            "GET /api/admin/auth/setup", 
-                            True, 
-                            "Setup status correct: Admin already exists (needsSetup: false)"
-                        )
-                        return True
-                    else:
-                        self.log_test(
-                            "GET /api/admin/auth/setup", 
-                            False, 
-                            "Setup status incorrect: needsSetup should be false since admin exists", 
-                            data
-                        )
-                        return False
+            order_id = (response.json().get('order') or {}).get('orderId')
+        except (ValueError, AttributeError):
+            return response
+        if order_id:
+            with self._lock:
+                self.order_ids.append(order_id)
+        return response
+
+
+# ===== PAYLOAD TEMPLATES =====
+# Request bodies shared by the test_* methods, the load scripts and scenario files
+
+TEST_DISCOUNT = {
+    "code": "TEST20",
+    "discountType": "percentage",
+    "discountValue": 20,
+    "minOrderAmount": 1000,
+    "usageLimit": 50,
+    "isActive": True,
+    "appliesTo": "all"
+}
+
+DISCOUNT_UPDATE = {
+    "discountValue": 25,
+    "usageLimit": 100,
+    "isActive": True
+}
+
+PROMO_CHECK = {
+    "code": "WELCOME10",
+    "cartItems": [
+        {
+            "productId": "test",
+            "quantity": 1,
+            "price": 600
+        }
+    ]
+}
+
+ADMIN_REVIEW = {
+    "productHandle": "bcaa-4-1-1-glutamine",
+    "customerName": "Alex Johnson",
+    "customerEmail": "alex.johnson@example.com",
+    "rating": 5,
+    "title": "Excellent BCAA supplement!",
+    "content": "This BCAA supplement has really helped with my recovery after workouts. Great taste and mixes well. Highly recommend for anyone serious about fitness.",
+    "status": "approved",
+    "isVerifiedPurchase": True
+}
+
+REVIEW_UPDATE = {
+    "rating": 4,
+    "title": "Updated: Good BCAA supplement",
+    "content": "Updated review content: Still a good product but not as amazing as I initially thought.",
+    "status": "approved",
+    "adminNotes": "Updated by admin during testing"
+}
+
+CUSTOMER_REVIEW = {
+    "productHandle": "t-shirt",
+    "customerName": "Sarah Wilson",
+    "customerEmail": "sarah.wilson@example.com",
+    "rating": 4,
+    "title": "Nice quality t-shirt",
+    "content": "The t-shirt is comfortable and fits well. Good material quality. Would buy again."
+}
+
+REVIEW_IMPORT = {
+    "reviews": [
+        {
+            "product_handle": "shaker",
+            "customer_name": "Mike Davis",
+            "email": "mike.davis@example.com",
+            "rating": "5",
+            "title": "Perfect shaker bottle",
+            "content": "This shaker bottle is exactly what I needed. No leaks, easy to clean, and the mixing ball works great.",
+            "verified": "false",
+            "created_at": "2024-01-15"
+        }
+    ],
+    "overwriteExisting": False
+}
+
+PAYLOAD_TEMPLATES: Dict[str, Callable[[], Dict[str, Any]]] = {
+    "discount": lambda: copy.deepcopy(TEST_DISCOUNT),
+    "discount_update": lambda: copy.deepcopy(DISCOUNT_UPDATE),
+    "promo_check": lambda: copy.deepcopy(PROMO_CHECK),
+    "admin_review": lambda: copy.deepcopy(ADMIN_REVIEW),
+    "review_update": lambda: copy.deepcopy(REVIEW_UPDATE),
+    "customer_review": lambda: copy.deepcopy(CUSTOMER_REVIEW),
+    "review_import": lambda: copy.deepcopy(REVIEW_IMPORT),
+    "order": order_payload,
+}
+
+
+def percentile(values: List[float], pct: float) -> float:
+    """Nearest-rank percentile (pct in 0-100) of an unsorted list"""
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    rank = max(1, math.ceil(pct / 100.0 * len(ordered)))
+    return ordered[min(rank, len(ordered)) - 1]
+
+
+def summarize_latencies(samples: List[float]) -> Dict[str, float]:
+    """Summarize a list of millisecond samples as count/min/p50/p95/p99/max/mean"""
+    if not samples:
+        return {'count': 0, 'min': 0.0, 'p50': 0.0, 'p95': 0.0, 'p99': 0.0, 'max': 0.0, 'mean': 0.0}
+    return {
+        'count': len(samples),
+        'min': min(samples),
+        'p50': percentile(samples, 50),
+        'p95': percentile(samples, 95),
+        'p99': percentile(samples, 99),
+        'max': max(samples),
+        'mean': sum(samples) / len(samples),
+    }
+
+
+def format_summary(summary: Dict[str, float]) -> str:
+    """One-line rendering of a summarize_latencies() result"""
+    return (
+        f"n={summary['count']} min={summary['min']:.1f}ms p50={summary['p50']:.1f}ms "
+        f"p95={summary['p95']:.1f}ms p99={summary['p99']:.1f}ms max={summary['max']:.1f}ms"
+    )
+
+
+# ===== API ROUTE DISCOVERY =====
+
+REPO_ROOT = os.path.dirname(os.path.abspath(__file__))
+API_ROOT = os.path.join(REPO_ROOT, "src", "app", "api")
+HTTP_METHODS = ("GET", "POST", "PUT", "PATCH", "DELETE", "HEAD", "OPTIONS")
+EXPORTED_HANDLER = re.compile(r"export\s+(?:async\s+)?(?:function\s+|const\s+)(" + "|".join(HTTP_METHODS) + r")\b")
+# Placeholder for [id]-style segments without a fixture: a well-formed ObjectId that matches nothing
+PLACEHOLDER_ID = "000000000000000000000000"
+
+
+def discover_api_routes(root: str = API_ROOT) -> List[Dict[str, Any]]:
+    """Every App Router route.{ts,js} under root as {'path', 'methods', 'file'}, sorted by path"""
+    routes = []
+    for directory, _, files in os.walk(root):
+        for name in files:
+            if os.path.splitext(name)[0] != "route":
+                continue
+            file = os.path.join(directory, name)
+            with open(file, encoding="utf-8") as f:
+                methods = sorted(set(EXPORTED_HANDLER.findall(f.read())), key=HTTP_METHODS.index)
+            # Route groups like (products) don't appear in the URL
+            segments = [s for s in os.path.relpath(directory, root).split(os.sep) if s != "." and not s.startswith("(")]
+            routes.append({'path': "/api/" + "/".join(segments) if segments else "/api", 'methods': methods, 'file': file})
+    return sorted(routes, key=lambda route: route['path'])
+
+
+def fill_route(path: str, params: Dict[str, str]) -> str:
+    """Replace [segment] placeholders with params, falling back to PLACEHOLDER_ID"""
+    return re.sub(r"\[(\w+)\]", lambda m: params.get(m.group(1), PLACEHOLDER_ID), path)
+
+
+# ===== REQUEST TIMEOUTS, RETRIES AND CIRCUIT BREAKING =====
+
+# (connect, read) seconds; longest matching path prefix wins
+DEFAULT_TIMEOUT = (5.0, 30.0)
+ENDPOINT_TIMEOUTS = {
+    "/api/admin/auth": (5.0, 10.0),
+    "/api/promoCode/check": (5.0, 10.0),
+    "/api/reviews/helpful": (5.0, 10.0),
+    "/api/admin/reviews/import": (5.0, 60.0),
+    "/api/admin/orders": (5.0, 45.0),
+}
+
+IDEMPOTENT_METHODS = frozenset({"GET", "HEAD", "OPTIONS", "PUT", "DELETE"})
+RETRYABLE_STATUSES = frozenset({502, 503, 504})
+
+_ID_SEGMENT = re.compile(r"^([0-9a-fA-F]{24}|[0-9a-fA-F]{32}|[0-9a-fA-F]{8}-[0-9a-fA-F-]{27}|\d+|[A-Z]{2,}-\d[0-9A-Z-]*)$")
+# Storefront collections whose only child route is /api/<parent>/[handle]; nested admin routes under the same
+# names (e.g. /api/admin/blog/posts) are literal and must keep their own key
+_HANDLE_PARENTS = {"product-reviews", "products", "recommendations", "blog", "collections"}
+
+
+def endpoint_key(method: str, url: str) -> str:
+    """Group a concrete request under its route, e.g. 'GET /api/admin/orders/[id]'"""
+    path = urlparse(url).path.rstrip("/") or "/"
+    segments = path.split("/")
+    for i in range(1, len(segments)):
+        if _ID_SEGMENT.match(segments[i]):
+            segments[i] = "[id]"
+        elif i == 3 and len(segments) == 4 and segments[1] == "api" and segments[2] in _HANDLE_PARENTS:
+            segments[i] = "[handle]"
+    return f"{method.upper()} {'/'.join(segments)}"
+
+
+class CircuitOpenError(requests.exceptions.RequestException):
+    """Raised instead of sending a request while an endpoint's circuit is open"""
+
+
+class CircuitBreaker:
+    """Per-endpoint breaker: opens after N consecutive failures, allows one probe after the cooldown"""
+
+    def __init__(self, failure_threshold: int = 5, cooldown: float = 30.0):
+        self.failure_threshold = failure_threshold
+        self.cooldown = cooldown
+        self._failures: Dict[str, int] = {}
+        self._opened_at: Dict[str, float] = {}
+        self._lock = threading.Lock()
+
+    def allow(self, key: str) -> bool:
+        with self._lock:
+            opened_at = self._opened_at.get(key)
+            if opened_at is None:
+                return True
+            if time.monotonic() - opened_at >= self.cooldown:
+                # Half-open: let this request through as the probe
+                self._opened_at[key] = time.monotonic()
+                return True
+            return False
+
+    def record_success(self, key: str):
+        with self._lock:
+            self._failures.pop(key, None)
+            self._opened_at.pop(key, None)
+
+    def record_failure(self, key: str):
+        with self._lock:
+            self._failures[key] = self._failures.get(key, 0) + 1
+            if self._failures[key] >= self.failure_threshold:
+                self._opened_at[key] = time.monotonic()
+
+
+class RequestStats:
+    """Thread-safe per-endpoint outcome counters and latency samples"""
+
+    OUTCOMES = ("ok", "http_error", "timeout", "connection_error", "retried", "circuit_open")
+
+    def __init__(self):
+        self.outcomes: Dict[str, Dict[str, int]] = {}
+        self.latencies: Dict[str, List[float]] = {}
+        self._lock = threading.Lock()
+
+    def record(self, key: str, outcome: str, latency_ms: Optional[float] = None):
+        with self._lock:
+            counts = self.outcomes.setdefault(key, dict.fromkeys(self.OUTCOMES, 0))
+            counts[outcome] += 1
+            if latency_ms is not None:
+                self.latencies.setdefault(key, []).append(latency_ms)
+
+    def summaries(self) -> Dict[str, Dict[str, Any]]:
+        """Per-endpoint summarize_latencies() plus the count of failed requests"""
+        with self._lock:
+            return {key: {**summarize_latencies(self.latencies.get(key, [])),
+                          'errors': c['http_error'] + c['timeout'] + c['connection_error'] + c['circuit_open']}
+                    for key, c in self.outcomes.items()}
+
+    def print_report(self):
+        if not self.outcomes:
+            return
+        print("\n📡 Request outcomes (latency covers completed responses only)")
+        print(f"   {'Endpoint':<48} {'ok':>5} {'http':>5} {'tmo':>5} {'conn':>5} {'retry':>5} {'open':>5}  p50/p99 ms")
+        for key in sorted(self.outcomes):
+            c = self.outcomes[key]
+            samples = self.latencies.get(key, [])
+            lat = f"{percentile(samples, 50):.0f}/{percentile(samples, 99):.0f}" if samples else "-"
+            print(f"   {key:<48} {c['ok']:>5} {c['http_error']:>5} {c['timeout']:>5} {c['connection_error']:>5} "
+                  f"{c['retried']:>5} {c['circuit_open']:>5}  {lat}")
+
+
+class ResilientSession(requests.Session):
+    """requests.Session with per-endpoint timeouts, jittered retries for idempotent calls and circuit breaking"""
+
+    def __init__(self, max_retries: int = 2, backoff_base: float = 0.25, backoff_cap: float = 4.0,
+                 breaker: Optional[CircuitBreaker] = None, stats: Optional[RequestStats] = None,
+                 timeouts: Optional[Dict[str, Any]] = None):
+        super().__init__()
+        self.max_retries = max_retries
+        self.backoff_base = backoff_base
+        self.backoff_cap = backoff_cap
+        self.breaker = breaker or CircuitBreaker()
+        self.stats = stats or RequestStats()
+        self.timeouts = dict(ENDPOINT_TIMEOUTS if timeouts is None else timeouts)
+        self.default_timeout = DEFAULT_TIMEOUT
+        self.profiler: Optional["ClientProfiler"] = None
+        # Optional live-metrics sink (backend_dashboard.LiveMetrics) notified around every attempt
+        self.metrics = None
+        self.tracer: Optional["Tracer"] = None
+
+    def clone(self) -> "ResilientSession":
+        """New session (for another thread) sharing policy, breaker and stats"""
+        session = ResilientSession(self.max_retries, self.backoff_base, self.backoff_cap,
+                                   self.breaker, self.stats, self.timeouts)
+        session.default_timeout = self.default_timeout
+        session.profiler = self.profiler
+        session.metrics = self.metrics
+        session.tracer = self.tracer
+        if self.metrics:
+            self.metrics.register_session(session)
+        session.hooks['response'] = list(self.hooks['response'])
+        session.headers.update(self.headers)
+        session.cookies.update(self.cookies)
+        return session
+
+    def timeout_for(self, url: str):
+        path = urlparse(url).path
+        best = None
+        for prefix in self.timeouts:
+            if path.startswith(prefix) and (best is None or len(prefix) > len(best)):
+                best = prefix
+        return self.timeouts[best] if best else self.default_timeout
+
+    def request(self, method, url, *args, **kwargs):
+        if not self.tracer:
+            return self._request(method, url, *args, **kwargs)
+        key = endpoint_key(method, url)
+        attributes = {'http.request.method': method.upper(), 'url.full': url, 'http.route': key.split(" ", 1)[1]}
+        with self.tracer.span(key, SPAN_KIND_CLIENT, attributes) as span:
+            kwargs['headers'] = dict(kwargs.get('headers') or {}, traceparent=span.traceparent())
+            response = self._request(method, url, *args, **kwargs)
+            span.set_attribute('http.response.status_code', response.status_code)
+            span.set_status(response.status_code < 500, f"HTTP {response.status_code}")
+            return response
+
+    def _request(self, method, url, *args, **kwargs):
+        key = endpoint_key(method, url)
+        kwargs.setdefault('timeout', self.timeout_for(url))
+        attempts = 1 + (self.max_retries if method.upper() in IDEMPOTENT_METHODS else 0)
+
+        for attempt in range(attempts):
+            if not self.breaker.allow(key):
+                self.stats.record(key, "circuit_open")
+                raise CircuitOpenError(f"Circuit open for {key}")
+
+            started = time.perf_counter()
+            if self.metrics:
+                self.metrics.request_started()
+            try:
+                if self.profiler:
+                    with self.profiler.section("request"):
+                        response = super().request(method, url, *args, **kwargs)
                 else:
-                    self.log_test(
-                        "GET /api/admin/auth/setup", 
-                        False, 
-                        f"API returned success=false: {data.get('message', 'Unknown error')}", 
-                        data
-                    )
-                    return False
+                    response = super().request(method, url, *args, **kwargs)
+            except requests.exceptions.Timeout as e:
+                outcome, error = "timeout", e
+            except requests.exceptions.ConnectionError as e:
+                outcome, error = "connection_error", e
+            except Exception:
+                if self.metrics:
+                    self.metrics.request_finished(key, (time.perf_counter() - started) * 1000, "error")
+                raise
             else:
-                self.log_test(
-                    "GET /api/admin/auth/setup", 
-                    False, 
-                    f"HTTP {response.status_code}: {response.text}"
-                )
-                return False
-                
-        except Exception as e:
-            self.log_test("GET /api/admin/auth/setup", False, f"Exception: {str(e)}")
-            return False
+                latency_ms = (time.perf_counter() - started) * 1000
+                if self.metrics:
+                    self.metrics.request_finished(key, latency_ms, str(response.status_code))
+                if response.status_code in RETRYABLE_STATUSES:
+                    self.breaker.record_failure(key)
+                    self.stats.record(key, "http_error", latency_ms)
+                    if attempt + 1 < attempts:
+                        self._backoff(key, attempt)
+                        continue
+                    return response
+                if response.status_code >= 500:
+                    # Non-retryable server errors still count against the breaker
+                    self.breaker.record_failure(key)
+                    self.stats.record(key, "http_error", latency_ms)
+                else:
+                    self.breaker.record_success(key)
+                    self.stats.record(key, "ok", latency_ms)
+                return response
 
-    def test_admin_login(self) -> bool:
-        """Test POST /api/admin/auth/login - Login with admin credentials"""
-        login_data = {
-            "email": "admin@gibbonnutrition.com",
-            "password": "gibbonsecret"
+            # Timeouts and connection failures never contribute a latency sample
+            if self.metrics:
+                self.metrics.request_finished(key, (time.perf_counter() - started) * 1000, outcome)
+            self.breaker.record_failure(key)
+            self.stats.record(key, outcome)
+            if attempt + 1 >= attempts:
+                raise error
+            self._backoff(key, attempt)
+
+    def _backoff(self, key: str, attempt: int):
+        self.stats.record(key, "retried")
+        time.sleep(random.uniform(0, min(self.backoff_cap, self.backoff_base * (2 ** attempt))))
+
+
+# ===== TRACING =====
+
+SPAN_KIND_INTERNAL = 1
+SPAN_KIND_CLIENT = 3
+STATUS_OK = 1
+STATUS_ERROR = 2
+
+
+def _otlp_value(value: Any) -> Dict[str, Any]:
+    if isinstance(value, bool):
+        return {'boolValue': value}
+    if isinstance(value, int):
+        return {'intValue': str(value)}
+    if isinstance(value, float):
+        return {'doubleValue': value}
+    return {'stringValue': str(value)}
+
+
+class Span:
+    """One timed operation in a trace; ended by Tracer.span()"""
+
+    def __init__(self, name: str, trace_id: str, parent_id: Optional[str], kind: int,
+                 attributes: Optional[Dict[str, Any]] = None):
+        self.name = name
+        self.trace_id = trace_id
+        self.span_id = os.urandom(8).hex()
+        self.parent_id = parent_id
+        self.kind = kind
+        self.attributes = dict(attributes or {})
+        self.status = (0, "")
+        self.start_ns = time.time_ns()
+        self.end_ns: Optional[int] = None
+
+    def set_attribute(self, key: str, value: Any):
+        self.attributes[key] = value
+
+    def set_status(self, ok: bool, message: str = ""):
+        # An error, once recorded, is never overwritten by a later success
+        if self.status[0] != STATUS_ERROR:
+            self.status = (STATUS_OK if ok else STATUS_ERROR, "" if ok else message)
+
+    def traceparent(self) -> str:
+        """W3C trace-context header naming this span as the parent"""
+        return f"00-{self.trace_id}-{self.span_id}-01"
+
+    def to_otlp(self) -> Dict[str, Any]:
+        span = {
+            'traceId': self.trace_id,
+            'spanId': self.span_id,
+            'name': self.name,
+            'kind': self.kind,
+            'startTimeUnixNano': str(self.start_ns),
+            'endTimeUnixNano': str(self.end_ns or self.start_ns),
+            'attributes': [{'key': k, 'value': _otlp_value(v)} for k, v in self.attributes.items()],
+            'status': {'code': self.status[0], 'message': self.status[1]} if self.status[1] else {'code': self.status[0]},
         }
-        
+        if self.parent_id:
+            span['parentSpanId'] = self.parent_id
+        return span
+
+
+class Tracer:
+    """Minimal tracer: per-thread span stacks, traceparent propagation and OTLP/JSON export
+
+    Spans opened on worker threads nest under a test only when the work is bound to it with wrap().
+    """
+
+    def __init__(self, path: Optional[str] = None, endpoint: Optional[str] = None,
+                 service_name: str = "gibbon-backend-tests"):
+        self.path = path
+        self.endpoint = endpoint
+        self.service_name = service_name
+        self.finished: List[Span] = []
+        self._local = threading.local()
+        self._lock = threading.Lock()
+
+    def current(self) -> Optional[Span]:
+        stack = getattr(self._local, 'stack', None)
+        return stack[-1] if stack else None
+
+    def wrap(self, fn: Callable[..., Any]) -> Callable[..., Any]:
+        """Bind fn to the calling thread's current span so spans fn opens on another thread nest under it"""
+        parent = self.current()
+
+        def run(*args, **kwargs):
+            if parent is None:
+                return fn(*args, **kwargs)
+            stack = self._local.__dict__.setdefault('stack', [])
+            stack.append(parent)
+            try:
+                return fn(*args, **kwargs)
+            finally:
+                stack.pop()
+        return run
+
+    @contextmanager
+    def span(self, name: str, kind: int = SPAN_KIND_INTERNAL, attributes: Optional[Dict[str, Any]] = None):
+        parent = self.current()
+        span = Span(name, parent.trace_id if parent else os.urandom(16).hex(),
+                    parent.span_id if parent else None, kind, attributes)
+        stack = self._local.__dict__.setdefault('stack', [])
+        stack.append(span)
         try:
-            response = self.session.post(
-                f"{self.base_url}/api/admin/auth/login",
-                json=login_data
-            )
-            
-            if response.status_code == 200:
-                data = response.json()
-                if data.get('success'):
-                    user = data.get('user', {})
-                    self.admin_user_info = user
-                    self.admin_authenticated = True
-                    
-                    # Check if Set-Cookie header is present
-                    set_cookie = response.headers.get('Set-Cookie', '')
-                    has_admin_token = 'admin_token=' in set_cookie
-                    
-                    self.log_test(
-                        "POST /api/admin/auth/login", 
-                        True, 
-                        f"Login successful for {user.get('email', 'unknown')} (Role: {user.get('role', 'unknown')}) - Cookie set: {has_admin_token}"
-                    )
-                    return True
-                else:
-                    self.log_test(
-                        "POST /api/admin/auth/login", 
-                        False, 
-                        f"Login failed: {data.get('message', 'Unknown error')}", 
-                        data
-                    )
-                    return False
-            else:
-                data = response.json() if response.headers.get('content-type', '').startswith('application/json') else {}
-                self.log_test(
-                    "POST /api/admin/auth/login", 
-                    False, 
-                    f"HTTP {response.status_code}: {data.get('message', response.text)}", 
-                    data
-                )
-                return False
-                
+            yield span
         except Exception as e:
-            self.log_test("POST /api/admin/auth/login", False, f"Exception: {str(e)}")
-            return False
+            span.set_attribute('error.type', type(e).__name__)
+            span.set_status(False, str(e))
+            raise
+        finally:
+            stack.pop()
+            span.end_ns = time.time_ns()
+            with self._lock:
+                self.finished.append(span)
 
-    def test_admin_me(self) -> bool:
-        """Test GET /api/admin/auth/me - Get current user info"""
-        if not self.admin_authenticated:
-            self.log_test("GET /api/admin/auth/me", False, "Cannot test /me endpoint - not authenticated")
-            return False
-            
+    def export(self) -> int:
+        """Append finished spans as one OTLP/JSON ExportTraceServiceRequest line; POST it to a collector if set"""
+        with self._lock:
+            spans, self.finished = self.finished, []
+        if not spans:
+            return 0
+        payload = {'resourceSpans': [{
+            'resource': {'attributes': [{'key': 'service.name', 'value': _otlp_value(self.service_name)}]},
+            'scopeSpans': [{'scope': {'name': "backend_test"}, 'spans': [span.to_otlp() for span in spans]}],
+        }]}
+        if self.path:
+            with open(self.path, "a") as f:
+                f.write(json.dumps(payload) + "\n")
+        if self.endpoint:
+            try:
+                requests.post(f"{self.endpoint.rstrip('/')}/v1/traces", json=payload, timeout=10)
+            except requests.exceptions.RequestException as e:
+                print(f"⚠️  Could not export spans to {self.endpoint}: {e}")
+        return len(spans)
+
+
+# ===== TEST REGISTRY, SELECTION AND SHARDING =====
+
+# The historical run_all_tests sequence; kept as the default when no selection is given
+DEFAULT_TEST_SEQUENCE = [
+    ("Admin Setup Status", "test_admin_setup_status"),
+    ("Admin Login", "test_admin_login"),
+    ("Admin Current User", "test_admin_me"),
+    ("Order List API", "test_orders_list"),
+    ("Single Order API", "test_single_order"),
+    ("Order Update Status", "test_order_update_status"),
+    ("Order Add Note", "test_order_add_note"),
+    ("Order Add Tag", "test_order_add_tag"),
+    ("Order Remove Tag", "test_order_remove_tag"),
+    ("Order Assignment", "test_order_assign"),
+    ("Invoice Generation", "test_order_generate_invoice"),
+    ("Email Sending", "test_order_send_email"),
+    ("Admin Staff List", "test_admin_staff_list"),
+    ("Admin Staff Invite", "test_admin_staff_invite"),
+    ("Admin Logout", "test_admin_logout"),
+    ("Discounts API - GET", "test_discounts_get"),
+    ("Discounts API - POST", "test_discounts_post"),
+    ("Discounts API - PUT", "test_discounts_put"),
+    ("Discounts API - DELETE", "test_discounts_delete"),
+    ("Products API - GET", "test_products_get"),
+    ("PromoCode Validation", "test_promo_code_validation"),
+]
+
+# Tests in a group always land on the same shard and run in this order
+TEST_GROUPS = {
+    "auth": ["test_admin_setup_status", "test_admin_login", "test_admin_me",
+             "test_admin_staff_list", "test_admin_staff_invite", "test_admin_logout"],
+    "orders": ["test_orders_list", "test_single_order", "test_order_update_status", "test_order_add_note",
+               "test_order_add_tag", "test_order_remove_tag", "test_order_assign",
+               "test_order_generate_invoice", "test_order_send_email"],
+    "discounts": ["test_discounts_get", "test_discounts_post", "test_discounts_put", "test_discounts_delete"],
+    "products": ["test_products_get"],
+    "promo": ["test_promo_code_validation"],
+    "reviews": ["test_admin_reviews_list", "test_admin_create_review", "test_admin_update_review",
+                "test_customer_submit_review", "test_public_product_reviews", "test_mark_review_helpful",
+                "test_sample_csv_download", "test_bulk_actions", "test_import_reviews", "test_admin_delete_review"],
+    "load": ["test_helpful_vote_storm", "test_oversell_checkout"],
+}
+
+# Groups whose tests need an admin session; the runner logs in before each of them
+ADMIN_GROUPS = frozenset({"orders", "reviews", "load"})
+
+# Tags excluded unless explicitly requested with --tag
+OPT_IN_TAGS = frozenset({"load"})
+
+# State a test relies on from an earlier test in its group
+TEST_DEPENDS = {
+    "test_admin_me": ["test_admin_login"],
+    "test_admin_staff_list": ["test_admin_login"],
+    "test_admin_staff_invite": ["test_admin_login"],
+    "test_admin_logout": ["test_admin_login"],
+    "test_discounts_put": ["test_discounts_post"],
+    "test_discounts_delete": ["test_discounts_post"],
+    "test_admin_update_review": ["test_admin_create_review"],
+    "test_mark_review_helpful": ["test_admin_create_review"],
+    "test_bulk_actions": ["test_admin_create_review"],
+    "test_admin_delete_review": ["test_admin_create_review"],
+}
+
+
+class TestCase:
+    """A discovered test_* method with its group, tags and display label"""
+
+    def __init__(self, name: str, label: str, group: str, tags: frozenset):
+        self.name = name
+        self.label = label
+        self.group = group
+        self.tags = tags
+
+    def __repr__(self):
+        return f"TestCase({self.name!r}, group={self.group!r})"
+
+
+class TestRegistry:
+    """Discovers every APITester.test_* method and plans filtered, duration-balanced shards"""
+
+    def __init__(self, tester_class: type):
+        labels = dict((name, label) for label, name in DEFAULT_TEST_SEQUENCE)
+        group_of = {name: group for group, names in TEST_GROUPS.items() for name in names}
+        self.cases: List[TestCase] = []
+        # Class __dict__ preserves source order, which ungrouped tests fall back to
+        for name, attr in vars(tester_class).items():
+            if not name.startswith("test_") or not callable(attr):
+                continue
+            group = group_of.get(name, name[len("test_"):])
+            tags = {group, "admin" if group in ADMIN_GROUPS or "admin" in name else "public"}
+            tags.update(part for part in name[len("test_"):].split("_") if len(part) > 2)
+            label = labels.get(name, name[len("test_"):].replace("_", " ").title())
+            self.cases.append(TestCase(name, label, group, frozenset(tags)))
+        self._by_name = {case.name: case for case in self.cases}
+
+    def select(self, tags: Optional[List[str]] = None, exclude_tags: Optional[List[str]] = None,
+               names: Optional[List[str]] = None) -> List[TestCase]:
+        """Filter by tag (any match), excluded tag and name substring; prerequisites are pulled in"""
+        wanted = set(tags or [])
+        excluded = set(exclude_tags or []) | (OPT_IN_TAGS - wanted)
+        chosen = set()
+        for case in self.cases:
+            if wanted and not (case.tags & wanted):
+                continue
+            if case.tags & excluded:
+                continue
+            if names and not any(n in case.name for n in names):
+                continue
+            chosen.add(case.name)
+
+        pending = list(chosen)
+        while pending:
+            for dep in TEST_DEPENDS.get(pending.pop(), []):
+                if dep not in chosen:
+                    chosen.add(dep)
+                    pending.append(dep)
+
+        return [self._by_name[name] for name in self._ordered_names() if name in chosen]
+
+    def default_cases(self) -> List[TestCase]:
+        """The historical DEFAULT_TEST_SEQUENCE as TestCases"""
+        return [self._by_name[name] for _, name in DEFAULT_TEST_SEQUENCE]
+
+    def _ordered_names(self) -> List[str]:
+        ordered = [name for names in TEST_GROUPS.values() for name in names if name in self._by_name]
+        return ordered + [case.name for case in self.cases if case.name not in ordered]
+
+    @staticmethod
+    def load_durations(path: Optional[str]) -> Dict[str, float]:
+        if not path:
+            return {}
         try:
-            response = self.session.get(f"{self.base_url}/api/admin/auth/me")
-            
-            if response.status_code == 200:
-                data = response.json()
-                if data.get('success'):
-                    user = data.get('user', {})
-                    expected_email = "admin@gibbonnutrition.com"
-                    actual_email = user.get('email', '')
-                    
-                    if actual_email.lower() == expected_email.lower():
-                        self.log_test(
-                            "GET /api/admin/auth/me", 
-                            True, 
-                            f"User info retrieved successfully: {user.get('name', 'Unknown')} ({user.get('role', 'unknown')})"
-                        )
-                        return True
-                    else:
-                        self.log_test(
-                            "GET /api/admin/auth/me", 
-                            False, 
-                            f"User email mismatch: expected {expected_email}, got {actual_email}", 
-                            data
-                        )
-                        return False
-                else:
-                    self.log_test(
-                        "GET /api/admin/auth/me", 
-                        False, 
-                        f"API returned success=false: {data.get('message', 'Unknown error')}", 
-                        data
-                    )
-                    return False
-            elif response.status_code == 401:
-                self.log_test(
-                    "GET /api/admin/auth/me", 
-                    False, 
-                    "Authentication failed - cookie not working properly"
-                )
-                return False
-            else:
-                data = response.json() if response.headers.get('content-type', '').startswith('application/json') else {}
-                self.log_test(
-                    "GET /api/admin/auth/me", 
-                    False, 
-                    f"HTTP {response.status_code}: {data.get('message', response.text)}", 
-                    data
-                )
-                return False
-                
-        except Exception as e:
-            self.log_test("GET /api/admin/auth/me", False, f"Exception: {str(e)}")
-            return False
+            with open(path) as f:
+                return {k: float(v) for k, v in json.load(f).items()}
+        except FileNotFoundError:
+            return {}
 
-    def test_admin_staff_list(self) -> bool:
-        """Test GET /api/admin/staff - List all staff members"""
-        if not self.admin_authenticated:
-            self.log_test("GET /api/admin/staff", False, "Cannot test staff list - not authenticated")
-            return False
-            
-        try:
-            response = self.session.get(f"{self.base_url}/api/admin/staff")
-            
-            if response.status_code == 200:
-                data = response.json()
-                if data.get('success'):
-                    staff = data.get('staff', [])
-                    owner_found = any(s.get('role') == 'owner' for s in staff)
-                    
-                    if owner_found and len(staff) >= 1:
-                        self.log_test(
-                            "GET /api/admin/staff", 
-                            True, 
-                            f"Staff list retrieved successfully: {len(staff)} members (owner found)"
-                        )
-                        return True
-                    else:
-                        self.log_test(
-                            "GET /api/admin/staff", 
-                            False, 
-                            f"Staff list incomplete: {len(staff)} members, owner found: {owner_found}", 
-                            data
-                        )
-                        return False
-                else:
-                    self.log_test(
-                        "GET /api/admin/staff", 
-                        False, 
-                        f"API returned success=false: {data.get('message', 'Unknown error')}", 
-                        data
-                    )
-                    return False
-            elif response.status_code == 401:
-                self.log_test(
-                    "GET /api/admin/staff", 
-                    False, 
-                    "Authentication failed - cookie not working properly"
-                )
-                return False
-            elif response.status_code == 403:
-                self.log_test(
-                    "GET /api/admin/staff", 
-                    False, 
-                    "Permission denied - user lacks staff.view permission"
-                )
-                return False
-            else:
-                data = response.json() if response.headers.get('content-type', '').startswith('application/json') else {}
-                self.log_test(
-                    "GET /api/admin/staff", 
-                    False, 
-                    f"HTTP {response.status_code}: {data.get('message', response.text)}", 
-                    data
-                )
-                return False
-                
-        except Exception as e:
-            self.log_test("GET /api/admin/staff", False, f"Exception: {str(e)}")
-            return False
-
-    def test_admin_staff_invite(self) -> bool:
-        """Test POST /api/admin/staff - Invite new staff member"""
-        if not self.admin_authenticated:
-            self.log_test("POST /api/admin/staff", False, "Cannot test staff invite - not authenticated")
-            return False
-            
-        invite_data = {
-            "email": "staff@test.com",
-            "name": "Test Staff",
-            "role": "staff"
-        }
-        
-        try:
-            response = self.session.post(
-                f"{self.base_url}/api/admin/staff",
-                json=invite_data
-            )
-            
-            if response.status_code == 201:
-                data = response.json()
-                if data.get('success'):
-                    staff = data.get('staff', {})
-                    temp_password = data.get('staff', {}).get('tempPassword')
-                    
-                    if temp_password:
-                        self.log_test(
-                            "POST /api/admin/staff", 
-                            True, 
-                            f"Staff invited successfully: {staff.get('email')} with temp password"
-                        )
-                        return True
-                    else:
-                        self.log_test(
-                            "POST /api/admin/staff", 
-                            False, 
-                            "Staff invite missing temporary password", 
-                            data
-                        )
-                        return False
-                else:
-                    self.log_test(
-                        "POST /api/admin/staff", 
-                        False, 
-                        f"API returned success=false: {data.get('message', 'Unknown error')}", 
-                        data
-                    )
-                    return False
-            elif response.status_code == 400:
-                data = response.json() if response.headers.get('content-type', '').startswith('application/json') else {}
-                if "already registered" in data.get('message', ''):
-                    self.log_test(
-                        "POST /api/admin/staff", 
-                        True, 
-                        "Staff invite working (email already exists - expected behavior)"
-                    )
-                    return True
-                else:
-                    self.log_test(
-                        "POST /api/admin/staff", 
-                        False, 
-                        f"Bad request: {data.get('message', response.text)}", 
-                        data
-                    )
-                    return False
-            elif response.status_code == 401:
-                self.log_test(
-                    "POST /api/admin/staff", 
-                    False, 
-                    "Authentication failed - cookie not working properly"
-                )
-                return False
-            elif response.status_code == 403:
-                self.log_test(
-                    "POST /api/admin/staff", 
-                    False, 
-                    "Permission denied - user lacks staff.invite permission"
-                )
-                return False
-            else:
-                data = response.json() if response.headers.get('content-type', '').startswith('application/json') else {}
-                self.log_test(
-                    "POST /api/admin/staff", 
-                    False, 
-                    f"HTTP {response.status_code}: {data.get('message', response.text)}", 
-                    data
-                )
-                return False
-                
-        except Exception as e:
-            self.log_test("POST /api/admin/staff", False, f"Exception: {str(e)}")
-            return False
-
-    def test_admin_logout(self) -> bool:
-        """Test POST /api/admin/auth/logout - Logout and clear cookie"""
-        try:
-            response = self.session.post(f"{self.base_url}/api/admin/auth/logout")
-            
-            if response.status_code == 200:
-                data = response.json()
-                if data.get('success'):
-                    self.admin_authenticated = False
-                    self.admin_user_info = None
-                    
-                    # Check if cookie is cleared by trying to access /me
-                    me_response = self.session.get(f"{self.base_url}/api/admin/auth/me")
-                    if me_response.status_code == 401:
-                        self.log_test(
-                            "POST /api/admin/auth/logout", 
-                            True, 
-                            "Logout successful - cookie cleared properly"
-                        )
-                        return True
-                    else:
-                        self.log_test(
-                            "POST /api/admin/auth/logout", 
-                            False, 
-                            "Logout incomplete - cookie not cleared properly"
-                        )
-                        return False
-                else:
-                    self.log_test(
-                        "POST /api/admin/auth/logout", 
-                        False, 
-                        f"API returned success=false: {data.get('message', 'Unknown error')}", 
-                        data
-                    )
-                    return False
-            else:
-                data = response.json() if response.headers.get('content-type', '').startswith('application/json') else {}
-                self.log_test(
-                    "POST /api/admin/auth/logout", 
-                    False, 
-                    f"HTTP {response.status_code}: {data.get('message', response.text)}", 
-                    data
-                )
-                return False
-                
-        except Exception as e:
-            self.log_test("POST /api/admin/auth/logout", False, f"Exception: {str(e)}")
-            return False
-
-    def test_discounts_get(self) -> bool:
-        """Test GET /api/discounts - List all discount codes"""
-        try:
-            response = self.session.get(f"{self.base_url}/api/discounts")
-            
-            if response.status_code == 200:
-                data = response.json()
-                if data.get('success'):
-                    discounts = data.get('discounts', [])
-                    self.log_test(
-                        "GET /api/discounts", 
-                        True, 
-                        f"Successfully retrieved {len(discounts)} discounts"
-                    )
-                    return True
-                else:
-                    self.log_test(
-                        "GET /api/discounts", 
-                        False, 
-                        f"API returned success=false: {data.get('message', 'Unknown error')}", 
-                        data
-                    )
-                    return False
-            else:
-                self.log_test(
-                    "GET /api/discounts", 
-                    False, 
-                    f"HTTP {response.status_code}: {response.text}"
-                )
-                return False
-                
-        except Exception as e:
-            self.log_test("GET /api/discounts", False, f"Exception: {str(e)}")
-            return False
-
-    def test_discounts_post(self) -> bool:
-        """Test POST /api/discounts - Create new discount"""
-        test_discount = {
-            "code": "TEST20",
-            "discountType": "percentage",
-            "discountValue": 20,
-            "minOrderAmount": 1000,
-            "usageLimit": 50,
-            "isActive": True,
-            "appliesTo": "all"
-        }
-        
-        try:
-            response = self.session.post(
-                f"{self.base_url}/api/discounts",
-                json=test_discount
-            )
-            
-            if response.status_code == 201:
-                data = response.json()
-                if data.get('success'):
-                    discount = data.get('discount', {})
-                    self.created_discount_id = discount.get('_id')
-                    self.log_test(
-                        "POST /api/discounts", 
-                        True, 
-                        f"Successfully created discount with ID: {self.created_discount_id}"
-                    )
-                    return True
-                else:
-                    self.log_test(
-                        "POST /api/discounts", 
-                        False, 
-                        f"API returned success=false: {data.get('message', 'Unknown error')}", 
-                        data
-                    )
-                    return False
-            elif response.status_code == 400:
-                # Code already exists, try to get existing discount
-                data = response.json()
-                if "already exists" in data.get('message', ''):
-                    # Get existing discount ID
-                    get_response = self.session.get(f"{self.base_url}/api/discounts")
-                    if get_response.status_code == 200:
-                        get_data = get_response.json()
-                        discounts = get_data.get('discounts', [])
-                        for discount in discounts:
-                            if discount.get('code') == 'TEST20':
-                                self.created_discount_id = discount.get('_id')
-                                self.log_test(
-                                    "POST /api/discounts", 
-                                    True, 
-                                    f"Discount already exists, using existing ID: {self.created_discount_id}"
-                                )
-                                return True
-                
-                self.log_test(
-                    "POST /api/discounts", 
-                    False, 
-                    f"HTTP {response.status_code}: {data.get('message', response.text)}", 
-                    data
-                )
-                return False
+    @staticmethod
+    def save_durations(path: str, measured: Dict[str, float], smoothing: float = 0.5):
+        """Merge measured seconds into the durations file with exponential smoothing"""
+        history = TestRegistry.load_durations(path)
+        for name, seconds in measured.items():
+            previous = history.get(name)
+            history[name] = seconds if previous is None else smoothing * seconds + (1 - smoothing) * previous
+        with open(path, "w") as f:
+            json.dump(dict(sorted(history.items())), f, indent=2)
+
+    @staticmethod
+    def shard(cases: List[TestCase], shard_count: int, durations: Dict[str, float]) -> List[List[TestCase]]:
+        """Longest-processing-time-first packing of whole groups onto shard_count shards"""
+        known = sorted(durations.values())
+        default = known[len(known) // 2] if known else 1.0
+        groups: Dict[str, List[TestCase]] = {}
+        for case in cases:
+            groups.setdefault(case.group, []).append(case)
+
+        def weight(group: str) -> float:
+            # Admin groups pay for a login on every shard they land on
+            login = durations.get("test_admin_login", default) if group in ADMIN_GROUPS else 0.0
+            return login + sum(durations.get(c.name, default) for c in groups[group])
+
+        shards: List[List[TestCase]] = [[] for _ in range(max(1, shard_count))]
+        loads = [0.0] * len(shards)
+        for group in sorted(groups, key=lambda g: (-weight(g), g)):
+            target = min(range(len(shards)), key=lambda i: (loads[i], i))
+            shards[target].extend(groups[group])
+            loads[target] += weight(group)
+
+        order = {name: i for i, name in enumerate(case.name for case in cases)}
+        return [sorted(shard, key=lambda c: order[c.name]) for shard in shards]
+
+
+# ===== CHANGE-AWARE INCREMENTAL RUNS =====
+
+DEFAULT_RESULTS_CACHE = os.path.join(REPO_ROOT, ".api_test_cache.json")
+# Changing the harness itself invalidates every cached result
+HARNESS_FILES = {"backend_test.py"}
+IMPORT_SPEC = re.compile(r"""(?:\bfrom|\bimport|\brequire\()\s*['"]([^'"]+)['"]""")
+SOURCE_EXTENSIONS = (".ts", ".tsx", ".js", ".jsx", ".mjs")
+
+
+def match_route(key: str, routes: List[Dict[str, Any]]) -> Optional[Dict[str, Any]]:
+    """Discovered route serving an endpoint_key() like 'GET /api/admin/orders/[id]'; literal segments win"""
+    segments = key.split(" ", 1)[-1].strip("/").split("/")
+    best, best_score = None, -1
+    for route in routes:
+        pattern = route['path'].strip("/").split("/")
+        if len(pattern) != len(segments):
+            continue
+        score = 0
+        for want, have in zip(pattern, segments):
+            if want == have:
+                score += 2
+            elif want.startswith("[") or have.startswith("["):
+                score += 1 if want.startswith("[") else 0
             else:
-                data = response.json() if response.headers.get('content-type', '').startswith('application/json') else {}
-                self.log_test(
-                    "POST /api/discounts", 
-                    False, 
-                    f"HTTP {response.status_code}: {data.get('message', response.text)}", 
-                    data
-                )
-                return False
-                
-        except Exception as e:
-            self.log_test("POST /api/discounts", False, f"Exception: {str(e)}")
-            return False
+                break
+        else:
+            if score > best_score:
+                best, best_score = route, score
+    return best
 
-    def test_discounts_put(self) -> bool:
-        """Test PUT /api/discounts/{id} - Update discount"""
-        if not self.created_discount_id:
-            self.log_test("PUT /api/discounts/{id}", False, "No discount ID available for update test")
-            return False
-            
-        update_data = {
-            "discountValue": 25,
-            "usageLimit": 100,
-            "isActive": True
-        }
-        
+
+def _resolve_import(spec: str, importer: str) -> Optional[str]:
+    if spec.startswith("@/"):
+        base = os.path.join(REPO_ROOT, "src", spec[2:])
+    elif spec.startswith("."):
+        base = os.path.normpath(os.path.join(os.path.dirname(importer), spec))
+    else:
+        return None
+    for candidate in [base] + [base + ext for ext in SOURCE_EXTENSIONS] + \
+                     [os.path.join(base, "index" + ext) for ext in SOURCE_EXTENSIONS]:
+        if os.path.isfile(candidate):
+            return candidate
+    return None
+
+
+def source_closure(file: str) -> set:
+    """Repo-relative paths of file and everything it transitively imports from src/"""
+    seen, pending = set(), [file]
+    while pending:
+        current = pending.pop()
+        if current in seen:
+            continue
+        seen.add(current)
         try:
-            response = self.session.put(
-                f"{self.base_url}/api/discounts/{self.created_discount_id}",
-                json=update_data
-            )
-            
-            if response.status_code == 200:
-                data = response.json()
-                if data.get('success'):
-                    self.log_test(
-                        "PUT /api/discounts/{id}", 
-                        True, 
-                        "Successfully updated discount"
-                    )
-                    return True
-                else:
-                    self.log_test(
-                        "PUT /api/discounts/{id}", 
-                        False, 
-                        f"API returned success=false: {data.get('message', 'Unknown error')}", 
-                        data
-                    )
-                    return False
-            else:
-                data = response.json() if response.headers.get('content-type', '').startswith('application/json') else {}
-                self.log_test(
-                    "PUT /api/discounts/{id}", 
-                    False, 
-                    f"HTTP {response.status_code}: {data.get('message', response.text)}", 
-                    data
-                )
-                return False
-                
-        except Exception as e:
-            self.log_test("PUT /api/discounts/{id}", False, f"Exception: {str(e)}")
-            return False
+            with open(current, encoding="utf-8") as f:
+                specs = IMPORT_SPEC.findall(f.read())
+        except OSError:
+            continue
+        pending.extend(target for target in (_resolve_import(spec, current) for spec in specs) if target)
+    return {os.path.relpath(path, REPO_ROOT) for path in seen}
 
-    def test_discounts_delete(self) -> bool:
-        """Test DELETE /api/discounts/{id} - Delete discount"""
-        if not self.created_discount_id:
-            self.log_test("DELETE /api/discounts/{id}", False, "No discount ID available for delete test")
-            return False
-            
+
+def changed_files(base: str = "HEAD") -> set:
+    """Repo-relative files that differ from base, including uncommitted and untracked changes"""
+    diff = subprocess.run(["git", "diff", "--name-only", base], cwd=REPO_ROOT, capture_output=True, text=True, check=True)
+    untracked = subprocess.run(["git", "ls-files", "--others", "--exclude-standard"], cwd=REPO_ROOT,
+                               capture_output=True, text=True, check=True)
+    return {line for line in (diff.stdout + untracked.stdout).splitlines() if line}
+
+
+def current_commit() -> Optional[str]:
+    result = subprocess.run(["git", "rev-parse", "--short", "HEAD"], cwd=REPO_ROOT, capture_output=True, text=True)
+    return result.stdout.strip() or None
+
+
+class ResultsCache:
+    """Per-test route files, source dependencies, outcome and last timings, persisted as JSON"""
+
+    def __init__(self, path: str):
+        self.path = path
         try:
-            response = self.session.delete(f"{self.base_url}/api/discounts/{self.created_discount_id}")
-            
-            if response.status_code == 200:
-                data = response.json()
-                if data.get('success'):
-                    self.log_test(
-                        "DELETE /api/discounts/{id}", 
-                        True, 
-                        "Successfully deleted discount"
-                    )
-                    return True
-                else:
-                    self.log_test(
-                        "DELETE /api/discounts/{id}", 
-                        False, 
-                        f"API returned success=false: {data.get('message', 'Unknown error')}", 
-                        data
-                    )
-                    return False
-            else:
-                data = response.json() if response.headers.get('content-type', '').startswith('application/json') else {}
-                self.log_test(
-                    "DELETE /api/discounts/{id}", 
-                    False, 
-                    f"HTTP {response.status_code}: {data.get('message', response.text)}", 
-                    data
-                )
-                return False
-                
-        except Exception as e:
-            self.log_test("DELETE /api/discounts/{id}", False, f"Exception: {str(e)}")
-            return False
+            with open(path) as f:
+                self.entries: Dict[str, Dict[str, Any]] = json.load(f)
+        except FileNotFoundError:
+            self.entries = {}
 
-    def test_products_get(self) -> bool:
-        """Test GET /api/products - List all products with inventory data"""
+    def affected(self, cases: List[TestCase], changed: set) -> List[TestCase]:
+        """Cases to re-run: never cached, failed last time, or depending on a changed file (plus prerequisites)"""
+        if changed & HARNESS_FILES:
+            return list(cases)
+        chosen = {case.name for case in cases
+                  if case.name not in self.entries
+                  or not self.entries[case.name]['ok']
+                  or changed & set(self.entries[case.name]['sources'])}
+        pending = list(chosen)
+        while pending:
+            for dep in TEST_DEPENDS.get(pending.pop(), []):
+                if dep not in chosen:
+                    chosen.add(dep)
+                    pending.append(dep)
+        return [case for case in cases if case.name in chosen]
+
+    def update(self, tester: "APITester", routes: List[Dict[str, Any]]):
+        commit = current_commit()
+        for name, ok in tester.test_outcomes.items():
+            files, sources = set(), set()
+            for key in tester.endpoints_hit.get(name, {}):
+                route = match_route(key, routes)
+                if route:
+                    files.add(os.path.relpath(route['file'], REPO_ROOT))
+                    sources |= source_closure(route['file'])
+            self.entries[name] = {
+                'ok': ok,
+                'seconds': round(tester.test_durations.get(name, 0.0), 3),
+                'routes': sorted(files),
+                'sources': sorted(sources),
+                'endpoints': {key: round(sum(ms) / len(ms), 1) for key, ms in tester.endpoints_hit.get(name, {}).items()},
+                'commit': commit,
+                'recorded_at': time.strftime("%Y-%m-%dT%H:%M:%S"),
+            }
+
+    def save(self):
+        with open(self.path, "w") as f:
+            json.dump(dict(sorted(self.entries.items())), f, indent=2)
+
+
+def record_history(path: str, stats: RequestStats, target: str, scenario: str, started_at: str,
+                   passed: Optional[bool] = None, raw_samples: bool = False) -> int:
+    """Append this run's per-endpoint aggregates (and optionally every latency sample) to the history store"""
+    with ResultsStore(path) as store:
+        return store.record_run(target, scenario, stats.summaries(),
+                                samples=dict(stats.latencies) if raw_samples else None, git_commit=current_commit(),
+                                started_at=started_at, passed=passed)
+
+
+# ===== CLIENT-SIDE PROFILING =====
+
+class ClientProfiler:
+    """Opt-in per-test cProfile, sampled flame-graph stacks and client CPU vs wait accounting"""
+
+    def __init__(self, output_dir: str, sample_interval: float = 0.005):
+        self.output_dir = output_dir
+        self.sample_interval = sample_interval
+        self.results: Dict[str, Dict[str, Any]] = {}
+        self._current: Optional[Dict[str, Any]] = None
+        self._lock = threading.Lock()
+        os.makedirs(output_dir, exist_ok=True)
+
+    def attach(self, tester: "APITester"):
+        """Route the tester's requests, JSON decoding and log_test through the profiler"""
+        tester.profiler = self
+        tester.session.profiler = self
+        tester.session.hooks['response'].append(self._wrap_json)
+
+    def _wrap_json(self, response: requests.Response, *args, **kwargs) -> requests.Response:
+        decode = response.json
+
+        def timed_json(**json_kwargs):
+            with self.section("json_decode"):
+                return decode(**json_kwargs)
+
+        response.json = timed_json
+        return response
+
+    @contextmanager
+    def section(self, phase: str):
+        """Accumulate wall and thread-CPU seconds for a client phase of the current test"""
+        wall_start, cpu_start = time.perf_counter(), time.thread_time()
         try:
-            response = self.session.get(f"{self.base_url}/api/products")
-            
-            if response.status_code == 200:
-                data = response.json()
-                if data.get('success'):
-                    products = data.get('products', [])
-                    
-                    # Check if products have variants with inventoryQty
-                    inventory_check_passed = True
-                    inventory_issues = []
-                    
-                    for i, product in enumerate(products[:5]):  # Check first 5 products
-                        variants = product.get('variants', [])
-                        if not variants:
-                            inventory_issues.append(f"Product {i+1} has no variants")
-                            inventory_check_passed = False
-                        else:
-                            for j, variant in enumerate(variants):
-                                if 'inventoryQty' not in variant:
-                                    inventory_issues.append(f"Product {i+1}, Variant {j+1} missing inventoryQty")
-                                    inventory_check_passed = False
-                    
-                    if inventory_check_passed:
-                        self.log_test(
-                            "GET /api/products", 
-                            True, 
-                            f"Successfully retrieved {len(products)} products with proper inventory data"
-                        )
-                    else:
-                        self.log_test(
-                            "GET /api/products", 
-                            False, 
-                            f"Products missing inventory data: {'; '.join(inventory_issues[:3])}"
-                        )
-                    
-                    return inventory_check_passed
-                else:
-                    self.log_test(
-                        "GET /api/products", 
-                        False, 
-                        f"API returned success=false: {data.get('message', 'Unknown error')}", 
-                        data
-                    )
-                    return False
+            yield
+        finally:
+            wall, cpu = time.perf_counter() - wall_start, time.thread_time() - cpu_start
+            with self._lock:
+                if self._current is not None:
+                    totals = self._current['phases'].setdefault(phase, {'wall_s': 0.0, 'cpu_s': 0.0, 'count': 0})
+                    totals['wall_s'] += wall
+                    totals['cpu_s'] += cpu
+                    totals['count'] += 1
+
+    @contextmanager
+    def profile_test(self, test_name: str):
+        current = {'phases': {}}
+        stacks: Dict[str, int] = {}
+        stop = threading.Event()
+        sampler = threading.Thread(target=self._sample_stacks, args=(stacks, stop), daemon=True)
+        profile = cProfile.Profile()
+
+        with self._lock:
+            self._current = current
+        sampler.start()
+        wall_start, cpu_start = time.perf_counter(), time.thread_time()
+        profile.enable()
+        try:
+            yield
+        finally:
+            profile.disable()
+            wall, cpu = time.perf_counter() - wall_start, time.thread_time() - cpu_start
+            stop.set()
+            sampler.join()
+            with self._lock:
+                self._current = None
+
+            profile.dump_stats(os.path.join(self.output_dir, f"{test_name}.prof"))
+            with open(os.path.join(self.output_dir, f"{test_name}.folded"), "w") as f:
+                for stack, count in sorted(stacks.items()):
+                    f.write(f"{stack} {count}\n")
+
+            current.update({'wall_s': wall, 'client_cpu_s': cpu, 'wait_s': max(0.0, wall - cpu)})
+            self.results[test_name] = current
+
+    def _sample_stacks(self, stacks: Dict[str, int], stop: threading.Event):
+        """Collapsed-stack sampler ('frame;frame;frame count') for flamegraph.pl / speedscope"""
+        own = threading.get_ident()
+        names = {}
+        while not stop.wait(self.sample_interval):
+            for ident, frame in sys._current_frames().items():
+                if ident == own:
+                    continue
+                if ident not in names:
+                    thread = next((t for t in threading.enumerate() if t.ident == ident), None)
+                    names[ident] = thread.name if thread else str(ident)
+                frames = []
+                while frame is not None:
+                    code = frame.f_code
+                    frames.append(f"{code.co_name} ({os.path.basename(code.co_filename)}:{code.co_firstlineno})")
+                    frame = frame.f_back
+                key = ";".join([names[ident]] + frames[::-1])
+                stacks[key] = stacks.get(key, 0) + 1
+
+    def print_report(self):
+        if not self.results:
+            return
+        print(f"\n🔬 Client profile (cProfile .prof and .folded stacks in {self.output_dir})")
+        print(f"   {'Test':<36} {'wall ms':>9} {'client cpu':>11} {'wait':>9}   phases (wall/cpu ms)")
+        for test_name, result in self.results.items():
+            phases = ", ".join(
+                f"{phase} {p['wall_s'] * 1000:.1f}/{p['cpu_s'] * 1000:.1f} x{p['count']}"
+                for phase, p in sorted(result['phases'].items())
+            )
+            print(f"   {test_name:<36} {result['wall_s'] * 1000:>9.1f} {result['client_cpu_s'] * 1000:>11.1f} "
+                  f"{result['wait_s'] * 1000:>9.1f}   {phases}")
+        with open(os.path.join(self.output_dir, "profile_summary.json"), "w") as f:
+            json.dump(self.results, f, indent=2)
+
+
+# ===== SERVER-TIMING CAPTURE =====
+
+# Server-Timing metric names mapped onto the segments we report
+SERVER_TIMING_SEGMENTS = {
+    "db": ("db", "mongo", "mongodb", "database", "query"),
+    # Entries added by hops in front of the server; not server work, so they count as network
+    "proxy": ("proxy", "upstream", "edge"),
+    "handler": ("handler", "app", "route", "render"),
+    "total": ("total", "server"),
+}
+_RESPONSE_TIME = re.compile(r"^\s*([\d.]+)\s*(ms|s)?\s*$", re.IGNORECASE)
+
+
+def parse_server_timing(header: str) -> Dict[str, float]:
+    """Parse 'db;dur=12.3;desc="Mongo", handler;dur=40' into {'db': 12.3, 'handler': 40.0}"""
+    metrics: Dict[str, float] = {}
+    for entry in header.split(","):
+        parts = [p.strip() for p in entry.split(";")]
+        if not parts[0]:
+            continue
+        for param in parts[1:]:
+            name, _, value = param.partition("=")
+            if name.strip().lower() == "dur":
+                try:
+                    metrics[parts[0].lower()] = metrics.get(parts[0].lower(), 0.0) + float(value.strip().strip('"'))
+                except ValueError:
+                    pass
+    return metrics
+
+
+def parse_response_time(header: str) -> Optional[float]:
+    """X-Response-Time as milliseconds ('12.5ms', '0.0125s' or a bare millisecond number)"""
+    match = _RESPONSE_TIME.match(header or "")
+    if not match:
+        return None
+    value = float(match.group(1))
+    return value * 1000 if (match.group(2) or "").lower() == "s" else value
+
+
+def decompose_latency(client_ms: float, headers: Dict[str, str]) -> Optional[Dict[str, float]]:
+    """Split client latency into network/handler/db ms, or None when the server itself sent no timing"""
+    metrics = parse_server_timing(headers.get('Server-Timing', ''))
+    response_time = parse_response_time(headers.get('X-Response-Time', ''))
+
+    def segment(name: str) -> Optional[float]:
+        found = [v for k, v in metrics.items() if k in SERVER_TIMING_SEGMENTS[name]]
+        return sum(found) if found else None
+
+    # A proxy entry alone says nothing about the route: it is still uninstrumented
+    server_metrics = {k: v for k, v in metrics.items() if k not in SERVER_TIMING_SEGMENTS["proxy"]}
+    if not server_metrics and response_time is None:
+        return None
+
+    db = segment("db") or 0.0
+    handler = segment("handler")
+    other = sum(v for k, v in server_metrics.items()
+                if not any(k in names for names in SERVER_TIMING_SEGMENTS.values()))
+    # Only an overall total is known to include db; a bare handler metric is taken as exclusive of it
+    server = segment("total") or response_time
+    if server is None:
+        server = (handler or 0.0) + db + other
+    server = max(server, db)
+    return {
+        'client': client_ms,
+        'network': max(0.0, client_ms - server),
+        'handler': handler if handler is not None else server - db,
+        'db': db,
+    }
+
+
+class ServerTimingStats:
+    """Response hook collecting per-endpoint latency decompositions and routes missing timing headers"""
+
+    SEGMENTS = ("client", "network", "handler", "db")
+
+    def __init__(self):
+        self.samples: Dict[str, List[Dict[str, float]]] = {}
+        self.missing: Dict[str, int] = {}
+        self._lock = threading.Lock()
+
+    def attach(self, session: requests.Session):
+        session.hooks['response'].append(self.record)
+
+    def record(self, response: requests.Response, *args, **kwargs) -> requests.Response:
+        key = endpoint_key(response.request.method, response.request.url)
+        parts = decompose_latency(response.elapsed.total_seconds() * 1000, response.headers)
+        with self._lock:
+            if parts is None:
+                self.missing[key] = self.missing.get(key, 0) + 1
             else:
-                self.log_test(
-                    "GET /api/products", 
-                    False, 
-                    f"HTTP {response.status_code}: {response.text}"
-                )
-                return False
-                
-        except Exception as e:
-            self.log_test("GET /api/products", False, f"Exception: {str(e)}")
-            return False
+                self.samples.setdefault(key, []).append(parts)
+        return response
+
+    def print_report(self):
+        if not self.samples and not self.missing:
+            return
+        print("\n⏱️  Latency decomposition from Server-Timing / X-Response-Time (mean ms)")
+        print(f"   {'Endpoint':<48} {'n':>5} {'client':>8} {'network':>8} {'handler':>8} {'db':>8}")
+        for key in sorted(self.samples):
+            rows = self.samples[key]
+            means = {s: sum(r[s] for r in rows) / len(rows) for s in self.SEGMENTS}
+            print(f"   {key:<48} {len(rows):>5} " + " ".join(f"{means[s]:>8.1f}" for s in self.SEGMENTS))
+        uninstrumented = sorted(k for k in self.missing if k not in self.samples)
+        if uninstrumented:
+            print("   ⚠️  No timing headers emitted by:")
+            for key in uninstrumented:
+                print(f"      {key} ({self.missing[key]} responses)")
+
+
+# ===== LATENCY AND PAYLOAD BUDGETS =====
+
+# Per-endpoint budgets keyed like endpoint_key(); p50_ms/p95_ms/p99_ms bound response time to headers,
+# max_bytes bounds the largest response body. POST endpoints name a PAYLOAD_TEMPLATES entry to probe with.
+# statuses lists the responses that are valid samples (default: any 2xx); everything else is a rejection.
+ENDPOINT_BUDGETS: Dict[str, Dict[str, Any]] = {
+    # The probe code may not exist on the target: not-found/invalid/expired are real validation answers
+    "POST /api/promoCode/check": {'p95_ms': 150, 'max_bytes': 4_096, 'probe': "promo_check",
+                                  'statuses': [200, 400, 404, 410]},
+    "GET /api/products": {'p95_ms': 800, 'max_bytes': 1_048_576},
+    "GET /api/products/[handle]": {'p95_ms': 400, 'max_bytes': 262_144},
+    "GET /api/product-reviews/[handle]": {'p95_ms': 400, 'max_bytes': 262_144},
+    "GET /api/discounts": {'p95_ms': 300, 'max_bytes': 131_072},
+    "GET /api/collections": {'p95_ms': 400, 'max_bytes': 262_144},
+    "GET /api/navigation": {'p95_ms': 300, 'max_bytes': 65_536},
+    "GET /api/homepage": {'p95_ms': 600, 'max_bytes': 524_288},
+    "GET /api/admin/orders": {'p95_ms': 1000, 'max_bytes': 1_048_576},
+    "GET /api/admin/reviews": {'p95_ms': 800, 'max_bytes': 1_048_576},
+}
+
+
+def load_budgets(path: Optional[str]) -> Dict[str, Dict[str, Any]]:
+    """ENDPOINT_BUDGETS, with per-endpoint overrides from a JSON file of the same shape"""
+    budgets = {key: dict(budget) for key, budget in ENDPOINT_BUDGETS.items()}
+    if path:
+        with open(path) as f:
+            for key, budget in json.load(f).items():
+                budgets.setdefault(key, {}).update(budget)
+    return budgets
+
+
+def budget_accepts(budget: Dict[str, Any], status: int) -> bool:
+    """Whether a response with this status is a valid sample for the budget"""
+    statuses = budget.get('statuses')
+    return status in statuses if statuses else 200 <= status < 300
+
+
+class BudgetTracker:
+    """Response hook collecting latency and body size for every budgeted endpoint
+
+    Only statuses the budget accepts become samples; the rest are counted per status in `rejected`.
+    """
+
+    def __init__(self, budgets: Dict[str, Dict[str, Any]]):
+        self.budgets = budgets
+        self.latencies: Dict[str, List[float]] = {}
+        self.sizes: Dict[str, List[int]] = {}
+        self.rejected: Dict[str, Dict[int, int]] = {}
+        self._lock = threading.Lock()
+
+    def attach(self, session: requests.Session):
+        session.hooks['response'].append(self.record)
+
+    def record(self, response: requests.Response, *args, **kwargs) -> requests.Response:
+        key = endpoint_key(response.request.method, response.request.url)
+        if key not in self.budgets:
+            return response
+        # Auth rejections and server errors are fast for the wrong reasons; they never count toward a budget
+        if not budget_accepts(self.budgets[key], response.status_code):
+            with self._lock:
+                counts = self.rejected.setdefault(key, {})
+                counts[response.status_code] = counts.get(response.status_code, 0) + 1
+            return response
+        # Streaming callers read the raw body themselves; only trust Content-Length for them
+        if kwargs.get('stream'):
+            length = response.headers.get('Content-Length')
+            size = int(length) if length and length.isdigit() else None
+        else:
+            size = len(response.content)
+        with self._lock:
+            self.latencies.setdefault(key, []).append(response.elapsed.total_seconds() * 1000)
+            if size is not None:
+                self.sizes.setdefault(key, []).append(size)
+        return response
+
+
+# ===== SLOWEST-REQUEST RESERVOIR =====
+
+# Header values never written to the dump
+REDACTED_HEADERS = {"cookie", "set-cookie", "authorization", "x-api-key"}
+
+
+def _truncate(body: Any, limit: int) -> Optional[str]:
+    if body is None:
+        return None
+    if isinstance(body, bytes):
+        body = body.decode("utf-8", errors="replace")
+    return body if len(body) <= limit else body[:limit] + f"... [{len(body) - limit} more chars]"
+
+
+def _headers(headers: Any) -> Dict[str, str]:
+    return {k: ("<redacted>" if k.lower() in REDACTED_HEADERS else v) for k, v in headers.items()}
+
+
+class SlowRequestReservoir:
+    """Response hook keeping the N slowest requests per endpoint with headers, truncated bodies and timing phases
+
+    Each endpoint holds a min-heap of at most N captures, so memory stays constant; a response is only
+    captured when it beats the fastest one currently kept.
+    """
+
+    def __init__(self, top: int = 5, body_limit: int = 4096):
+        self.top = top
+        self.body_limit = body_limit
+        self.heaps: Dict[str, List[Any]] = {}
+        self._sequence = 0
+        self._lock = threading.Lock()
+
+    def attach(self, session: requests.Session):
+        session.hooks['response'].append(self.record)
+
+    def _qualifies(self, key: str, latency_ms: float) -> bool:
+        heap = self.heaps.get(key, [])
+        return len(heap) < self.top or latency_ms > heap[0][0]
+
+    def record(self, response: requests.Response, *args, **kwargs) -> requests.Response:
+        key = endpoint_key(response.request.method, response.request.url)
+        headers_ms = response.elapsed.total_seconds() * 1000
+        with self._lock:
+            if not self._qualifies(key, headers_ms):
+                return response
+
+        # Streaming callers consume the body themselves
+        download_ms, body = None, None
+        if not kwargs.get('stream'):
+            started = time.perf_counter()
+            body = response.content
+            download_ms = (time.perf_counter() - started) * 1000
+        total_ms = headers_ms + (download_ms or 0.0)
+        request = response.request
+        capture = {
+            'endpoint': key,
+            'started_at': time.strftime("%Y-%m-%dT%H:%M:%S", time.localtime(time.time() - total_ms / 1000)),
+            'method': request.method,
+            'url': request.url,
+            'status': response.status_code,
+            'timing_ms': {'headers': round(headers_ms, 2), 'body': round(download_ms, 2) if download_ms is not None else None,
+                          'total': round(total_ms, 2),
+                          'server': {k: round(v, 2) for k, v in (decompose_latency(headers_ms, response.headers) or {}).items()}},
+            'request_headers': _headers(request.headers),
+            'request_body': _truncate(request.body, self.body_limit),
+            'response_headers': _headers(response.headers),
+            'response_body': _truncate(body, self.body_limit),
+            'curl': self.curl(request),
+        }
+        with self._lock:
+            heap = self.heaps.setdefault(key, [])
+            self._sequence += 1
+            entry = (total_ms, self._sequence, capture)
+            if len(heap) < self.top:
+                heapq.heappush(heap, entry)
+            elif total_ms > heap[0][0]:
+                heapq.heapreplace(heap, entry)
+        return response
+
+    def curl(self, request: requests.PreparedRequest) -> str:
+        """Shell command replaying the request (redacted headers left for the reader to fill in)"""
+        parts = ["curl", "-sS", "-X", request.method, shlex.quote(request.url)]
+        for name, value in _headers(request.headers).items():
+            if name.lower() not in ("content-length", "accept-encoding", "connection", "user-agent"):
+                parts += ["-H", shlex.quote(f"{name}: {value}")]
+        if request.body:
+            parts += ["--data-binary", shlex.quote(_truncate(request.body, self.body_limit))]
+        return " ".join(parts)
+
+    def slowest(self) -> Dict[str, List[Dict[str, Any]]]:
+        with self._lock:
+            return {key: [capture for _, _, capture in sorted(heap, reverse=True)] for key, heap in self.heaps.items()}
+
+    def dump(self, path: str):
+        with open(path, "w") as f:
+            json.dump(self.slowest(), f, indent=2)
+
+    def print_report(self, limit: int = 10):
+        captures = sorted((c for items in self.slowest().values() for c in items),
+                          key=lambda c: -c['timing_ms']['total'])[:limit]
+        if not captures:
+            return
+        print(f"\n🐢 Slowest requests (top {self.top} per endpoint kept)")
+        for c in captures:
+            t = c['timing_ms']
+            body = f" + {t['body']:.0f}ms body" if t['body'] is not None else ""
+            print(f"   {t['total']:>8.0f}ms  {c['status']}  {c['method']} {c['url']}  ({t['headers']:.0f}ms to headers{body})")
+
+
+# ===== ENDPOINT SPECS =====
+# Table-driven endpoint checks: request template, accepted statuses and expected response shape.
+# Checks are compiled once per spec, so a volume run only pays for the request, JSON decode and a few lookups.
+
+MISSING = object()
+# Shape value meaning "the field must exist, any value"
+PRESENT = ...
+
+# Failure messages for statuses every spec treats the same way
+STATUS_HINTS = {
+    401: "Authentication failed - cookie not working properly",
+    403: "Permission denied - user lacks the required permission",
+}
+
+
+def _lookup(data: Any, keys: tuple) -> Any:
+    for key in keys:
+        if isinstance(data, dict):
+            data = data.get(key, MISSING)
+        elif isinstance(data, list) and key.isdigit():
+            data = data[int(key)] if int(key) < len(data) else MISSING
+        else:
+            return MISSING
+        if data is MISSING:
+            return MISSING
+    return data
+
+
+def nonempty(value: Any) -> bool:
+    return bool(value)
+
+
+def compile_shape(shape: Dict[str, Any]) -> Callable[[Any], Optional[str]]:
+    """{'dotted.path': type | predicate | literal | PRESENT} -> check(data) returning a failure reason or None"""
+    checks = []
+    for path, expected in shape.items():
+        if expected is PRESENT:
+            test, want = (lambda value: True), "present"
+        elif isinstance(expected, (type, tuple)):
+            test = lambda value, types=expected: isinstance(value, types)
+            want = "/".join(t.__name__ for t in (expected if isinstance(expected, tuple) else (expected,)))
+        elif callable(expected):
+            test, want = expected, expected.__name__
+        else:
+            test, want = (lambda value, literal=expected: value == literal), repr(expected)
+        checks.append((path, tuple(path.split(".")), test, want))
+
+    def check(data: Any) -> Optional[str]:
+        missing = []
+        for path, keys, test, want in checks:
+            value = _lookup(data, keys)
+            if value is MISSING:
+                missing.append(path)
+            elif not test(value):
+                return f"{path}: expected {want}, got {value!r:.80}"
+        return f"Missing required fields: {missing}" if missing else None
+
+    return check
+
+
+class EndpointSpec:
+    """One endpoint check as data; path and body may use {placeholders} filled from fixtures and case params"""
+
+    def __init__(self, label: str, method: str, path: str, body: Any = None, status: Any = 200,
+                 shape: Optional[Dict[str, Any]] = None, success: bool = True, admin: bool = False,
+                 requires: tuple = (), capture: Optional[Dict[str, str]] = None,
+                 message: Optional[Callable[[Any], str]] = None, hints: Optional[Dict[int, str]] = None):
+        self.label = label
+        self.method = method.upper()
+        self.path = path
+        # Template names are resolved once; callables build a body per case from its params
+        self.body = PAYLOAD_TEMPLATES[body]() if isinstance(body, str) else body
+        self.statuses = (status,) if isinstance(status, int) else tuple(status)
+        self.success = success
+        self.admin = admin
+        self.requires = tuple(requires)
+        self.capture = {attr: tuple(path.split(".")) for attr, path in (capture or {}).items()}
+        self.message = message
+        self.hints = {**STATUS_HINTS, **(hints or {})}
+        self.check = compile_shape(shape or {})
+        self._static = "{" not in path
+
+    def request_args(self, params: Dict[str, Any]):
+        path = self.path if self._static else self.path.format_map(params)
+        return path, self.body(params) if callable(self.body) else self.body
+
+    def verify(self, response: requests.Response):
+        """(failure reason or None, decoded body or None)"""
+        if response.status_code not in self.statuses:
+            hint = self.hints.get(response.status_code)
+            return hint or f"HTTP {response.status_code}: {response.text}", None
+        data = response.json()
+        if self.success and not (isinstance(data, dict) and data.get('success')):
+            reason = data.get('error') or data.get('message') if isinstance(data, dict) else None
+            return f"API returned success=false: {reason or 'Unknown error'}", data
+        return self.check(data), data
+
+    def __repr__(self):
+        return f"EndpointSpec({self.method} {self.path})"
+
+
+def _order_action(label: str, body: Dict[str, Any], message: str, **kwargs) -> EndpointSpec:
+    return EndpointSpec(f"PATCH /api/admin/orders/ORD-2024-001 ({label})", "PATCH", "/api/admin/orders/ORD-2024-001",
+                        body=body, admin=True, message=lambda data: message,
+                        hints={404: "Order ORD-2024-001 not found"}, **kwargs)
+
+
+# test_* method name -> spec; those methods just call run_spec()
+ENDPOINT_SPECS: Dict[str, EndpointSpec] = {
+    "test_admin_setup_status": EndpointSpec(
+        "GET /api/admin/auth/setup", "GET", "/api/admin/auth/setup", shape={'needsSetup': False},
+        message=lambda data: "Setup status correct: Admin already exists (needsSetup: false)"),
+    "test_admin_me": EndpointSpec(
+        "GET /api/admin/auth/me", "GET", "/api/admin/auth/me", admin=True,
+        shape={'user.email': lambda email: str(email).lower() == "admin@gibbonnutrition.com"},
+        message=lambda data: f"User info retrieved successfully: {data['user'].get('name', 'Unknown')} "
+                             f"({data['user'].get('role', 'unknown')})"),
+    "test_discounts_get": EndpointSpec(
+        "GET /api/discounts", "GET", "/api/discounts",
+        message=lambda data: f"Successfully retrieved {len(data.get('discounts', []))} discounts"),
+    "test_discounts_put": EndpointSpec(
+        "PUT /api/discounts/{id}", "PUT", "/api/discounts/{created_discount_id}", body="discount_update",
+        requires=("created_discount_id",), message=lambda data: "Successfully updated discount"),
+    "test_discounts_delete": EndpointSpec(
+        "DELETE /api/discounts/{id}", "DELETE", "/api/discounts/{created_discount_id}",
+        requires=("created_discount_id",), message=lambda data: "Successfully deleted discount"),
+    "test_single_order": EndpointSpec(
+        "GET /api/admin/orders/ORD-2024-001", "GET", "/api/admin/orders/ORD-2024-001", admin=True, success=False,
+        shape={field: PRESENT for field in ('orderId', 'customer', 'items', 'totalAmount', 'status')},
+        hints={404: "Order ORD-2024-001 not found in database"},
+        message=lambda data: f"Order details retrieved successfully: Customer {data['customer'].get('name', '')}, "
+                             f"Total ₹{data.get('totalAmount', 0)}"),
+    "test_order_update_status": _order_action(
+        "status", {"action": "update_status", "status": "processing", "user": "Test Agent"},
+        "Order status updated successfully to 'processing'", shape={'order.status': "processing"}),
+    "test_order_add_note": _order_action(
+        "add_note", {"action": "add_note", "content": "Test note added via API testing", "author": "Test Agent",
+                     "isInternal": True},
+        "Note added successfully to order"),
+    "test_order_add_tag": _order_action(
+        "add_tag", {"action": "add_tag", "tag": "test-tag"}, "Tag 'test-tag' added successfully to order"),
+    "test_order_remove_tag": _order_action(
+        "remove_tag", {"action": "remove_tag", "tag": "test-tag"}, "Tag 'test-tag' removed successfully from order"),
+    "test_order_assign": _order_action(
+        "assign", {"action": "assign", "assignedTo": "Test Agent", "user": "Admin"},
+        "Order assigned successfully to 'Test Agent'"),
+    "test_order_generate_invoice": EndpointSpec(
+        "POST /api/admin/orders/ORD-2024-001/invoice", "POST", "/api/admin/orders/ORD-2024-001/invoice",
+        body={"user": "Test Agent"}, admin=True, shape={'invoice.invoiceNumber': nonempty},
+        message=lambda data: f"Invoice generated successfully: {data['invoice']['invoiceNumber']}"),
+    "test_order_send_email": EndpointSpec(
+        "POST /api/admin/orders/ORD-2024-001/email", "POST", "/api/admin/orders/ORD-2024-001/email",
+        body={"type": "custom", "subject": "Test Email Subject",
+              "customMessage": "This is a test email message sent via API testing", "user": "Test Agent"},
+        admin=True, message=lambda data: f"Email sent successfully to {data.get('email', {}).get('recipient', '')}"),
+    "test_admin_reviews_list": EndpointSpec(
+        "GET /api/admin/reviews", "GET", "/api/admin/reviews", admin=True,
+        message=lambda data: f"Successfully retrieved {len(data.get('data', []))} reviews. Stats: "
+                             f"{data.get('stats', {}).get('total', 0)} total, {data.get('stats', {}).get('approved', 0)} "
+                             f"approved, {data.get('stats', {}).get('pending', 0)} pending"),
+    "test_public_product_reviews": EndpointSpec(
+        "GET /api/product-reviews/[handle]", "GET", "/api/product-reviews/{handle}",
+        message=lambda data: f"Successfully retrieved {len(data.get('data', []))} approved reviews. Avg rating: "
+                             f"{data.get('stats', {}).get('avgRating', 0)}, Total: "
+                             f"{data.get('stats', {}).get('totalReviews', 0)}"),
+}
 
-    def test_orders_list(self) -> bool:
-        """Test GET /api/admin/orders - List all orders with filtering"""
-        if not self.admin_authenticated:
-            self.log_test("GET /api/admin/orders", False, "Cannot test orders list - not authenticated")
+
+def _promo_body(params: Dict[str, Any]) -> Dict[str, Any]:
+    return {"code": params['code'], "cartItems": [{"productId": "test", "quantity": params['quantity'],
+                                                   "price": params['price']}]}
+
+
+# Cheap, read-only (or side-effect free) specs for volume runs: name -> (spec, params(rng, handles))
+VOLUME_SPECS: Dict[str, tuple] = {
+    "products": (EndpointSpec("GET /api/products", "GET", "/api/products?limit={limit}&sortBy={sortBy}",
+                              shape={'products': list, 'total': int}),
+                 lambda rng, handles: {'limit': rng.choice((5, 10, 20, 50)),
+                                       'sortBy': rng.choice(("newest", "price-low", "price-high", "a-z"))}),
+    "product": (EndpointSpec("GET /api/products/[handle]", "GET", "/api/products/{handle}", shape={'data': dict}),
+                lambda rng, handles: {'handle': rng.choice(handles)}),
+    "product-reviews": (EndpointSpec("GET /api/product-reviews/[handle]", "GET",
+                                     "/api/product-reviews/{handle}?page={page}&limit={limit}", shape={'data': list}),
+                        lambda rng, handles: {'handle': rng.choice(handles), 'page': rng.randint(1, 3),
+                                              'limit': rng.choice((5, 10, 20))}),
+    "promo-check": (EndpointSpec("POST /api/promoCode/check", "POST", "/api/promoCode/check", body=_promo_body,
+                                 status=(200, 400, 404, 410), success=False, shape={'success': bool}),
+                    lambda rng, handles: {'code': rng.choice(("WELCOME10", "TEST20", f"NOPE{rng.randrange(10 ** 6)}")),
+                                          'quantity': rng.randint(1, 5), 'price': rng.choice((99, 600, 2500))}),
+    "admin-orders": (EndpointSpec("GET /api/admin/orders", "GET",
+                                  "/api/admin/orders?page={page}&limit={limit}&status={status}", admin=True,
+                                  success=False, shape={'orders': list, 'pagination.total': int}),
+                     lambda rng, handles: {'page': rng.randint(1, 5), 'limit': rng.choice((10, 20, 50)),
+                                           'status': rng.choice(("all", "pending", "processing", "delivered"))}),
+}
+
+
+def volume_cases(count: int, handles: List[str], seed: int = 0, admin: bool = False) -> List[tuple]:
+    """count (spec, params) cases spread round-robin over VOLUME_SPECS with seeded parameters"""
+    rng = random.Random(seed)
+    specs = [entry for entry in VOLUME_SPECS.values() if admin or not entry[0].admin]
+    return [(specs[i % len(specs)][0], specs[i % len(specs)][1](rng, handles)) for i in range(count)]
+
+
+class APITester:
+    def __init__(self, base_url: str, session: Optional[ResilientSession] = None):
+        self.base_url = base_url
+        self.session = session or ResilientSession()
+        self.session.headers.update({
+            'Content-Type': 'application/json',
+            'Accept': 'application/json'
+        })
+        self.test_results = []
+        self.created_discount_id = None
+        self.admin_authenticated = False
+        self.admin_user_info = None
+        self.created_review_id = None
+        self.test_product_handles = ["bcaa-4-1-1-glutamine", "t-shirt", "shaker"]
+        self.test_durations: Dict[str, float] = {}
+        self.profiler: Optional[ClientProfiler] = None
+        self.tracer: Optional[Tracer] = None
+        # Endpoints (with response times) each test exercised, for the incremental-run cache
+        self.endpoints_hit: Dict[str, Dict[str, List[float]]] = {}
+        self.test_outcomes: Dict[str, bool] = {}
+        self._active_test: Optional[str] = None
+        self.session.hooks['response'].append(self._record_endpoint)
+
+    def _record_endpoint(self, response: requests.Response, *args, **kwargs) -> requests.Response:
+        if self._active_test:
+            key = endpoint_key(response.request.method, response.request.url)
+            hits = self.endpoints_hit.setdefault(self._active_test, {})
+            hits.setdefault(key, []).append(response.elapsed.total_seconds() * 1000)
+        return response
+
+    def spec_params(self) -> Dict[str, Any]:
+        """Fixture values EndpointSpec paths and body factories can reference"""
+        return {'handle': self.test_product_handles[0], 'created_discount_id': self.created_discount_id,
+                'created_review_id': self.created_review_id}
+
+    def run_spec(self, spec: EndpointSpec, params: Optional[Dict[str, Any]] = None) -> bool:
+        """Run one spec with full logging, as a hand-written test_* method would"""
+        if spec.admin and not self.admin_authenticated:
+            self.log_test(spec.label, False, f"Cannot test {spec.label} - not authenticated")
+            return False
+        params = {**self.spec_params(), **(params or {})}
+        missing = [name for name in spec.requires if not params.get(name)]
+        if missing:
+            self.log_test(spec.label, False, f"No {missing[0]} available for this test")
             return False
-            
         try:
-            response = self.session.get(f"{self.base_url}/api/admin/orders")
-            
-            if response.status_code == 200:
-                data = response.json()
-                if 'orders' in data:
-                    orders = data.get('orders', [])
-                    pagination = data.get('pagination', {})
-                    
-                    # Check if ORD-2024-001 exists
-                    test_order_found = any(order.get('orderId') == 'ORD-2024-001' for order in orders)
-                    
-                    if test_order_found:
-                        self.log_test(
-                            "GET /api/admin/orders", 
-                            True, 
-                            f"Successfully retrieved {len(orders)} orders, test order ORD-2024-001 found"
-                        )
-                        return True
-                    else:
-                        # Try with search parameter
-                        search_response = self.session.get(f"{self.base_url}/api/admin/orders?search=ORD-2024-001")
-                        if search_response.status_code == 200:
-                            search_data = search_response.json()
-                            search_orders = search_data.get('orders', [])
-                            if any(order.get('orderId') == 'ORD-2024-001' for order in search_orders):
-                                self.log_test(
-                                    "GET /api/admin/orders", 
-                                    True, 
-                                    f"Orders API working, test order found via search"
-                                )
-                                return True
-                        
-                        self.log_test(
-                            "GET /api/admin/orders", 
-                            False, 
-                            f"Test order ORD-2024-001 not found in {len(orders)} orders"
-                        )
-                        return False
-                else:
-                    self.log_test(
-                        "GET /api/admin/orders", 
-                        False, 
-                        f"Invalid response format: {data}", 
-                        data
-                    )
-                    return False
-            elif response.status_code == 401:
-                self.log_test(
-                    "GET /api/admin/orders", 
-                    False, 
-                    "Authentication failed - cookie not working properly"
-                )
-                return False
-            elif response.status_code == 403:
-                self.log_test(
-                    "GET /api/admin/orders", 
-                    False, 
-                    "Permission denied - user lacks orders.view permission"
-                )
-                return False
-            else:
-                data = response.json() if response.headers.get('content-type', '').startswith('application/json') else {}
-                self.log_test(
-                    "GET /api/admin/orders", 
-                    False, 
-                    f"HTTP {response.status_code}: {data.get('error', response.text)}", 
-                    data
-                )
+            path, body = spec.request_args(params)
+            response = self.session.request(spec.method, f"{self.base_url}{path}", json=body)
+            failure, data = spec.verify(response)
+            if failure:
+                self.log_test(spec.label, False, failure, data if isinstance(data, dict) else None)
                 return False
-                
+            for attr, keys in spec.capture.items():
+                value = _lookup(data, keys)
+                if value is not MISSING:
+                    setattr(self, attr, value)
+            self.log_test(spec.label, True, spec.message(data) if spec.message else f"HTTP {response.status_code}")
+            return True
         except Exception as e:
-            self.log_test("GET /api/admin/orders", False, f"Exception: {str(e)}")
+            self.log_test(spec.label, False, f"Exception: {str(e)}")
             return False
 
-    def test_single_order(self) -> bool:
-        """Test GET /api/admin/orders/ORD-2024-001 - Get single order details"""
-        if not self.admin_authenticated:
-            self.log_test("GET /api/admin/orders/ORD-2024-001", False, "Cannot test single order - not authenticated")
+    def run_spec_cases(self, cases: List[tuple], concurrency: int = 16, failures_kept: int = 3) -> Dict[str, Any]:
+        """Run many (spec, params) cases quietly on a thread pool; per-spec counts, sample failures and client overhead
+
+        Cases go through plain sessions: the ResilientSession hooks (stats, reservoirs, budgets) would add per-response
+        client work that the µs/case column does not see.
+        """
+        base = self.spec_params()
+
+        def call(session: requests.Session, case: tuple) -> tuple:
+            spec, params = case
+            started = time.perf_counter()
+            try:
+                path, body = spec.request_args({**base, **params})
+                url = f"{self.base_url}{path}"
+                sent = time.perf_counter()
+                response = session.request(spec.method, url, json=body, timeout=self.session.timeout_for(url))
+                received = time.perf_counter()
+                failure, _ = spec.verify(response)
+                overhead = (sent - started) + (time.perf_counter() - received)
+            except Exception as e:
+                failure, overhead = f"Exception: {type(e).__name__}: {e}", 0.0
+            return spec.label, failure, overhead
+
+        per_spec: Dict[str, Dict[str, Any]] = {}
+        started = time.perf_counter()
+        outcomes = self._map_with_sessions(cases, call, concurrency, self._plain_session)
+        elapsed = time.perf_counter() - started
+        for label, failure, overhead in outcomes:
+            s = per_spec.setdefault(label, {'passed': 0, 'failed': 0, 'overhead_s': 0.0, 'failures': []})
+            s['overhead_s'] += overhead
+            if failure:
+                s['failed'] += 1
+                if len(s['failures']) < failures_kept:
+                    s['failures'].append(failure[:200])
+            else:
+                s['passed'] += 1
+        return {'cases': len(cases), 'elapsed_s': elapsed, 'per_spec': per_spec}
+
+    def run_volume_specs(self, count: int, concurrency: int = 16, seed: int = 0, admin: bool = False) -> bool:
+        """count parameterized cheap cases (VOLUME_SPECS); prints throughput and per-spec pass/fail"""
+        if admin and not self.test_admin_login():
             return False
-            
+        cases = volume_cases(count, self.test_product_handles, seed, admin)
+        print(f"📋 Running {len(cases)} spec cases over {len({id(spec) for spec, _ in cases})} specs "
+              f"with {concurrency} workers")
+        result = self.run_spec_cases(cases, concurrency)
+        print(f"\n📋 {result['cases']} cases in {result['elapsed_s']:.2f}s "
+              f"({result['cases'] / result['elapsed_s'] if result['elapsed_s'] else 0:.0f} cases/s)")
+        print(f"   {'Spec':<44} {'pass':>7} {'fail':>7} {'client µs/case':>15}")
+        success = True
+        for label, s in result['per_spec'].items():
+            n = s['passed'] + s['failed']
+            print(f"   {label:<44} {s['passed']:>7} {s['failed']:>7} {s['overhead_s'] / n * 1e6:>15.0f}")
+            for failure in s['failures']:
+                print(f"      ↳ {failure}")
+            success = success and not s['failed']
+        return success
+
+    def start_fault_proxy(self, rules: List[FaultRule], seed: int = 0) -> FaultProxy:
+        """Route this tester through an in-process fault-injecting proxy in front of the current base URL"""
+        proxy = FaultProxy(self.base_url, rules, seed=seed)
+        self.base_url = proxy.start()
+        return proxy
+
+    def report_cached(self, cases: List[TestCase], cache: ResultsCache) -> bool:
+        """Log unaffected tests with their cached outcome and last timings instead of re-running them"""
+        for case in cases:
+            entry = cache.entries[case.name]
+            timings = ", ".join(f"{key} {ms:.0f}ms" for key, ms in entry['endpoints'].items())
+            self.log_test(f"{case.label} (cached {entry['commit']})", entry['ok'],
+                          f"unchanged routes, last run {entry['seconds']:.2f}s" + (f": {timings}" if timings else ""))
+        return all(cache.entries[case.name]['ok'] for case in cases)
+
+    def log_test(self, test_name: str, success: bool, message: str, response_data: Optional[Dict] = None):
+        """Log test results"""
+        if self.profiler:
+            with self.profiler.section("log_test"):
+                return self._log_test(test_name, success, message, response_data)
+        return self._log_test(test_name, success, message, response_data)
+
+    def _test_span(self, name: str, label: str):
+        """Span around one test or scenario when tracing is on, else a no-op context"""
+        return self.tracer.span(name, attributes={'test.label': label}) if self.tracer else nullcontext()
+
+    def _log_test(self, test_name: str, success: bool, message: str, response_data: Optional[Dict] = None):
+        status = "✅ PASS" if success else "❌ FAIL"
+        print(f"{status} {test_name}: {message}")
+        if self.tracer and self.tracer.current() and not success:
+            self.tracer.current().set_status(False, f"{test_name}: {message}")
+        
+        self.test_results.append({
+            'test': test_name,
+            'success': success,
+            'message': message,
+            'response_data': response_data
+        })
+        
+        if response_data and not success:
+            print(f"   Response: {json.dumps(response_data, indent=2)}")
+
+    def test_admin_setup_status(self) -> bool:
+        """Test GET /api/admin/auth/setup - Check setup status"""
+        return self.run_spec(ENDPOINT_SPECS["test_admin_setup_status"])
+
+    def test_admin_login(self) -> bool:
+        """Test POST /api/admin/auth/login - Login with admin credentials"""
+        login_data = {
+            "email": "admin@gibbonnutrition.com",
+            "password": "gibbonsecret"
+        }
+        
         try:
-            response = self.session.get(f"{self.base_url}/api/admin/orders/ORD-2024-001")
+            response = self.session.post(
+                f"{self.base_url}/api/admin/auth/login",
+                json=login_data
+            )
             
             if response.status_code == 200:
                 data = response.json()
-                
-                # Check required fields
-                required_fields = ['orderId', 'customer', 'items', 'totalAmount', 'status']
-                missing_fields = [field for field in required_fields if field not in data]
-                
-                if not missing_fields:
-                    customer = data.get('customer', {})
-                    customer_name = customer.get('name', '')
+                if data.get('success'):
+                    user = data.get('user', {})
+                    self.admin_user_info = user
+                    self.admin_authenticated = True
                     
-                    # Check if customer is Rahul Sharma as mentioned in review request
-                    if 'Rahul Sharma' in customer_name or customer.get('firstName') == 'Rahul':
-                        self.log_test(
-                            "GET /api/admin/orders/ORD-2024-001", 
-                            True, 
-                            f"Order details retrieved successfully: Customer {customer_name}, Total ₹{data.get('totalAmount', 0)}"
-                        )
-                        return True
-                    else:
-                        self.log_test(
-                            "GET /api/admin/orders/ORD-2024-001", 
-                            True, 
-                            f"Order details retrieved successfully: Customer {customer_name}, Total ₹{data.get('totalAmount', 0)}"
-                        )
-                        return True
+                    # Check if Set-Cookie header is present
+                    set_cookie = response.headers.get('Set-Cookie', '')
+                    has_admin_token = 'admin_token=' in set_cookie
+                    
+                    self.log_test(
+                        "POST /api/admin/auth/login", 
+                        True, 
+                        f"Login successful for {user.get('email', 'unknown')} (Role: {user.get('role', 'unknown')}) - Cookie set: {has_admin_token}"
+                    )
+                    return True
                 else:
                     self.log_test(
-                        "GET /api/admin/orders/ORD-2024-001", 
+                        "POST /api/admin/auth/login", 
                         False, 
-                        f"Missing required fields: {missing_fields}", 
+                        f"Login failed: {data.get('message', 'Unknown error')}", 
                         data
                     )
                     return False
-            elif response.status_code == 404:
-                self.log_test(
-                    "GET /api/admin/orders/ORD-2024-001", 
-                    False, 
-                    "Order ORD-2024-001 not found in database"
-                )
-                return False
-            elif response.status_code == 401:
-                self.log_test(
-                    "GET /api/admin/orders/ORD-2024-001", 
-                    False, 
-                    "Authentication failed - cookie not working properly"
-                )
-                return False
             else:
                 data = response.json() if response.headers.get('content-type', '').startswith('application/json') else {}
                 self.log_test(
-                    "GET /api/admin/orders/ORD-2024-001", 
+                    "POST /api/admin/auth/login", 
                     False, 
-                    f"HTTP {response.status_code}: {data.get('error', response.text)}", 
+                    f"HTTP {response.status_code}: {data.get('message', response.text)}", 
                     data
                 )
                 return False
                 
         except Exception as e:
-            self.log_test("GET /api/admin/orders/ORD-2024-001", False, f"Exception: {str(e)}")
+            self.log_test("POST /api/admin/auth/login", False, f"Exception: {str(e)}")
             return False
 
-    def test_order_update_status(self) -> bool:
-        """Test PATCH /api/admin/orders/ORD-2024-001 - Update order status"""
+    def test_admin_me(self) -> bool:
+        """Test GET /api/admin/auth/me - Get current user info"""
+        return self.run_spec(ENDPOINT_SPECS["test_admin_me"])
+
+    def test_admin_staff_list(self) -> bool:
+        """Test GET /api/admin/staff - List all staff members"""
         if not self.admin_authenticated:
-            self.log_test("PATCH /api/admin/orders/ORD-2024-001 (status)", False, "Cannot test order update - not authenticated")
+            self.log_test("GET /api/admin/staff", False, "Cannot test staff list - not authenticated")
             return False
             
-        update_data = {
-            "action": "update_status",
-            "status": "processing",
-            "user": "Test Agent"
-        }
-        
         try:
-            response = self.session.patch(
-                f"{self.base_url}/api/admin/orders/ORD-2024-001",
-                json=update_data
-            )
+            response = self.session.get(f"{self.base_url}/api/admin/staff")
             
             if response.status_code == 200:
                 data = response.json()
                 if data.get('success'):
-                    order = data.get('order', {})
-                    if order.get('status') == 'processing':
+                    staff = data.get('staff', [])
+                    owner_found = any(s.get('role') == 'owner' for s in staff)
+                    
+                    if owner_found and len(staff) >= 1:
                         self.log_test(
-                            "PATCH /api/admin/orders/ORD-2024-001 (status)", 
+                            "GET /api/admin/staff", 
                             True, 
-                            "Order status updated successfully to 'processing'"
+                            f"Staff list retrieved successfully: {len(staff)} members (owner found)"
                         )
                         return True
                     else:
                         self.log_test(
-                            "PATCH /api/admin/orders/ORD-2024-001 (status)", 
+                            "GET /api/admin/staff", 
                             False, 
-                            f"Status not updated correctly: expected 'processing', got '{order.get('status')}'", 
+                            f"Staff list incomplete: {len(staff)} members, owner found: {owner_found}", 
                             data
                         )
                         return False
                 else:
                     self.log_test(
-                        "PATCH /api/admin/orders/ORD-2024-001 (status)", 
-                        False, 
-                        f"API returned success=false: {data.get('error', 'Unknown error')}", 
-                        data
-                    )
-                    return False
-            elif response.status_code == 404:
-                self.log_test(
-                    "PATCH /api/admin/orders/ORD-2024-001 (status)", 
-                    False, 
-                    "Order ORD-2024-001 not found"
-                )
-                return False
-            elif response.status_code == 401:
-                self.log_test(
-                    "PATCH /api/admin/orders/ORD-2024-001 (status)", 
-                    False, 
-                    "Authentication failed - cookie not working properly"
-                )
-                return False
-            else:
-                data = response.json() if response.headers.get('content-type', '').startswith('application/json') else {}
-                self.log_test(
-                    "PATCH /api/admin/orders/ORD-2024-001 (status)", 
-                    False, 
-                    f"HTTP {response.status_code}: {data.get('error', response.text)}", 
-                    data
-                )
-                return False
-                
-        except Exception as e:
-            self.log_test("PATCH /api/admin/orders/ORD-2024-001 (status)", False, f"Exception: {str(e)}")
-            return False
-
-    def test_order_add_note(self) -> bool:
-        """Test PATCH /api/admin/orders/ORD-2024-001 - Add note"""
-        if not self.admin_authenticated:
-            self.log_test("PATCH /api/admin/orders/ORD-2024-001 (add_note)", False, "Cannot test add note - not authenticated")
-            return False
-            
-        update_data = {
-            "action": "add_note",
-            "content": "Test note added via API testing",
-            "author": "Test Agent",
-            "isInternal": True
-        }
-        
-        try:
-            response = self.session.patch(
-                f"{self.base_url}/api/admin/orders/ORD-2024-001",
-                json=update_data
-            )
-            
-            if response.status_code == 200:
-                data = response.json()
-                if data.get('success'):
-                    self.log_test(
-                        "PATCH /api/admin/orders/ORD-2024-001 (add_note)", 
-                        True, 
-                        "Note added successfully to order"
-                    )
-                    return True
-                else:
-                    self.log_test(
-                        "PATCH /api/admin/orders/ORD-2024-001 (add_note)", 
+                        "GET /api/admin/staff", 
                         False, 
-                        f"API returned success=false: {data.get('error', 'Unknown error')}", 
+                        f"API returned success=false: {data.get('message', 'Unknown error')}", 
                         data
                     )
                     return False
+            elif response.status_code == 401:
+                self.log_test(
+                    "GET /api/admin/staff", 
+                    False, 
+                    "Authentication failed - cookie not working properly"
+                )
+                return False
+            elif response.status_code == 403:
+                self.log_test(
+                    "GET /api/admin/staff", 
+                    False, 
+                    "Permission denied - user lacks staff.view permission"
+                )
+                return False
             else:
                 data = response.json() if response.headers.get('content-type', '').startswith('application/json') else {}
                 self.log_test(
-                    "PATCH /api/admin/orders/ORD-2024-001 (add_note)", 
+                    "GET /api/admin/staff", 
                     False, 
-                    f"HTTP {response.status_code}: {data.get('error', response.text)}", 
+                    f"HTTP {response.status_code}: {data.get('message', response.text)}", 
                     data
                 )
                 return False
                 
         except Exception as e:
-            self.log_test("PATCH /api/admin/orders/ORD-2024-001 (add_note)", False, f"Exception: {str(e)}")
+            self.log_test("GET /api/admin/staff", False, f"Exception: {str(e)}")
             return False
 
-    def test_order_add_tag(self) -> bool:
-        """Test PATCH /api/admin/orders/ORD-2024-001 - Add tag"""
+    def test_admin_staff_invite(self) -> bool:
+        """Test POST /api/admin/staff - Invite new staff member"""
         if not self.admin_authenticated:
-            self.log_test("PATCH /api/admin/orders/ORD-2024-001 (add_tag)", False, "Cannot test add tag - not authenticated")
+            self.log_test("POST /api/admin/staff", False, "Cannot test staff invite - not authenticated")
             return False
             
-        update_data = {
-            "action": "add_tag",
-            "tag": "test-tag"
+        invite_data = {
+            "email": "staff@test.com",
+            "name": "Test Staff",
+            "role": "staff"
         }
         
         try:
-            response = self.session.patch(
-                f"{self.base_url}/api/admin/orders/ORD-2024-001",
-                json=update_data
+            response = self.session.post(
+                f"{self.base_url}/api/admin/staff",
+                json=invite_data
             )
             
-            if response.status_code == 200:
+            if response.status_code == 201:
                 data = response.json()
                 if data.get('success'):
+                    staff = data.get('staff', {})
+                    temp_password = data.get('staff', {}).get('tempPassword')
+                    
+                    if temp_password:
+                        self.log_test(
+                            "POST /api/admin/staff", 
+                            True, 
+                            f"Staff invited successfully: {staff.get('email')} with temp password"
+                        )
+                        return True
+                    else:
+                        self.log_test(
+                            "POST /api/admin/staff", 
+                            False, 
+                            "Staff invite missing temporary password", 
+                            data
+                        )
+                        return False
+                else:
+                    self.log_test(
+                        "POST /api/admin/staff", 
+                        False, 
+                        f"API returned success=false: {data.get('message', 'Unknown error')}", 
+                        data
+                    )
+                    return False
+            elif response.status_code == 400:
+                data = response.json() if response.headers.get('content-type', '').startswith('application/json') else {}
+                if "already registered" in data.get('message', ''):
                     self.log_test(
-                        "PATCH /api/admin/orders/ORD-2024-001 (add_tag)", 
+                        "POST /api/admin/staff", 
                         True, 
-                        "Tag 'test-tag' added successfully to order"
+                        "Staff invite working (email already exists - expected behavior)"
                     )
                     return True
                 else:
                     self.log_test(
-                        "PATCH /api/admin/orders/ORD-2024-001 (add_tag)", 
+                        "POST /api/admin/staff", 
                         False, 
-                        f"API returned success=false: {data.get('error', 'Unknown error')}", 
+                        f"Bad request: {data.get('message', response.text)}", 
                         data
                     )
                     return False
+            elif response.status_code == 401:
+                self.log_test(
+                    "POST /api/admin/staff", 
+                    False, 
+                    "Authentication failed - cookie not working properly"
+                )
+                return False
+            elif response.status_code == 403:
+                self.log_test(
+                    "POST /api/admin/staff", 
+                    False, 
+                    "Permission denied - user lacks staff.invite permission"
+                )
+                return False
             else:
                 data = response.json() if response.headers.get('content-type', '').startswith('application/json') else {}
                 self.log_test(
-                    "PATCH /api/admin/orders/ORD-2024-001 (add_tag)", 
+                    "POST /api/admin/staff", 
                     False, 
-                    f"HTTP {response.status_code}: {data.get('error', response.text)}", 
+                    f"HTTP {response.status_code}: {data.get('message', response.text)}", 
                     data
                 )
                 return False
                 
         except Exception as e:
-            self.log_test("PATCH /api/admin/orders/ORD-2024-001 (add_tag)", False, f"Exception: {str(e)}")
+            self.log_test("POST /api/admin/staff", False, f"Exception: {str(e)}")
             return False
 
-    def test_order_remove_tag(self) -> bool:
-        """Test PATCH /api/admin/orders/ORD-2024-001 - Remove tag"""
-        if not self.admin_authenticated:
-            self.log_test("PATCH /api/admin/orders/ORD-2024-001 (remove_tag)", False, "Cannot test remove tag - not authenticated")
-            return False
-            
-        update_data = {
-            "action": "remove_tag",
-            "tag": "test-tag"
-        }
-        
+    def test_admin_logout(self) -> bool:
+        """Test POST /api/admin/auth/logout - Logout and clear cookie"""
         try:
-            response = self.session.patch(
-                f"{self.base_url}/api/admin/orders/ORD-2024-001",
-                json=update_data
-            )
+            response = self.session.post(f"{self.base_url}/api/admin/auth/logout")
             
             if response.status_code == 200:
                 data = response.json()
                 if data.get('success'):
-                    self.log_test(
-                        "PATCH /api/admin/orders/ORD-2024-001 (remove_tag)", 
-                        True, 
-                        "Tag 'test-tag' removed successfully from order"
-                    )
-                    return True
+                    self.admin_authenticated = False
+                    self.admin_user_info = None
+                    
+                    # Check if cookie is cleared by trying to access /me
+                    me_response = self.session.get(f"{self.base_url}/api/admin/auth/me")
+                    if me_response.status_code == 401:
+                        self.log_test(
+                            "POST /api/admin/auth/logout", 
+                            True, 
+                            "Logout successful - cookie cleared properly"
+                        )
+                        return True
+                    else:
+                        self.log_test(
+                            "POST /api/admin/auth/logout", 
+                            False, 
+                            "Logout incomplete - cookie not cleared properly"
+                        )
+                        return False
                 else:
                     self.log_test(
-                        "PATCH /api/admin/orders/ORD-2024-001 (remove_tag)", 
+                        "POST /api/admin/auth/logout", 
                         False, 
-                        f"API returned success=false: {data.get('error', 'Unknown error')}", 
+                        f"API returned success=false: {data.get('message', 'Unknown error')}", 
                         data
                     )
                     return False
             else:
                 data = response.json() if response.headers.get('content-type', '').startswith('application/json') else {}
                 self.log_test(
-                    "PATCH /api/admin/orders/ORD-2024-001 (remove_tag)", 
+                    "POST /api/admin/auth/logout", 
                     False, 
-                    f"HTTP {response.status_code}: {data.get('error', response.text)}", 
+                    f"HTTP {response.status_code}: {data.get('message', response.text)}", 
                     data
                 )
                 return False
                 
         except Exception as e:
-            self.log_test("PATCH /api/admin/orders/ORD-2024-001 (remove_tag)", False, f"Exception: {str(e)}")
+            self.log_test("POST /api/admin/auth/logout", False, f"Exception: {str(e)}")
             return False
 
-    def test_order_assign(self) -> bool:
-        """Test PATCH /api/admin/orders/ORD-2024-001 - Assign order"""
-        if not self.admin_authenticated:
-            self.log_test("PATCH /api/admin/orders/ORD-2024-001 (assign)", False, "Cannot test assign order - not authenticated")
-            return False
-            
-        update_data = {
-            "action": "assign",
-            "assignedTo": "Test Agent",
-            "user": "Admin"
-        }
+    def test_discounts_get(self) -> bool:
+        """Test GET /api/discounts - List all discount codes"""
+        return self.run_spec(ENDPOINT_SPECS["test_discounts_get"])
+
+    def test_discounts_post(self) -> bool:
+        """Test POST /api/discounts - Create new discount"""
+        test_discount = dict(TEST_DISCOUNT)
         
         try:
-            response = self.session.patch(
-                f"{self.base_url}/api/admin/orders/ORD-2024-001",
-                json=update_data
+            response = self.session.post(
+                f"{self.base_url}/api/discounts",
+                json=test_discount
             )
             
-            if response.status_code == 200:
+            if response.status_code == 201:
                 data = response.json()
                 if data.get('success'):
+                    discount = data.get('discount', {})
+                    self.created_discount_id = discount.get('_id')
                     self.log_test(
-                        "PATCH /api/admin/orders/ORD-2024-001 (assign)", 
+                        "POST /api/discounts", 
                         True, 
-                        "Order assigned successfully to 'Test Agent'"
+                        f"Successfully created discount with ID: {self.created_discount_id}"
                     )
                     return True
                 else:
                     self.log_test(
-                        "PATCH /api/admin/orders/ORD-2024-001 (assign)", 
+                        "POST /api/discounts", 
                         False, 
-                        f"API returned success=false: {data.get('error', 'Unknown error')}", 
+                        f"API returned success=false: {data.get('message', 'Unknown error')}", 
                         data
                     )
                     return False
+            elif response.status_code == 400:
+                # Code already exists, try to get existing discount
+                data = response.json()
+                if "already exists" in data.get('message', ''):
+                    # Get existing discount ID
+                    get_response = self.session.get(f"{self.base_url}/api/discounts")
+                    if get_response.status_code == 200:
+                        get_data = get_response.json()
+                        discounts = get_data.get('discounts', [])
+                        for discount in discounts:
+                            if discount.get('code') == 'TEST20':
+                                self.created_discount_id = discount.get('_id')
+                                self.log_test(
+                                    "POST /api/discounts", 
+                                    True, 
+                                    f"Discount already exists, using existing ID: {self.created_discount_id}"
+                                )
+                                return True
+                
+                self.log_test(
+                    "POST /api/discounts", 
+                    False, 
+                    f"HTTP {response.status_code}: {data.get('message', response.text)}", 
+                    data
+                )
+                return False
             else:
                 data = response.json() if response.headers.get('content-type', '').startswith('application/json') else {}
                 self.log_test(
-                    "PATCH /api/admin/orders/ORD-2024-001 (assign)", 
+                    "POST /api/discounts", 
                     False, 
-                    f"HTTP {response.status_code}: {data.get('error', response.text)}", 
+                    f"HTTP {response.status_code}: {data.get('message', response.text)}", 
                     data
                 )
                 return False
                 
         except Exception as e:
-            self.log_test("PATCH /api/admin/orders/ORD-2024-001 (assign)", False, f"Exception: {str(e)}")
+            self.log_test("POST /api/discounts", False, f"Exception: {str(e)}")
             return False
 
-    def test_order_generate_invoice(self) -> bool:
-        """Test POST /api/admin/orders/ORD-2024-001/invoice - Generate invoice"""
-        if not self.admin_authenticated:
-            self.log_test("POST /api/admin/orders/ORD-2024-001/invoice", False, "Cannot test invoice generation - not authenticated")
-            return False
-            
-        invoice_data = {
-            "user": "Test Agent"
-        }
-        
+    def test_discounts_put(self) -> bool:
+        """Test PUT /api/discounts/{id} - Update discount"""
+        return self.run_spec(ENDPOINT_SPECS["test_discounts_put"])
+
+    def test_discounts_delete(self) -> bool:
+        """Test DELETE /api/discounts/{id} - Delete discount"""
+        return self.run_spec(ENDPOINT_SPECS["test_discounts_delete"])
+
+    def test_products_get(self) -> bool:
+        """Test GET /api/products - List all products with inventory data"""
         try:
-            response = self.session.post(
-                f"{self.base_url}/api/admin/orders/ORD-2024-001/invoice",
-                json=invoice_data
-            )
+            response = self.session.get(f"{self.base_url}/api/products")
             
             if response.status_code == 200:
                 data = response.json()
                 if data.get('success'):
-                    invoice = data.get('invoice', {})
-                    invoice_number = invoice.get('invoiceNumber', '')
+                    products = data.get('products', [])
+                    
+                    # Check if products have variants with inventoryQty
+                    inventory_check_passed = True
+                    inventory_issues = []
+                    
+                    for i, product in enumerate(products[:5]):  # Check first 5 products
+                        variants = product.get('variants', [])
+                        if not variants:
+                            inventory_issues.append(f"Product {i+1} has no variants")
+                            inventory_check_passed = False
+                        else:
+                            for j, variant in enumerate(variants):
+                                if 'inventoryQty' not in variant:
+                                    inventory_issues.append(f"Product {i+1}, Variant {j+1} missing inventoryQty")
+                                    inventory_check_passed = False
                     
-                    if invoice_number:
+                    if inventory_check_passed:
                         self.log_test(
-                            "POST /api/admin/orders/ORD-2024-001/invoice", 
+                            "GET /api/products", 
                             True, 
-                            f"Invoice generated successfully: {invoice_number}"
+                            f"Successfully retrieved {len(products)} products with proper inventory data"
                         )
-                        return True
                     else:
                         self.log_test(
-                            "POST /api/admin/orders/ORD-2024-001/invoice", 
+                            "GET /api/products", 
                             False, 
-                            "Invoice generated but no invoice number returned", 
-                            data
+                            f"Products missing inventory data: {'; '.join(inventory_issues[:3])}"
                         )
-                        return False
+                    
+                    return inventory_check_passed
                 else:
                     self.log_test(
-                        "POST /api/admin/orders/ORD-2024-001/invoice", 
+                        "GET /api/products", 
                         False, 
-                        f"API returned success=false: {data.get('error', 'Unknown error')}", 
+                        f"API returned success=false: {data.get('message', 'Unknown error')}", 
                         data
                     )
                     return False
             else:
-                data = response.json() if response.headers.get('content-type', '').startswith('application/json') else {}
                 self.log_test(
-                    "POST /api/admin/orders/ORD-2024-001/invoice", 
+                    "GET /api/products", 
                     False, 
-                    f"HTTP {response.status_code}: {data.get('error', response.text)}", 
-                    data
+                    f"HTTP {response.status_code}: {response.text}"
                 )
                 return False
                 
         except Exception as e:
-            self.log_test("POST /api/admin/orders/ORD-2024-001/invoice", False, f"Exception: {str(e)}")
+            self.log_test("GET /api/products", False, f"Exception: {str(e)}")
             return False
 
-    def test_order_send_email(self) -> bool:
-        """Test POST /api/admin/orders/ORD-2024-001/email - Send email"""
+    def test_orders_list(self) -> bool:
+        """Test GET /api/admin/orders - List all orders with filtering"""
         if not self.admin_authenticated:
-            self.log_test("POST /api/admin/orders/ORD-2024-001/email", False, "Cannot test email sending - not authenticated")
+            self.log_test("GET /api/admin/orders", False, "Cannot test orders list - not authenticated")
             return False
             
-        email_data = {
-            "type": "custom",
-            "subject": "Test Email Subject",
-            "customMessage": "This is a test email message sent via API testing",
-            "user": "Test Agent"
-        }
-        
         try:
-            response = self.session.post(
-                f"{self.base_url}/api/admin/orders/ORD-2024-001/email",
-                json=email_data
-            )
+            response = self.session.get(f"{self.base_url}/api/admin/orders")
             
             if response.status_code == 200:
                 data = response.json()
-                if data.get('success'):
-                    email_info = data.get('email', {})
-                    recipient = email_info.get('recipient', '')
+                if 'orders' in data:
+                    orders = data.get('orders', [])
+                    pagination = data.get('pagination', {})
                     
-                    self.log_test(
-                        "POST /api/admin/orders/ORD-2024-001/email", 
-                        True, 
-                        f"Email sent successfully to {recipient}"
-                    )
-                    return True
+                    # Check if ORD-2024-001 exists
+                    test_order_found = any(order.get('orderId') == 'ORD-2024-001' for order in orders)
+                    
+                    if test_order_found:
+                        self.log_test(
+                            "GET /api/admin/orders", 
+                            True, 
+                            f"Successfully retrieved {len(orders)} orders, test order ORD-2024-001 found"
+                        )
+                        return True
+                    else:
+                        # Try with search parameter
+                        search_response = self.session.get(f"{self.base_url}/api/admin/orders?search=ORD-2024-001")
+                        if search_response.status_code == 200:
+                            search_data = search_response.json()
+                            search_orders = search_data.get('orders', [])
+                            if any(order.get('orderId') == 'ORD-2024-001' for order in search_orders):
+                                self.log_test(
+                                    "GET /api/admin/orders", 
+                                    True, 
+                                    f"Orders API working, test order found via search"
+                                )
+                                return True
+                        
+                        self.log_test(
+                            "GET /api/admin/orders", 
+                            False, 
+                            f"Test order ORD-2024-001 not found in {len(orders)} orders"
+                        )
+                        return False
                 else:
                     self.log_test(
-                        "POST /api/admin/orders/ORD-2024-001/email", 
+                        "GET /api/admin/orders", 
                         False, 
-                        f"API returned success=false: {data.get('error', 'Unknown error')}", 
+                        f"Invalid response format: {data}", 
                         data
                     )
                     return False
+            elif response.status_code == 401:
+                self.log_test(
+                    "GET /api/admin/orders", 
+                    False, 
+                    "Authentication failed - cookie not working properly"
+                )
+                return False
+            elif response.status_code == 403:
+                self.log_test(
+                    "GET /api/admin/orders", 
+                    False, 
+                    "Permission denied - user lacks orders.view permission"
+                )
+                return False
             else:
                 data = response.json() if response.headers.get('content-type', '').startswith('application/json') else {}
                 self.log_test(
-                    "POST /api/admin/orders/ORD-2024-001/email", 
+                    "GET /api/admin/orders", 
                     False, 
                     f"HTTP {response.status_code}: {data.get('error', response.text)}", 
                     data
@@ -1194,21 +2184,44 @@ class APITester:
                 return False
                 
         except Exception as e:
-            self.log_test("POST /api/admin/orders/ORD-2024-001/email", False, f"Exception: {str(e)}")
+            self.log_test("GET /api/admin/orders", False, f"Exception: {str(e)}")
             return False
 
+    def test_single_order(self) -> bool:
+        """Test GET /api/admin/orders/ORD-2024-001 - Get single order details"""
+        return self.run_spec(ENDPOINT_SPECS["test_single_order"])
+
+    def test_order_update_status(self) -> bool:
+        """Test PATCH /api/admin/orders/ORD-2024-001 - Update order status"""
+        return self.run_spec(ENDPOINT_SPECS["test_order_update_status"])
+
+    def test_order_add_note(self) -> bool:
+        """Test PATCH /api/admin/orders/ORD-2024-001 - Add note"""
+        return self.run_spec(ENDPOINT_SPECS["test_order_add_note"])
+
+    def test_order_add_tag(self) -> bool:
+        """Test PATCH /api/admin/orders/ORD-2024-001 - Add tag"""
+        return self.run_spec(ENDPOINT_SPECS["test_order_add_tag"])
+
+    def test_order_remove_tag(self) -> bool:
+        """Test PATCH /api/admin/orders/ORD-2024-001 - Remove tag"""
+        return self.run_spec(ENDPOINT_SPECS["test_order_remove_tag"])
+
+    def test_order_assign(self) -> bool:
+        """Test PATCH /api/admin/orders/ORD-2024-001 - Assign order"""
+        return self.run_spec(ENDPOINT_SPECS["test_order_assign"])
+
+    def test_order_generate_invoice(self) -> bool:
+        """Test POST /api/admin/orders/ORD-2024-001/invoice - Generate invoice"""
+        return self.run_spec(ENDPOINT_SPECS["test_order_generate_invoice"])
+
+    def test_order_send_email(self) -> bool:
+        """Test POST /api/admin/orders/ORD-2024-001/email - Send email"""
+        return self.run_spec(ENDPOINT_SPECS["test_order_send_email"])
+
     def test_promo_code_validation(self) -> bool:
         """Test POST /api/promoCode/check - Validate discount code"""
-        test_data = {
-            "code": "WELCOME10",
-            "cartItems": [
-                {
-                    "productId": "test",
-                    "quantity": 1,
-                    "price": 600
-                }
-            ]
-        }
+        test_data = copy.deepcopy(PROMO_CHECK)
         
         try:
             response = self.session.post(
@@ -1261,47 +2274,7 @@ class APITester:
     
     def test_admin_reviews_list(self) -> bool:
         """Test GET /api/admin/reviews - List all reviews with filters"""
-        if not self.admin_authenticated:
-            self.log_test("GET /api/admin/reviews", False, "Cannot test admin reviews list - not authenticated")
-            return False
-            
-        try:
-            response = self.session.get(f"{self.base_url}/api/admin/reviews")
-            
-            if response.status_code == 200:
-                data = response.json()
-                if data.get('success'):
-                    reviews = data.get('data', [])
-                    pagination = data.get('pagination', {})
-                    stats = data.get('stats', {})
-                    
-                    self.log_test(
-                        "GET /api/admin/reviews", 
-                        True, 
-                        f"Successfully retrieved {len(reviews)} reviews. Stats: {stats.get('total', 0)} total, {stats.get('approved', 0)} approved, {stats.get('pending', 0)} pending"
-                    )
-                    return True
-                else:
-                    self.log_test(
-                        "GET /api/admin/reviews", 
-                        False, 
-                        f"API returned success=false: {data.get('error', 'Unknown error')}", 
-                        data
-                    )
-                    return False
-            else:
-                data = response.json() if response.headers.get('content-type', '').startswith('application/json') else {}
-                self.log_test(
-                    "GET /api/admin/reviews", 
-                    False, 
-                    f"HTTP {response.status_code}: {data.get('error', response.text)}", 
-                    data
-                )
-                return False
-                
-        except Exception as e:
-            self.log_test("GET /api/admin/reviews", False, f"Exception: {str(e)}")
-            return False
+        return self.run_spec(ENDPOINT_SPECS["test_admin_reviews_list"])
 
     def test_admin_create_review(self) -> bool:
         """Test POST /api/admin/reviews - Create a new review manually"""
@@ -1309,16 +2282,7 @@ class APITester:
             self.log_test("POST /api/admin/reviews", False, "Cannot test admin create review - not authenticated")
             return False
             
-        review_data = {
-            "productHandle": self.test_product_handles[0],  # bcaa-4-1-1-glutamine
-            "customerName": "Alex Johnson",
-            "customerEmail": "alex.johnson@example.com",
-            "rating": 5,
-            "title": "Excellent BCAA supplement!",
-            "content": "This BCAA supplement has really helped with my recovery after workouts. Great taste and mixes well. Highly recommend for anyone serious about fitness.",
-            "status": "approved",
-            "isVerifiedPurchase": True
-        }
+        review_data = dict(ADMIN_REVIEW, productHandle=self.test_product_handles[0])  # bcaa-4-1-1-glutamine
         
         try:
             response = self.session.post(
@@ -1394,13 +2358,7 @@ class APITester:
             self.log_test("PUT /api/admin/reviews/[id]", False, "No review ID available for update test")
             return False
             
-        update_data = {
-            "rating": 4,
-            "title": "Updated: Good BCAA supplement",
-            "content": "Updated review content: Still a good product but not as amazing as I initially thought.",
-            "status": "approved",
-            "adminNotes": "Updated by admin during testing"
-        }
+        update_data = dict(REVIEW_UPDATE)
         
         try:
             response = self.session.put(
@@ -1451,14 +2409,7 @@ class APITester:
 
     def test_customer_submit_review(self) -> bool:
         """Test POST /api/reviews/submit - Customer submits a new review"""
-        review_data = {
-            "productHandle": self.test_product_handles[1],  # t-shirt
-            "customerName": "Sarah Wilson",
-            "customerEmail": "sarah.wilson@example.com",
-            "rating": 4,
-            "title": "Nice quality t-shirt",
-            "content": "The t-shirt is comfortable and fits well. Good material quality. Would buy again."
-        }
+        review_data = dict(CUSTOMER_REVIEW, productHandle=self.test_product_handles[1])  # t-shirt
         
         try:
             response = self.session.post(
@@ -1533,46 +2484,7 @@ class APITester:
 
     def test_public_product_reviews(self) -> bool:
         """Test GET /api/product-reviews/[handle] - Get approved reviews for a product"""
-        try:
-            response = self.session.get(f"{self.base_url}/api/product-reviews/{self.test_product_handles[0]}")
-            
-            if response.status_code == 200:
-                data = response.json()
-                if data.get('success'):
-                    reviews = data.get('data', [])
-                    stats = data.get('stats', {})
-                    pagination = data.get('pagination', {})
-                    
-                    # Check that only approved reviews are returned
-                    all_approved = all(review.get('status', 'approved') == 'approved' for review in reviews)
-                    
-                    self.log_test(
-                        "GET /api/product-reviews/[handle]", 
-                        True, 
-                        f"Successfully retrieved {len(reviews)} approved reviews. Avg rating: {stats.get('avgRating', 0)}, Total: {stats.get('totalReviews', 0)}"
-                    )
-                    return True
-                else:
-                    self.log_test(
-                        "GET /api/product-reviews/[handle]", 
-                        False, 
-                        f"API returned success=false: {data.get('error', 'Unknown error')}", 
-                        data
-                    )
-                    return False
-            else:
-                data = response.json() if response.headers.get('content-type', '').startswith('application/json') else {}
-                self.log_test(
-                    "GET /api/product-reviews/[handle]", 
-                    False, 
-                    f"HTTP {response.status_code}: {data.get('error', response.text)}", 
-                    data
-                )
-                return False
-                
-        except Exception as e:
-            self.log_test("GET /api/product-reviews/[handle]", False, f"Exception: {str(e)}")
-            return False
+        return self.run_spec(ENDPOINT_SPECS["test_public_product_reviews"])
 
     def test_mark_review_helpful(self) -> bool:
         """Test POST /api/reviews/helpful - Mark a review as helpful"""
@@ -1745,21 +2657,8 @@ class APITester:
             return False
             
         # Sample review data for import
-        import_data = {
-            "reviews": [
-                {
-                    "product_handle": self.test_product_handles[2],  # shaker
-                    "customer_name": "Mike Davis",
-                    "email": "mike.davis@example.com",
-                    "rating": "5",
-                    "title": "Perfect shaker bottle",
-                    "content": "This shaker bottle is exactly what I needed. No leaks, easy to clean, and the mixing ball works great.",
-                    "verified": "false",
-                    "created_at": "2024-01-15"
-                }
-            ],
-            "overwriteExisting": False
-        }
+        import_data = copy.deepcopy(REVIEW_IMPORT)
+        import_data["reviews"][0]["product_handle"] = self.test_product_handles[2]  # shaker
         
         try:
             response = self.session.post(
@@ -1854,44 +2753,590 @@ class APITester:
             self.log_test("DELETE /api/admin/reviews/[id]", False, f"Exception: {str(e)}")
             return False
 
-    def run_all_tests(self):
-        """Run all API tests"""
+    # ===== READ-AFTER-WRITE VISIBILITY =====
+
+    def _wait_until_visible(self, is_visible: Callable[[], bool], timeout: float, poll_interval: float) -> Optional[Dict[str, float]]:
+        """Poll is_visible() until it returns True; returns delay (ms) and poll count, or None on timeout"""
+        started = time.perf_counter()
+        polls = 0
+        while True:
+            polls += 1
+            if is_visible():
+                return {'delay_ms': (time.perf_counter() - started) * 1000, 'polls': polls}
+            if time.perf_counter() - started >= timeout:
+                return None
+            time.sleep(poll_interval)
+
+    def measure_review_visibility(self, samples: int = 10, poll_interval: float = 0.05, timeout: float = 30.0) -> Dict[str, Any]:
+        """Create approved reviews and time how long until GET /api/product-reviews/[handle] returns them"""
+        handle = self.test_product_handles[0]
+        delays = []
+        timeouts = 0
+        errors = []
+
+        for i in range(samples):
+            review_data = {
+                "productHandle": handle,
+                "customerName": "Visibility Probe",
+                "customerEmail": f"visibility-{uuid.uuid4().hex[:12]}@example.com",
+                "rating": 5,
+                "title": f"Visibility probe {i + 1}",
+                "content": "Read-after-write visibility probe created by backend_test.py. Safe to delete.",
+                "status": "approved",
+                "isVerifiedPurchase": True
+            }
+            review_id = None
+            try:
+                response = self.session.post(f"{self.base_url}/api/admin/reviews", json=review_data)
+                # The admin route answers 200 on create
+                if response.status_code not in (200, 201) or not response.json().get('success'):
+                    errors.append(f"create HTTP {response.status_code}")
+                    continue
+                review_id = response.json().get('data', {}).get('_id')
+
+                def is_visible() -> bool:
+                    read = self.session.get(f"{self.base_url}/api/product-reviews/{handle}?limit=50")
+                    if read.status_code != 200:
+                        return False
+                    return any(r.get('_id') == review_id for r in read.json().get('data', []))
+
+                result = self._wait_until_visible(is_visible, timeout, poll_interval)
+                if result is None:
+                    timeouts += 1
+                else:
+                    delays.append(result['delay_ms'])
+            except Exception as e:
+                errors.append(str(e))
+            finally:
+                if review_id:
+                    try:
+                        self.session.delete(f"{self.base_url}/api/admin/reviews/{review_id}")
+                    except Exception as e:
+                        errors.append(f"cleanup of {review_id}: {e}")
+
+        return {'delays_ms': delays, 'timeouts': timeouts, 'errors': errors, 'summary': summarize_latencies(delays)}
+
+    def measure_discount_visibility(self, samples: int = 10, poll_interval: float = 0.05, timeout: float = 30.0) -> Dict[str, Any]:
+        """Create discount codes and time how long until POST /api/promoCode/check accepts them"""
+        delays = []
+        timeouts = 0
+        errors = []
+
+        for _ in range(samples):
+            code = f"VIS{uuid.uuid4().hex[:8].upper()}"
+            discount = {
+                "code": code,
+                "discountType": "percentage",
+                "discountValue": 5,
+                "minOrderAmount": 0,
+                "usageLimit": 1000,
+                "isActive": True,
+                "appliesTo": "all"
+            }
+            check_data = {
+                "code": code,
+                "cartItems": [{"productId": "test", "quantity": 1, "price": 600}]
+            }
+            try:
+                response = self.session.post(f"{self.base_url}/api/discounts", json=discount)
+                if response.status_code != 201 or not response.json().get('success'):
+                    errors.append(f"create HTTP {response.status_code}")
+                    continue
+                discount_id = response.json().get('discount', {}).get('_id')
+
+                def is_visible() -> bool:
+                    check = self.session.post(f"{self.base_url}/api/promoCode/check", json=check_data)
+                    return check.status_code == 200
+
+                result = self._wait_until_visible(is_visible, timeout, poll_interval)
+                if result is None:
+                    timeouts += 1
+                else:
+                    delays.append(result['delay_ms'])
+
+                self.session.delete(f"{self.base_url}/api/discounts/{discount_id}")
+            except Exception as e:
+                errors.append(str(e))
+
+        return {'delays_ms': delays, 'timeouts': timeouts, 'errors': errors, 'summary': summarize_latencies(delays)}
+
+    def run_visibility_tests(self, samples: int = 10, poll_interval: float = 0.05, timeout: float = 30.0) -> bool:
+        """Measure read-after-write visibility delay for reviews and discounts"""
+        print(f"🔁 Read-after-write visibility ({samples} samples per entity, poll every {poll_interval * 1000:.0f}ms)")
+        print(f"📍 Base URL: {self.base_url}")
+        print("=" * 60)
+
+        if not self.admin_authenticated and not self.test_admin_login():
+            return False
+
+        all_passed = True
+        probes = [
+            ("Review -> GET /api/product-reviews/[handle]", self.measure_review_visibility),
+            ("Discount -> POST /api/promoCode/check", self.measure_discount_visibility),
+        ]
+        for label, probe in probes:
+            result = probe(samples, poll_interval, timeout)
+            summary = result['summary']
+            passed = summary['count'] > 0 and result['timeouts'] == 0 and not result['errors']
+            all_passed = all_passed and passed
+            self.log_test(
+                f"Visibility {label}",
+                passed,
+                f"{format_summary(summary)} timeouts={result['timeouts']} errors={len(result['errors'])}",
+                {'errors': result['errors'][:5]} if result['errors'] else None
+            )
+
+        return all_passed
+
+    # ===== CONCURRENCY SCENARIOS =====
+
+    def _make_session(self) -> requests.Session:
+        """New session sharing this tester's headers, cookies and retry policy (requests.Session is not thread-safe)"""
+        return self.session.clone()
+
+    def _plain_session(self) -> requests.Session:
+        """Bare requests.Session with this tester's headers and cookies: no retries, breaker or response hooks"""
+        session = requests.Session()
+        session.headers.update(self.session.headers)
+        session.cookies.update(self.session.cookies)
+        return session
+
+    def _map_with_sessions(self, items: List[Any], fn: Callable[[requests.Session, Any], Any], concurrency: int,
+                           session_factory: Optional[Callable[[], requests.Session]] = None) -> List[Any]:
+        """fn(session, item) for every item on a thread pool, one session per worker thread, closed afterwards"""
+        factory = session_factory or self._make_session
+        local = threading.local()
+        sessions = []
+        lock = threading.Lock()
+
+        def call(item: Any) -> Any:
+            session = getattr(local, 'session', None)
+            if session is None:
+                session = local.session = factory()
+                with lock:
+                    sessions.append(session)
+            return fn(session, item)
+
+        try:
+            with ThreadPoolExecutor(max_workers=concurrency) as pool:
+                return list(pool.map(self.tracer.wrap(call) if self.tracer else call, items))
+        finally:
+            for session in sessions:
+                session.close()
+
+    def _fire_concurrently(self, payloads: List[Any], send: Callable[[requests.Session, Any], requests.Response], concurrency: int) -> Dict[str, Any]:
+        """Run send(session, payload) for every payload on a thread pool; returns per-call results and wall time"""
+
+        def call(session: requests.Session, payload: Any) -> Dict[str, Any]:
+            started = time.perf_counter()
+            try:
+                response = send(session, payload)
+                latency_ms = (time.perf_counter() - started) * 1000
+                try:
+                    data = response.json()
+                except ValueError:
+                    data = {}
+                return {'payload': payload, 'status': response.status_code, 'latency_ms': latency_ms, 'data': data, 'error': None}
+            except Exception as e:
+                latency_ms = (time.perf_counter() - started) * 1000
+                return {'payload': payload, 'status': None, 'latency_ms': latency_ms, 'data': {}, 'error': str(e)}
+
+        started = time.perf_counter()
+        results = self._map_with_sessions(payloads, call, concurrency)
+        return {'results': results, 'wall_s': time.perf_counter() - started}
+
+    def test_helpful_vote_storm(self, unique_voters: int = 2000, duplicate_votes: int = 500, concurrency: int = 64) -> bool:
+        """Storm POST /api/reviews/helpful with concurrent unique and duplicate voters, then verify helpfulCount"""
+        test_name = "POST /api/reviews/helpful (vote storm)"
+        if not self.admin_authenticated:
+            self.log_test(test_name, False, "Cannot run vote storm - not authenticated")
+            return False
+
+        # Fresh review so the expected count starts from zero
+        review_data = {
+            "productHandle": self.test_product_handles[0],
+            "customerName": "Vote Storm",
+            "customerEmail": f"vote-storm-{uuid.uuid4().hex[:12]}@example.com",
+            "rating": 5,
+            "title": "Helpful vote storm target",
+            "content": "Target review for the helpful vote storm in backend_test.py. Safe to delete.",
+            "status": "approved",
+            "isVerifiedPurchase": True
+        }
+
+        try:
+            response = self.session.post(f"{self.base_url}/api/admin/reviews", json=review_data)
+            # The admin route answers 200 on create
+            if response.status_code not in (200, 201) or not response.json().get('success'):
+                self.log_test(test_name, False, f"Could not create target review: HTTP {response.status_code}")
+                return False
+            review_id = response.json().get('data', {}).get('_id')
+
+            run_id = uuid.uuid4().hex[:8]
+            voters = [f"storm-{run_id}-{i}" for i in range(unique_voters)]
+            rng = random.Random(run_id)
+            votes = voters + [rng.choice(voters) for _ in range(duplicate_votes)]
+            rng.shuffle(votes)
+
+            def send(session: requests.Session, voter_id: str) -> requests.Response:
+                return session.post(
+                    f"{self.base_url}/api/reviews/helpful",
+                    json={"reviewId": review_id, "voterId": voter_id}
+                )
+
+            storm = self._fire_concurrently(votes, send, concurrency)
+            results = storm['results']
+
+            accepted = sum(1 for r in results if r['status'] == 200 and r['data'].get('success'))
+            rejected_dupes = sum(1 for r in results if r['status'] == 400 and "already marked" in r['data'].get('error', ''))
+            failed = len(results) - accepted - rejected_dupes
+            latency = summarize_latencies([r['latency_ms'] for r in results])
+            throughput = len(results) / storm['wall_s'] if storm['wall_s'] else 0.0
+
+            check = self.session.get(f"{self.base_url}/api/admin/reviews/{review_id}")
+            review = check.json().get('data', {}) if check.status_code == 200 else {}
+            final_count = review.get('helpfulCount')
+            stored_voters = review.get('helpfulVotes', [])
+
+            self.session.delete(f"{self.base_url}/api/admin/reviews/{review_id}")
+
+            print(f"   {len(votes)} votes in {storm['wall_s']:.2f}s ({throughput:.1f} votes/s, concurrency {concurrency})")
+            print(f"   Latency: {format_summary(latency)}")
+            print(f"   Accepted: {accepted}, duplicates rejected: {rejected_dupes}, failed: {failed}")
+
+            consistent = (
+                final_count == unique_voters
+                and len(stored_voters) == unique_voters
+                and len(set(stored_voters)) == unique_voters
+                and accepted == unique_voters
+            )
+            self.log_test(
+                test_name,
+                consistent and failed == 0,
+                f"helpfulCount={final_count} stored voters={len(stored_voters)} (distinct {len(set(stored_voters))}) "
+                f"expected={unique_voters}; accepted={accepted} failed={failed}; "
+                f"{throughput:.1f} votes/s p99={latency['p99']:.1f}ms",
+                None if consistent else {
+                    'lost_increments': unique_voters - len(set(stored_voters)),
+                    'double_counted': len(stored_voters) - len(set(stored_voters)),
+                    'sample_failures': [r['error'] or r['data'] for r in results if r['status'] not in (200, 400)][:5]
+                }
+            )
+            return consistent and failed == 0
+
+        except Exception as e:
+            self.log_test(test_name, False, f"Exception: {str(e)}")
+            return False
+
+    def _cancel_orders(self, order_ids: List[str], reason: str, concurrency: int = 16) -> int:
+        """Cancel orders via PATCH /api/admin/orders/[orderId]; there is no delete route, so they stay as cancelled"""
+        if not order_ids or (not self.admin_authenticated and not self.test_admin_login()):
+            return 0
+
+        def send(session: requests.Session, order_id: str) -> requests.Response:
+            return session.patch(f"{self.base_url}/api/admin/orders/{order_id}", json={"action": "cancel", "reason": reason})
+
+        results = self._fire_concurrently(order_ids, send, concurrency)['results']
+        return sum(1 for r in results if r['status'] == 200 and r['data'].get('success'))
+
+    def cancel_created_orders(self, created: CreatedOrders, reason: str, concurrency: int = 16) -> int:
+        """Cancel everything a CreatedOrders hook saw and say so; returns how many were cancelled"""
+        if not created.order_ids:
+            return 0
+        cancelled = self._cancel_orders(created.order_ids, reason, concurrency)
+        print(f"🧹 Cancelled {cancelled}/{len(created.order_ids)} orders created by this run "
+              f"(no delete route: they remain as cancelled)")
+        return cancelled
+
+    def test_oversell_checkout(self, stock: int = 10, attempts: int = 200, concurrency: int = 64) -> bool:
+        """Fire far more concurrent POST /api/orders/create than a seeded variant has stock and verify no oversell"""
+        test_name = "POST /api/orders/create (oversell)"
+        run_id = uuid.uuid4().hex[:8]
+        handle = f"oversell-{run_id}"
+        product = {
+            "handle": handle,
+            "title": f"Oversell probe {run_id}",
+            "published": False,
+            "options": [{"name": "Size", "values": ["One"]}],
+            "variants": [{
+                "option1Value": "One",
+                "sku": f"OVERSELL-{run_id}",
+                "inventoryQty": stock,
+                "inventoryPolicy": "deny",
+                "price": 499
+            }]
+        }
+
+        def read_stock() -> Optional[int]:
+            read = self.session.get(f"{self.base_url}/api/products?search={product['title']}&published=false")
+            for item in read.json().get('products', []) if read.status_code == 200 else []:
+                if item.get('handle') == handle:
+                    return (item.get('variants') or [{}])[0].get('inventoryQty')
+            return None
+
+        seeded, storm = None, None
+        try:
+            response = self.session.post(f"{self.base_url}/api/products", json=product)
+            if response.status_code != 201 or not response.json().get('success'):
+                self.log_test(test_name, False, f"Could not seed product: HTTP {response.status_code}")
+                return False
+            seeded = response.json().get('data', {})
+            product_id = seeded.get('_id')
+            variant_id = (seeded.get('variants') or [{}])[0].get('_id')
+
+            # Watch stock while the storm runs so a transient negative value is not missed
+            observed = []
+            stop = threading.Event()
+
+            def monitor():
+                session = self._make_session()
+                while not stop.is_set():
+                    try:
+                        read = session.get(f"{self.base_url}/api/products/{handle}")
+                        if read.status_code == 200:
+                            observed.append((read.json().get('data', {}).get('variants') or [{}])[0].get('inventoryQty'))
+                    except Exception:
+                        pass
+                    stop.wait(0.05)
+
+            watcher = threading.Thread(target=self.tracer.wrap(monitor) if self.tracer else monitor, daemon=True)
+            watcher.start()
+
+            def send(session: requests.Session, i: int) -> requests.Response:
+                return session.post(
+                    f"{self.base_url}/api/orders/create",
+                    json=order_payload(product_id, variant_id, 499, email=f"oversell-{run_id}-{i}@example.com")
+                )
+
+            storm = self._fire_concurrently(list(range(attempts)), send, concurrency)
+            stop.set()
+            watcher.join()
+
+            results = storm['results']
+            succeeded = sum(1 for r in results if r['status'] in (200, 201) and r['data'].get('success'))
+            rejected = sum(1 for r in results if r['status'] in (400, 409, 410, 422))
+            errored = len(results) - succeeded - rejected
+            latency = summarize_latencies([r['latency_ms'] for r in results])
+            throughput = len(results) / storm['wall_s'] if storm['wall_s'] else 0.0
+            final_stock = read_stock()
+            numeric = [q for q in observed + [final_stock] if isinstance(q, (int, float))]
+            min_stock = min(numeric) if numeric else None
+
+            print(f"   {attempts} checkouts for stock {stock} in {storm['wall_s']:.2f}s "
+                  f"({throughput:.1f} req/s, concurrency {concurrency})")
+            print(f"   Latency: {format_summary(latency)}")
+            print(f"   Succeeded: {succeeded}, rejected: {rejected}, errors: {errored}; "
+                  f"stock final={final_stock} min observed={min_stock} ({len(observed)} reads)")
+
+            consistent = succeeded == stock and final_stock == 0 and min_stock is not None and min_stock >= 0
+            if consistent:
+                message = f"Exactly {stock} of {attempts} orders accepted, stock ended at 0"
+            elif final_stock == stock:
+                message = f"{succeeded} orders accepted but stock never moved from {stock} - checkout does not reserve inventory"
+            else:
+                message = f"{succeeded} orders accepted for stock {stock}; final stock {final_stock}, min observed {min_stock}"
+            self.log_test(
+                test_name,
+                consistent,
+                f"{message}; {throughput:.1f} req/s p99={latency['p99']:.1f}ms",
+                None if consistent else {
+                    'oversold': max(0, succeeded - stock),
+                    'sample_errors': [r['error'] or r['data'] for r in results if r['status'] not in (200, 201)][:5]
+                }
+            )
+            return consistent
+
+        except Exception as e:
+            self.log_test(test_name, False, f"Exception: {str(e)}")
+            return False
+        finally:
+            if storm is not None:
+                order_ids = [r['data'].get('order', {}).get('orderId') for r in storm['results']
+                             if r['status'] in (200, 201) and r['data'].get('success')]
+                order_ids = [order_id for order_id in order_ids if order_id]
+                cancelled = self._cancel_orders(order_ids, f"Oversell probe {run_id} cleanup")
+                print(f"   🧹 Cancelled {cancelled}/{len(order_ids)} probe orders (no delete route: they remain as cancelled)")
+            if seeded is not None:
+                # DELETE /api/products/[handle] only sets isDeleted; there is no hard-delete route
+                self.session.delete(f"{self.base_url}/api/products/{handle}")
+                print(f"   🧹 Soft-deleted probe product {handle} (isDeleted=true, the document is kept)")
+
+    # ===== COMPRESSION EFFECTIVENESS =====
+
+    def _read_endpoints(self) -> List[str]:
+        """Read routes worth measuring, with dynamic segments filled from the test fixtures"""
+        return [path.format(handle=self.test_product_handles[0]) for path in READ_ENDPOINTS]
+
+    def measure_compression(self, path: str, encoding: str, samples: int = 5) -> Dict[str, Any]:
+        """Fetch path with one Accept-Encoding; mean wire and decoded bytes, total and decode time over 200 responses"""
+        totals, decodes, wire_sizes, decoded_sizes, statuses = [], [], [], [], []
+        served = None
+        for _ in range(samples):
+            started = time.perf_counter()
+            response = self.session.get(f"{self.base_url}{path}", headers={'Accept-Encoding': encoding}, stream=True)
+            wire = response.raw.read(decode_content=False)
+            elapsed_ms = (time.perf_counter() - started) * 1000
+            statuses.append(response.status_code)
+            if response.status_code != 200:
+                # Error bodies say nothing about how the route's real payload compresses
+                response.close()
+                continue
+            totals.append(elapsed_ms)
+            served = response.headers.get('Content-Encoding', 'identity').lower()
+
+            decode_started = time.perf_counter()
+            body = DECODERS.get(served, lambda b: b)(wire)
+            decodes.append((time.perf_counter() - decode_started) * 1000)
+            wire_sizes.append(len(wire))
+            decoded_sizes.append(len(body))
+            response.close()
+
+        return {
+            'status': next((status for status in statuses if status != 200), 200) if statuses else None,
+            'samples': len(wire_sizes),
+            'served': served,
+            'wire_bytes': round(sum(wire_sizes) / len(wire_sizes)) if wire_sizes else 0,
+            'decoded_bytes': round(sum(decoded_sizes) / len(decoded_sizes)) if decoded_sizes else 0,
+            'total_ms': summarize_latencies(totals),
+            'decode_ms': summarize_latencies(decodes),
+        }
+
+    def run_compression_analysis(self, samples: int = 5) -> bool:
+        """Per-route table of compression ratio and latency impact for identity, gzip and br"""
+        print(f"🗜️  Compression analysis ({samples} samples per route and encoding)")
+        print(f"📍 Base URL: {self.base_url}")
+        print("=" * 60)
+        self.test_admin_login()
+
+        encodings = [e for e in ("identity", "gzip", "br") if e == "identity" or e in DECODERS]
+        if "br" not in encodings:
+            print("   ℹ️  brotli not installed - skipping br (pip install brotli)")
+
+        print(f"\n   {'Route':<44} {'enc':<9} {'HTTP':>4} {'served':<9} {'wire B':>9} {'decoded B':>10} {'ratio':>6} "
+              f"{'p50 ms':>8} {'Δ p50':>7} {'decode ms':>9}")
+        all_ok = True
+        for path in self._read_endpoints():
+            baseline = None
+            for encoding in encodings:
+                try:
+                    result = self.measure_compression(path, encoding, samples)
+                except Exception as e:
+                    self.log_test(f"Compression GET {path} ({encoding})", False, f"Exception: {str(e)}")
+                    all_ok = False
+                    continue
+                if not result['samples']:
+                    print(f"   {path:<44} {encoding:<9} {result['status']:>4} skipped: no 200 response in {samples} samples")
+                    continue
+                p50 = result['total_ms']['p50']
+                baseline = p50 if encoding == "identity" else baseline
+                delta = f"{p50 - baseline:+.1f}" if baseline is not None and encoding != "identity" else "-"
+                ratio = result['decoded_bytes'] / result['wire_bytes'] if result['wire_bytes'] else 0.0
+                print(f"   {path:<44} {encoding:<9} {result['status']:>4} {result['served']:<9} {result['wire_bytes']:>9} "
+                      f"{result['decoded_bytes']:>10} {ratio:>5.1f}x {p50:>8.1f} {delta:>7} "
+                      f"{result['decode_ms']['p50']:>9.2f}")
+                if encoding != "identity" and result['served'] == "identity" and result['wire_bytes'] > 1024:
+                    print(f"   ⚠️  {path} ignored Accept-Encoding: {encoding} ({result['wire_bytes']} bytes uncompressed)")
+        return all_ok
+
+    # ===== LATENCY AND PAYLOAD BUDGETS =====
+
+    def _probe_budget(self, key: str, budget: Dict[str, Any]) -> Optional[int]:
+        """Send one extra request for a budgeted endpoint; its status, or None when it can't be probed safely"""
+        method, path = key.split(" ", 1)
+        url = f"{self.base_url}{fill_route(path, {'handle': self.test_product_handles[0]})}"
+        if PLACEHOLDER_ID in url:
+            return None
+        if method == "GET":
+            return self.session.get(url).status_code
+        if budget.get('probe') in PAYLOAD_TEMPLATES:
+            return self.session.request(method, url, json=PAYLOAD_TEMPLATES[budget['probe']]()).status_code
+        return None
+
+    def check_budgets(self, tracker: "BudgetTracker", min_samples: int = 20) -> bool:
+        """Top up each budgeted endpoint to min_samples, then log every budget as a pass/fail result"""
+        print(f"\n🎯 Latency and payload budgets (at least {min_samples} samples per endpoint)")
+        all_ok = True
+        needs_admin = any(key.split(" ", 1)[1].startswith("/api/admin") and len(tracker.latencies.get(key, [])) < min_samples
+                          for key in tracker.budgets)
+        if needs_admin:
+            # The functional run ends with a logout
+            self.test_admin_login()
+        for key, budget in tracker.budgets.items():
+            # Rejected statuses never become tracker samples, so cap attempts instead of waiting for samples
+            attempts, rejected, last_status = 0, 0, None
+            try:
+                while len(tracker.latencies.get(key, [])) < min_samples and attempts < 3 * min_samples:
+                    status = self._probe_budget(key, budget)
+                    if status is None:
+                        break
+                    attempts += 1
+                    if not budget_accepts(budget, status):
+                        rejected, last_status = rejected + 1, status
+            except Exception as e:
+                self.log_test(f"Budget {key}", False, f"Probe failed: {str(e)}")
+                all_ok = False
+                continue
+            if rejected:
+                self.log_test(f"Budget {key}", False,
+                              f"{rejected}/{attempts} probes got a status the budget does not accept (last HTTP {last_status})")
+                all_ok = False
+                continue
+
+            latencies = tracker.latencies.get(key, [])
+            if not latencies:
+                seen = ", ".join(f"HTTP {status} x{n}" for status, n in sorted(tracker.rejected.get(key, {}).items()))
+                print(f"   ⚪ {key}: no samples ({'only rejected responses: ' + seen if seen else 'not exercised and not probeable'})")
+                continue
+            for metric in ("p50_ms", "p95_ms", "p99_ms"):
+                if metric in budget:
+                    actual = percentile(latencies, float(metric[1:3]))
+                    passed = actual <= budget[metric]
+                    self.log_test(f"Budget {key} {metric[:3]}", passed,
+                                  f"{actual:.0f}ms over {len(latencies)} samples (budget {budget[metric]}ms)")
+                    all_ok = all_ok and passed
+            sizes = tracker.sizes.get(key)
+            if 'max_bytes' in budget and sizes:
+                passed = max(sizes) <= budget['max_bytes']
+                self.log_test(f"Budget {key} size", passed,
+                              f"largest body {max(sizes)} bytes (budget {budget['max_bytes']} bytes)")
+                all_ok = all_ok and passed
+        return all_ok
+
+    def run_all_tests(self, cases: Optional[List[TestCase]] = None) -> bool:
+        """Run all API tests, or the given registry selection"""
         print(f"🚀 Starting API tests for Gibbon Nutrition Admin Panel")
         print(f"📍 Base URL: {self.base_url}")
         print("=" * 60)
         
         # Test sequence - Admin Auth tests first, then Order APIs
-        tests = [
-            ("Admin Setup Status", self.test_admin_setup_status),
-            ("Admin Login", self.test_admin_login),
-            ("Admin Current User", self.test_admin_me),
-            ("Order List API", self.test_orders_list),
-            ("Single Order API", self.test_single_order),
-            ("Order Update Status", self.test_order_update_status),
-            ("Order Add Note", self.test_order_add_note),
-            ("Order Add Tag", self.test_order_add_tag),
-            ("Order Remove Tag", self.test_order_remove_tag),
-            ("Order Assignment", self.test_order_assign),
-            ("Invoice Generation", self.test_order_generate_invoice),
-            ("Email Sending", self.test_order_send_email),
-            ("Admin Staff List", self.test_admin_staff_list),
-            ("Admin Staff Invite", self.test_admin_staff_invite),
-            ("Admin Logout", self.test_admin_logout),
-            ("Discounts API - GET", self.test_discounts_get),
-            ("Discounts API - POST", self.test_discounts_post),
-            ("Discounts API - PUT", self.test_discounts_put),
-            ("Discounts API - DELETE", self.test_discounts_delete),
-            ("Products API - GET", self.test_products_get),
-            ("PromoCode Validation", self.test_promo_code_validation),
-        ]
+        if cases is None:
+            tests = [(label, getattr(self, name), None) for label, name in DEFAULT_TEST_SEQUENCE]
+        else:
+            tests = [(case.label, getattr(self, case.name), case.group) for case in cases]
         
         passed = 0
         total = len(tests)
         
-        for test_name, test_func in tests:
+        for test_name, test_func, group in tests:
+            if group in ADMIN_GROUPS and not self.admin_authenticated:
+                print(f"\n🔑 Setup: admin login for {group} tests")
+                self.test_admin_login()
             print(f"\n🧪 Running: {test_name}")
-            if test_func():
+            started = time.perf_counter()
+            self._active_test = test_func.__name__
+            with self._test_span(test_func.__name__, test_name) as span:
+                if self.profiler:
+                    with self.profiler.profile_test(test_func.__name__):
+                        ok = test_func()
+                else:
+                    ok = test_func()
+                if span:
+                    span.set_status(bool(ok), "test failed")
+            self._active_test = None
+            self.test_outcomes[test_func.__name__] = bool(ok)
+            if ok:
                 passed += 1
+            self.test_durations[test_func.__name__] = time.perf_counter() - started
         
         print("\n" + "=" * 60)
         print(f"📊 Test Results: {passed}/{total} tests passed")
@@ -1905,8 +3350,174 @@ class APITester:
 
 def main():
     """Main test execution"""
-    tester = APITester(BASE_URL)
-    success = tester.run_all_tests()
+    parser = argparse.ArgumentParser(description="Gibbon Nutrition backend API tests")
+    parser.add_argument("--base-url", default=BASE_URL, help="Target deployment (default: %(default)s)")
+    parser.add_argument("--visibility", type=int, metavar="N",
+                        help="Measure read-after-write visibility delay with N samples per entity")
+    parser.add_argument("--poll-interval", type=float, default=0.05,
+                        help="Seconds between visibility polls (default: %(default)s)")
+    parser.add_argument("--vote-storm", type=int, metavar="VOTERS",
+                        help="Run the helpful-vote storm with VOTERS unique voters")
+    parser.add_argument("--duplicate-votes", type=int, default=500,
+                        help="Extra votes replayed from already-used voter IDs (default: %(default)s)")
+    parser.add_argument("--oversell", type=int, metavar="STOCK",
+                        help="Seed a variant with STOCK units and race --checkouts concurrent orders against it")
+    parser.add_argument("--checkouts", type=int, default=200,
+                        help="Concurrent checkout attempts for --oversell (default: %(default)s)")
+    parser.add_argument("--concurrency", type=int, default=64,
+                        help="Worker threads for concurrent scenarios (default: %(default)s)")
+    parser.add_argument("--connect-timeout", type=float, help="Override the connect timeout (seconds) for every endpoint")
+    parser.add_argument("--read-timeout", type=float, help="Override the read timeout (seconds) for every endpoint")
+    parser.add_argument("--retries", type=int, default=2,
+                        help="Retries for idempotent requests on timeout/5xx (default: %(default)s)")
+    parser.add_argument("--breaker-threshold", type=int, default=5,
+                        help="Consecutive failures before an endpoint is skipped (default: %(default)s)")
+    parser.add_argument("--tag", action="append", help="Run only tests with this tag (repeatable)")
+    parser.add_argument("--exclude-tag", action="append", help="Skip tests with this tag (repeatable)")
+    parser.add_argument("-k", "--name", action="append", help="Run only tests whose method name contains this (repeatable)")
+    parser.add_argument("--all", action="store_true", help="Run every discovered test_* method, not just the default sequence")
+    parser.add_argument("--shard-count", type=int, default=1, help="Split the selection across N CI jobs")
+    parser.add_argument("--shard-index", type=int, default=0, help="0-based shard to run (default: %(default)s)")
+    parser.add_argument("--durations-file", help="JSON of historical per-test seconds used to balance shards")
+    parser.add_argument("--record-durations", action="store_true", help="Merge this run's timings into --durations-file")
+    parser.add_argument("--profile", metavar="DIR",
+                        help="Profile the client per test: cProfile, folded stacks and CPU vs wait time written to DIR")
+    parser.add_argument("--list", action="store_true", help="Print the selected tests and shard plan, then exit")
+    parser.add_argument("--compression", type=int, metavar="SAMPLES",
+                        help="Compare identity/gzip/br wire size and latency per read route")
+    parser.add_argument("--budgets", metavar="FILE", help="JSON overrides for ENDPOINT_BUDGETS")
+    parser.add_argument("--budget-samples", type=int, default=20,
+                        help="Samples per budgeted endpoint, topped up with extra requests (default: %(default)s)")
+    parser.add_argument("--no-budgets", action="store_true", help="Skip latency and payload budget checks")
+    parser.add_argument("--trace", metavar="FILE", help="Trace each test and HTTP call; append OTLP/JSON spans to FILE")
+    parser.add_argument("--otlp-endpoint", metavar="URL", help="Also POST spans to an OTLP/HTTP collector (JSON)")
+    parser.add_argument("--slow-top", type=int, default=5,
+                        help="Slowest requests kept per endpoint, with full capture (default: %(default)s)")
+    parser.add_argument("--slow-dump", metavar="FILE", help="Write the slowest-request captures as JSON")
+    parser.add_argument("--fault", action="append", metavar="RULE",
+                        help="Run through an in-process fault proxy, e.g. 'GET /api/admin/orders*:latency=200,error=0.1'")
+    parser.add_argument("--fault-proxy", action="store_true",
+                        help="Run through the proxy without faults to split upstream from total time")
+    parser.add_argument("--fault-seed", type=int, default=0)
+    parser.add_argument("--changed", nargs="?", const="HEAD", metavar="REF",
+                        help="Only run tests and budgets whose routes (or their imports) differ from REF (default: HEAD)")
+    parser.add_argument("--cache", default=DEFAULT_RESULTS_CACHE,
+                        help="Per-test route map, outcomes and timings used by --changed (default: %(default)s)")
+    parser.add_argument("--spec-cases", type=int, metavar="N",
+                        help="Run N parameterized cases of the cheap endpoint specs (VOLUME_SPECS) with --concurrency")
+    parser.add_argument("--spec-admin", action="store_true", help="Log in and include admin specs in --spec-cases")
+    parser.add_argument("--spec-seed", type=int, default=0)
+    parser.add_argument("--history", nargs="?", const=DEFAULT_HISTORY_DB, metavar="DB",
+                        help="Append per-endpoint results to a SQLite history (default DB: %(const)s)")
+    parser.add_argument("--scenario", default="api-tests",
+                        help="Run label stored with --history, e.g. nightly (default: %(default)s)")
+    parser.add_argument("--history-samples", action="store_true", help="Also store every raw latency sample")
+    args = parser.parse_args()
+
+    started_at = time.strftime("%Y-%m-%dT%H:%M:%S")
+    cases = None
+    if args.all or args.tag or args.exclude_tag or args.name or args.shard_count > 1 or args.list or args.changed:
+        registry = TestRegistry(APITester)
+        durations = TestRegistry.load_durations(args.durations_file)
+        if args.changed and not (args.all or args.tag or args.exclude_tag or args.name):
+            selection = registry.default_cases()
+        else:
+            selection = registry.select(args.tag, args.exclude_tag, args.name)
+        shards = TestRegistry.shard(selection, args.shard_count, durations)
+        if args.list:
+            for i, shard in enumerate(shards):
+                estimate = sum(durations.get(c.name, 0.0) for c in shard)
+                print(f"Shard {i}: {len(shard)} tests, ~{estimate:.1f}s")
+                for case in shard:
+                    print(f"   {case.name:<36} [{', '.join(sorted(case.tags))}]")
+            sys.exit(0)
+        if not 0 <= args.shard_index < len(shards):
+            parser.error(f"--shard-index must be in [0, {len(shards) - 1}]")
+        cases = shards[args.shard_index]
+
+    session = ResilientSession(max_retries=args.retries, breaker=CircuitBreaker(args.breaker_threshold))
+    if args.connect_timeout or args.read_timeout:
+        override = lambda t: (args.connect_timeout or t[0], args.read_timeout or t[1])
+        session.default_timeout = override(session.default_timeout)
+        session.timeouts = {prefix: override(t) for prefix, t in session.timeouts.items()}
+    server_timing = ServerTimingStats()
+    server_timing.attach(session)
+    # Attached before any hook that reads the body, so it can time the download itself
+    slowest = SlowRequestReservoir(args.slow_top)
+    if args.slow_top > 0:
+        slowest.attach(session)
+    budgets = BudgetTracker(load_budgets(args.budgets))
+    budgets.attach(session)
+    tester = APITester(args.base_url, session)
+    fault_proxy = None
+    if args.fault or args.fault_proxy:
+        fault_proxy = tester.start_fault_proxy([parse_fault_rule(spec) for spec in args.fault or []], args.fault_seed)
+        print(f"🧨 Fault proxy {tester.base_url} -> {args.base_url}")
+    profiler = ClientProfiler(args.profile) if args.profile else None
+    if profiler:
+        profiler.attach(tester)
+    if args.trace or args.otlp_endpoint:
+        tester.tracer = session.tracer = Tracer(args.trace, args.otlp_endpoint)
+    if args.visibility:
+        success = tester.run_visibility_tests(args.visibility, args.poll_interval)
+    elif args.spec_cases:
+        success = tester.run_volume_specs(args.spec_cases, args.concurrency, args.spec_seed, args.spec_admin)
+    elif args.compression:
+        success = tester.run_compression_analysis(args.compression)
+    elif args.oversell:
+        with tester._test_span("test_oversell_checkout", "Oversell Checkout") as span:
+            success = tester.test_admin_login() and tester.test_oversell_checkout(
+                args.oversell, args.checkouts, args.concurrency
+            )
+            if span:
+                span.set_status(bool(success), "test failed")
+    elif args.vote_storm:
+        with tester._test_span("test_helpful_vote_storm", "Helpful Vote Storm") as span:
+            success = tester.test_admin_login() and tester.test_helpful_vote_storm(
+                args.vote_storm, args.duplicate_votes, args.concurrency
+            )
+            if span:
+                span.set_status(bool(success), "test failed")
+    else:
+        cache = ResultsCache(args.cache)
+        routes = discover_api_routes()
+        success = True
+        if args.changed:
+            changed = changed_files(args.changed)
+            affected = cache.affected(cases, changed)
+            print(f"🔀 {len(changed)} files changed vs {args.changed}: running {len(affected)} of {len(cases)} tests")
+            success = tester.report_cached([case for case in cases if case not in affected], cache)
+            cases = affected
+            if not changed & HARNESS_FILES:
+                # Benchmarks follow the same rule: only budgets whose route depends on a changed file
+                budgets.budgets = {key: budget for key, budget in budgets.budgets.items()
+                                   if (route := match_route(key, routes)) and changed & source_closure(route['file'])}
+        if cases is None or cases:
+            success = tester.run_all_tests(cases) and success
+        if args.record_durations and args.durations_file:
+            TestRegistry.save_durations(args.durations_file, tester.test_durations)
+        cache.update(tester, routes)
+        cache.save()
+        if not args.no_budgets and budgets.budgets:
+            success = tester.check_budgets(budgets, args.budget_samples) and success
+
+    session.stats.print_report()
+    server_timing.print_report()
+    if fault_proxy:
+        fault_proxy.stop()
+        fault_proxy.print_report()
+    slowest.print_report()
+    if args.slow_dump:
+        slowest.dump(args.slow_dump)
+        print(f"💾 Slowest-request captures written to {args.slow_dump}")
+    if profiler:
+        profiler.print_report()
+    if tester.tracer:
+        print(f"\n🔭 Exported {tester.tracer.export()} spans to {args.trace or args.otlp_endpoint}")
+    if args.history:
+        run_id = record_history(args.history, session.stats, args.base_url, args.scenario, started_at,
+                                bool(success), args.history_samples)
+        print(f"🗄️  Recorded run {run_id} ({args.scenario}) in {args.history}")
     
     # Exit with appropriate code
     sys.exit(0 if success else 1)